@@ -0,0 +1,418 @@
+#! /usr/bin/python
+"""
+benchmark.py
+
+Description:
+    Reproducible benchmarks for the hot paths of the fitness package.
+
+    Synthetic data (Skulpt exports, multi-year weight logs and program date
+    ranges) is generated from a fixed seed into a temporary directory, every
+    benchmark is timed, and the results are written as JSON. Benchmarks which
+    change their data or warm a cache reset it before every timed call, so
+    each call measures the same work. Results can be
+    saved as a baseline and later runs compared against it, failing when a
+    benchmark becomes slower than the allowed tolerance.
+
+    python benchmarks/benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/benchmark.py --baseline benchmarks/baseline.json
+"""
+# Python standard libraries
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+# make the in-tree package importable when run from a checkout
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "python"))
+
+# Local libraries
+import fitness.bodyweight as bodyweight
+import fitness.program as program
+import fitness.report as report
+import fitness.skulpt as skulpt
+import fitness.weightlog as weightlog
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+DESCRIPTION = """
+Times the fitness package hot paths against synthetic data and optionally
+compares the results against a stored baseline.
+"""
+
+SEED = 20180819
+MUSCLES = (
+    "upper_back", "lower_back", "chest", "shoulders", "biceps",
+    "triceps", "forearms", "abs", "quads", "hamstrings", "calves", "glutes"
+)
+SIZES = {
+    # name: (skulpt days, weight log entries, program days)
+    "full": (1500, 3650, 3650),
+    "quick": (150, 365, 365)
+}
+
+
+# ==============================================================================
+# data generators
+# ==============================================================================
+def make_skulpt_csv(filepath, days, seed=SEED):
+    """
+    Writes a Skulpt export with one scan of every muscle on both sides per day
+
+    :param filepath: full path to the csv file to write
+    :type filepath: string
+    :param days: number of days of scans
+    :type days: int
+    :param seed: random seed
+    :type seed: int
+    :return: the first and last scan dates
+    :rtype: tuple of <class 'datetime.datetime'>
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2015, 1, 1, 6, 30)
+    with open(filepath, "w") as outfile:
+        outfile.write("Time, Muscle, Side, MQ(0-100), MQ(raw), Fat_%\n")
+        for day in range(days):
+            date = start + datetime.timedelta(days=day)
+            for i, muscle in enumerate(MUSCLES):
+                for side in ("l", "r"):
+                    ts = date + datetime.timedelta(seconds=i * 20)
+                    outfile.write("{}.000Z, {}, {}, {:.5f}, {:.5f}, {:.1f}\n".format(
+                        ts.strftime("%Y-%m-%dT%H:%M:%S"), muscle, side,
+                        rng.uniform(80, 100), rng.uniform(120, 180), rng.uniform(5, 20)
+                    ))
+    return start, start + datetime.timedelta(days=days - 1)
+
+
+def make_weight_log(filepath, entries, seed=SEED):
+    """
+    Writes a weight log with one weigh-in per day
+
+    :param filepath: full path to the weight log to write, see fitness.weightlog
+    :type filepath: string
+    :param entries: number of weigh-ins
+    :type entries: int
+    :param seed: random seed
+    :type seed: int
+    :return: n/a
+    :rtype: n/a
+    """
+    rng = random.Random(seed)
+    start = time.mktime(datetime.datetime(2015, 1, 1, 7).timetuple())
+
+    def records():
+        weight = 85.0
+        for day in range(entries):
+            weight += rng.uniform(-0.3, 0.3)
+            data = bodyweight.get_weight_data(180, weight, 35, rng.uniform(10, 20), True, "katchMcArdle")
+            yield start + day * 86400, data
+
+    weightlog.open_log(filepath).write(records())
+
+
+# ==============================================================================
+# benchmarks
+# ==============================================================================
+def build_benchmarks(workdir, size):
+    """
+    Generates the benchmark data and returns the benchmarks to run
+
+    :param workdir: directory to write generated data to
+    :type workdir: string
+    :param size: data set size, one of SIZES
+    :type size: string
+    :return: benchmark names, the functions they time and the functions run
+             untimed before every call, or None, like: [(name, func, setup)]
+    :rtype: list
+    """
+    skulpt_days, log_entries, program_days = SIZES[size]
+
+    skulpt_csv = os.path.join(workdir, "skulpt.csv")
+    first, last = make_skulpt_csv(skulpt_csv, skulpt_days)
+    middle = first + (last - first) / 2
+
+    weight_log = os.path.join(workdir, "weight_log.jsonl")
+    make_weight_log(weight_log, log_entries)
+    legacy_log = os.path.join(workdir, "weight_log.json")
+    make_weight_log(legacy_log, log_entries)
+    binary_log = os.path.join(workdir, "weight_log.wlog")
+    make_weight_log(binary_log, log_entries)
+
+    # untouched copies the update benchmarks restore their logs from
+    for filepath in (weight_log, legacy_log, binary_log):
+        shutil.copyfile(filepath, filepath + ".orig")
+
+    program_start = datetime.datetime(2018, 3, 5)
+    program_end = program_start + datetime.timedelta(days=program_days)
+
+    def get_body_fat_data():
+        skulpt.get_body_fat_data(skulpt_csv)
+
+    def get_body_fat():
+        skulpt.get_body_fat(middle.year, middle.month, middle.day, skulpt_csv)
+
+    def clear_index_cache():
+        # measure the persistent index rather than this process's copy of it
+        skulpt._INDEX_CACHE.clear()
+
+    def restore_logs():
+        for filepath in (weight_log, legacy_log, binary_log):
+            shutil.copyfile(filepath + ".orig", filepath)
+
+    def update_weight_log():
+        bodyweight.update_weight_log(180, 85.0, 35, 15.0, outputfile=weight_log)
+
+    def update_weight_log_legacy():
+        bodyweight.update_weight_log(180, 85.0, 35, 15.0, outputfile=legacy_log)
+
+    def update_weight_log_binary():
+        bodyweight.update_weight_log(180, 85.0, 35, 15.0, outputfile=binary_log)
+
+    def load_columns():
+        weightlog.load_columns(weight_log)
+
+    def load_columns_binary():
+        weightlog.load_columns(binary_log)
+
+    def get_weight_data():
+        bodyweight.get_weight_data(180, 85.0, 35, 15.0, True, None, 1.35)
+
+    def goal_macros():
+        bodyweight.goal_macros(85.0)
+
+    def print_program():
+        with contextlib.redirect_stdout(io.StringIO()):
+            program.print_program(program_start, program_end, program.PROGRAMS["default"])
+
+    def weight_log_document():
+        # the rendering behind ui.bodyweight_ui.getWeightLogDocument,
+        # which only adds a PyQt5 import
+        report.weight_log_document(180, 85.0, 35, 15.0, True, None, 1.35)
+
+    # build the index once so get_body_fat times lookups, not the first build
+    get_body_fat()
+
+    return [
+        ("get_body_fat_data", get_body_fat_data, None),
+        ("get_body_fat", get_body_fat, clear_index_cache),
+        ("update_weight_log", update_weight_log, restore_logs),
+        ("update_weight_log_legacy", update_weight_log_legacy, restore_logs),
+        ("update_weight_log_binary", update_weight_log_binary, restore_logs),
+        ("load_columns", load_columns, None),
+        ("load_columns_binary", load_columns_binary, None),
+        ("get_weight_data", get_weight_data, None),
+        ("goal_macros", goal_macros, None),
+        ("print_program", print_program, None),
+        ("weight_log_document", weight_log_document, None),
+    ]
+
+
+def _time_calls(func, setup, number):
+    """
+    Returns the time taken by number calls of func, running setup untimed
+    before each call
+
+    :param func: function to time
+    :type func: callable
+    :param setup: function to run before every call
+    :type setup: callable
+    :param number: number of calls
+    :type number: int
+    :return: seconds spent in func
+    :rtype: float
+    """
+    total = 0.0
+    for _ in range(number):
+        setup()
+        start = time.perf_counter()
+        func()
+        total += time.perf_counter() - start
+    return total
+
+
+def time_benchmark(func, setup=None, repeat=5, min_time=0.2):
+    """
+    Times a benchmark function, calling it enough times per repetition for
+    each repetition to take at least min_time seconds
+
+    :param func: function to time
+    :type func: callable
+    :param setup: function run untimed before every call, e.g. to reset the
+                  data func changes, None for no setup
+    :type setup: callable, None
+    :param repeat: number of timed repetitions
+    :type repeat: int
+    :param min_time: minimum duration of a repetition in seconds
+    :type min_time: float
+    :return: timings like: {"best": seconds, "median": seconds, "number": calls}
+    :rtype: dict
+    """
+    if setup is None:
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        number = max(1, int(number * min_time / 0.2))
+        timings = sorted(t / number for t in timer.repeat(repeat=repeat, number=number))
+    else:
+        # calls are timed one by one around their setup, see _time_calls
+        number = 1
+        while True:
+            elapsed = _time_calls(func, setup, number)
+            if elapsed >= min_time or number >= 1000000:
+                break
+            number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+        timings = sorted(_time_calls(func, setup, number) / number for _ in range(repeat))
+    return {
+        "best": timings[0],
+        "median": timings[len(timings) // 2],
+        "number": number
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the benchmarks which are slower than their baseline
+
+    :param results: benchmark results by name
+    :type results: dict
+    :param baseline: baseline benchmark results by name
+    :type baseline: dict
+    :param tolerance: allowed slow down, e.g. 0.25 for 25%
+    :type tolerance: float
+    :return: regressions like: [(name, baseline_seconds, seconds)]
+    :rtype: list
+    """
+    regressions = []
+    for name, timing in sorted(results.items()):
+        if name not in baseline:
+            continue
+        expected = baseline[name]["best"]
+        if timing["best"] > expected * (1.0 + tolerance):
+            regressions.append((name, expected, timing["best"]))
+    return regressions
+
+
+# ==============================================================================
+# main
+# ==============================================================================
+def main():
+    """
+    Command line entry point function
+
+    :return: n/a
+    :rvalue: n/a
+    """
+    # define argument parser
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(__file__),
+        formatter_class=argparse.RawTextHelpFormatter,
+        description=DESCRIPTION
+    )
+
+    parser.add_argument(
+        "-s", "--size",
+        action="store",
+        default="full",
+        choices=sorted(SIZES),
+        help="synthetic data set size"
+    )
+    parser.add_argument(
+        "-k", "--filter",
+        action="store",
+        default="",
+        type=str,
+        help="only run benchmarks whose name contains this text",
+        metavar=""
+    )
+    parser.add_argument(
+        "-o", "--outputfile",
+        action="store",
+        default=None,
+        type=str,
+        help="write the JSON results to this file instead of stdout",
+        metavar=""
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store",
+        default=None,
+        type=str,
+        help="store the results as the baseline in this file",
+        metavar=""
+    )
+    parser.add_argument(
+        "--baseline",
+        action="store",
+        default=None,
+        type=str,
+        help="compare the results against the baseline in this file",
+        metavar=""
+    )
+    parser.add_argument(
+        "--tolerance",
+        action="store",
+        default=0.25,
+        type=float,
+        help="allowed slow down relative to the baseline (default: 0.25)",
+        metavar=""
+    )
+
+    # pares arguments
+    args = parser.parse_args()
+
+    # run benchmarks
+    workdir = tempfile.mkdtemp(prefix="fitness_benchmark_")
+    results = {}
+    try:
+        for name, func, setup in build_benchmarks(workdir, args.size):
+            if args.filter not in name:
+                continue
+            results[name] = time_benchmark(func, setup)
+            sys.stderr.write("{:<28} {:>12.3f}us\n".format(name, results[name]["best"] * 1e6))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    document = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": args.size,
+        "results": results
+    }
+    text = json.dumps(document, indent=4, sort_keys=True)
+    if args.outputfile:
+        with open(args.outputfile, "w") as outfile:
+            outfile.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as outfile:
+            outfile.write(text + "\n")
+
+    # compare against baseline
+    if args.baseline:
+        with open(args.baseline, "r") as infile:
+            baseline = json.load(infile)
+        if baseline.get("size") != args.size:
+            sys.stderr.write("baseline was recorded with size '{}'\n".format(baseline.get("size")))
+
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for name, expected, actual in regressions:
+            sys.stderr.write("REGRESSION {}: {:.3f}us -> {:.3f}us ({:+.0%})\n".format(
+                name, expected * 1e6, actual * 1e6, actual / expected - 1.0
+            ))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
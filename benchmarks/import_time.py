@@ -0,0 +1,187 @@
+#! /usr/bin/python
+"""
+import_time.py
+
+Description:
+    Import time guard for the fitness package.
+
+    Every module is imported in a fresh interpreter with python -X importtime
+    and its cumulative import time is checked against a budget. Modules which
+    must only ever be loaded lazily, like PyQt5 and numpy, fail the check if
+    any import path pulls them in.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget 10 fitness.skulpt
+"""
+# Python standard libraries
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+DESCRIPTION = """
+Measures the import time of fitness modules with python -X importtime and
+fails when a module is slower than the budget or eagerly imports a heavy
+dependency.
+"""
+
+PYTHON_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "python")
+MODULES = (
+    "fitness.bodyweight",
+    "fitness.conversions",
+    "fitness.fileutils",
+    "fitness.program",
+    "fitness.report",
+    "fitness.settings",
+    "fitness.skulpt",
+    "fitness.skulpt_ingest",
+    "fitness.stats",
+    "fitness.ui",
+    "fitness.weightlog",
+    "fitness.workout",
+)
+FORBIDDEN = ("PyQt5", "numpy")
+BUDGET_MS = 15.0
+REPEAT = 5
+
+
+# ==============================================================================
+# general
+# ==============================================================================
+def import_profile(module):
+    """
+    Imports a module in a fresh interpreter and returns the import time of it
+    and of everything it imported
+
+    :param module: dotted module name
+    :type module: string
+    :return: cumulative import time in microseconds by module name
+    :rtype: dict
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PYTHON_ROOT, env.get("PYTHONPATH")]))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+    )
+    if process.returncode:
+        raise RuntimeError("Cannot import {}:\n{}".format(module, process.stderr))
+
+    # lines look like: "import time:  self [us] | cumulative | imported package"
+    profile = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            profile[fields[2].strip()] = int(fields[1])
+        except (IndexError, ValueError):
+            continue
+    return profile
+
+
+def measure(module, repeat=REPEAT):
+    """
+    Returns the best import time of a module over several fresh interpreters
+    and the forbidden modules it imports
+
+    :param module: dotted module name
+    :type module: string
+    :param repeat: number of interpreters to import the module in
+    :type repeat: int
+    :return: result like: {"ms": float, "forbidden": [name, ...]}
+    :rtype: dict
+    """
+    best = None
+    forbidden = []
+    for _ in range(repeat):
+        profile = import_profile(module)
+        forbidden = sorted(
+            name for name in profile if name.split(".")[0] in FORBIDDEN
+        )
+        if module in profile and (best is None or profile[module] < best):
+            best = profile[module]
+    return {"ms": (best or 0) / 1000.0, "forbidden": forbidden}
+
+
+# ==============================================================================
+# main
+# ==============================================================================
+def main():
+    """
+    Command line entry point function
+
+    :return: n/a
+    :rvalue: n/a
+    """
+    # define argument parser
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(__file__),
+        formatter_class=argparse.RawTextHelpFormatter,
+        description=DESCRIPTION
+    )
+
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=list(MODULES),
+        help="modules to measure, defaults to every fitness module",
+        metavar="module"
+    )
+    parser.add_argument(
+        "-b", "--budget",
+        action="store",
+        default=BUDGET_MS,
+        type=float,
+        help="maximum import time of a module in milliseconds (default: {})".format(BUDGET_MS),
+        metavar=""
+    )
+    parser.add_argument(
+        "-r", "--repeat",
+        action="store",
+        default=REPEAT,
+        type=int,
+        help="fresh interpreters per module, the best time counts (default: {})".format(REPEAT),
+        metavar=""
+    )
+    parser.add_argument(
+        "-o", "--outputfile",
+        action="store",
+        default=None,
+        type=str,
+        help="also write the JSON results to this file",
+        metavar=""
+    )
+
+    # pares arguments
+    args = parser.parse_args()
+
+    # measure modules
+    results = {}
+    failures = []
+    for module in args.modules:
+        result = results[module] = measure(module, args.repeat)
+        status = "ok"
+        if result["forbidden"]:
+            status = "IMPORTS {}".format(", ".join(result["forbidden"]))
+        elif result["ms"] > args.budget:
+            status = "OVER BUDGET"
+        if status != "ok":
+            failures.append(module)
+        print("{:<28} {:>8.2f}ms  {}".format(module, result["ms"], status))
+
+    if args.outputfile:
+        with open(args.outputfile, "w") as outfile:
+            outfile.write(json.dumps(results, indent=4, sort_keys=True) + "\n")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
 import os
 
 PACKAGE_NAME = "fitness"
-PACKAGE_ROOT = os.path.join(
-    __file__.split(PACKAGE_NAME, 1)[0],
-    PACKAGE_NAME
+PACKAGE_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 )
+CONFIG_ROOT = os.path.join(PACKAGE_ROOT, "configs")
+TEMPLATE_ROOT = os.path.join(PACKAGE_ROOT, "templates")
 
-SETTINGS = os.path.join(PACKAGE_ROOT, "settings.json")
-LOGGING_CONFIG = os.path.join(PACKAGE_ROOT, "logging.cfg")
\ No newline at end of file
+SETTINGS = os.path.join(CONFIG_ROOT, "settings.json")
+LOGGING_CONFIG = os.path.join(CONFIG_ROOT, "logging.cfg")
\ No newline at end of file
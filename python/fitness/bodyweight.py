@@ -7,12 +7,36 @@ Description:
 """
 # Python standard libraries
 import datetime
-import json
-import os
+import itertools
 import time
 
 # local libraries
-from fitness import SETTINGS
+from fitness import settings
+from fitness import weightlog
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+# bmr equation coefficients by sex, used by both the bmr_* and bmr_batch
+# functions below
+#   bmr = (weight * weight_kg) + (height * height_cm) + (age * age)
+#         + (lbm * lean_body_mass_kg) + constant
+BMR_COEFFICIENTS = {
+    'harrisBenedict': {
+        True: (13.7, 5.0, -6.8, 0.0, 66.0),
+        False: (9.6, 1.8, -4.7, 0.0, 655.0)
+    },
+    'mifflinStJeor': {
+        True: (10.0, 6.25, -5.0, 0.0, 5.0),
+        False: (10.0, 6.25, -5.0, 0.0, -161.0)
+    },
+    'katchMcArdle': {
+        True: (0.0, 0.0, 0.0, 21.6, 370.0),
+        False: (0.0, 0.0, 0.0, 21.6, 370.0)
+    }
+}
+WEIGHT_DATA_FIELDS = weightlog.FIELDS
 
 
 # ==============================================================================
@@ -59,7 +83,7 @@ def goal_macros(weight_kg):
     :return: macronutrient grams by goal
     :rtype: dict
     """
-    macro_multipliers = SETTINGS["macro_multipliers"]
+    macro_multipliers = settings.get_settings()["macro_multipliers"]
     data = {}
     for goal in ("cut", "maintain", "bulk"):
         data[goal] = {} 
@@ -89,6 +113,29 @@ def bmi(weight_kg, height_cm):
 # ==============================================================================
 # bmr
 # ==============================================================================
+def _bmr(equation, male, height_cm, weight_kg, age, lbm_kg):
+    """
+    Returns the basal metabolic rate given by one set of BMR_COEFFICIENTS
+
+    :param equation: name of a basal metabolic rate equation
+    :type equation: string
+    :param male: is the calculation being performed for a male?
+    :type male: bool
+    :param height_cm: your height in centimeters
+    :type height_cm: float
+    :param weight_kg: your current weight in kilograms
+    :type weight_kg: float
+    :param age: your age in years
+    :type age: int
+    :param lbm_kg: your lean body mass in kilograms
+    :type lbm_kg: float
+    :return: basal metabolic rate
+    :rtype: float
+    """
+    c_weight, c_height, c_age, c_lbm, c_constant = BMR_COEFFICIENTS[equation][bool(male)]
+    return (c_weight * weight_kg) + (c_height * height_cm) + (c_age * age) + (c_lbm * lbm_kg) + c_constant
+
+
 def bmr_harrisBenedict(height_cm, weight_kg, age, male=True):
     """
     Returns the basal metabolic rate calculated using the Harris-Benedict equation
@@ -104,12 +151,7 @@ def bmr_harrisBenedict(height_cm, weight_kg, age, male=True):
     :return: basal metabolic rate
     :rtype: float
     """
-    if male:
-        bmr = (13.7 * weight_kg) + (5.0 * height_cm) - (6.8 * age) + 66
-    else:
-        bmr = (9.6 * weight_kg) + (1.8 * height_cm) - (4.7 * age) + 655
-
-    return bmr
+    return _bmr('harrisBenedict', male, height_cm, weight_kg, age, 0.0)
 
 
 def bmr_mifflinStJeor(height_cm, weight_kg, age, male=True):
@@ -127,12 +169,7 @@ def bmr_mifflinStJeor(height_cm, weight_kg, age, male=True):
     :return: basal metabolic rate
     :rtype: float
     """
-    if male:
-        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + 5
-    else:
-        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + -161
-
-    return bmr
+    return _bmr('mifflinStJeor', male, height_cm, weight_kg, age, 0.0)
 
 
 def bmr_katchMcArdle(weight_kg, body_fat):
@@ -147,8 +184,7 @@ def bmr_katchMcArdle(weight_kg, body_fat):
     :rtype: float
     """
     leanBodyMass = weight_kg * ((100.00 - body_fat) / 100.00)
-    bmr = (21.6 * leanBodyMass) + 370
-    return bmr
+    return _bmr('katchMcArdle', True, 0.0, weight_kg, 0.0, leanBodyMass)
 
 
 def bmr(height_cm, weight_kg, age, body_fat, male=True, equation=None):
@@ -235,15 +271,15 @@ def get_weight_data(height_cm, weight_kg, age, body_fat, male=True, equation=Non
     lbm_kg = weight_kg * ((100.00 - body_fat) / 100.00)
 
     # calculate basal metabolic rate
-    bmr = bmr(height_cm, weight_kg, age, body_fat, male, equation)
+    bmr_value = bmr(height_cm, weight_kg, age, body_fat, male, equation)
 
     # calculate total daily energy expenditure
-    tdee = bmr * modifier
+    tdee = bmr_value * modifier
 
     return {'weight': weight_kg,
             'bf': body_fat,
             'lbm': lbm_kg,
-            'bmr': bmr,
+            'bmr': bmr_value,
             'activeness': modifier,
             'tdee': tdee}
 
@@ -279,7 +315,9 @@ def update_weight_log(height_cm, weight_kg, age, body_fat, male=True, equation='
                      Adjusts your basal metabolic rate to reflect the number of 
                      calories burned through exercise (total daily energy expenditure)
     :type modifier: float in range 1.0 - 1.50
-    :param outputfile: name of the file to write data out to
+    :param outputfile: name of the file to write data out to. The storage format
+                       is picked from its extension, see fitness.weightlog:
+                       '.jsonl' (append-only) or '.json' (legacy, rewritten whole)
     :type outputfile: string
     :return: today's weight data and the output file name: ({}, "outputfile")
     :rtype: tuple    
@@ -288,23 +326,253 @@ def update_weight_log(height_cm, weight_kg, age, body_fat, male=True, equation='
     if not outputfile:
         raise IOError("No weight record file specified.")
 
-    # get current weight data records
-    data = {}
-    if os.path.isfile(outputfile):
-        with open(outputfile, 'r') as infile:
-            try:
-                data = json.load(infile)
-            except Exception:
-                data = {}
-
-    # update weight data records
-    weight_data = {}
+    # append today's weight data record
+    weight_data = get_weight_data(
+        height_cm, weight_kg, age, body_fat, male, equation, modifier
+    )
     timestamp = time.time()
-    with open(outputfile, 'w') as outfile:
-        weight_data = get_weight_data(
-            height_cm, weight_kg, age, body_fat, male, equation, modifier
-        )
-        data[timestamp] = weight_data
-        json.dump(data, outfile, indent=4)
+    weightlog.open_log(outputfile).append(timestamp, weight_data)
 
     return (weight_data, outputfile)
+
+
+# ==============================================================================
+# batch
+# ==============================================================================
+def _bmr_coefficients(equation, male):
+    """
+    Returns per person bmr equation coefficients, selected by sex
+
+    :param equation: name of a basal metabolic rate equation, or None for
+                     the average of all equations
+    :type equation: string, None
+    :param male: is each calculation being performed for a male?
+    :type male: instance of <class 'numpy.ndarray'>
+    :return: coefficients like: (weight, height, age, lbm, constant)
+    :rtype: tuple of <class 'numpy.ndarray'>
+    """
+    import numpy
+
+    if equation in BMR_COEFFICIENTS:
+        coefficients = BMR_COEFFICIENTS[equation]
+        male_coefficients = coefficients[True]
+        female_coefficients = coefficients[False]
+    else:
+        # the average of linear equations is the equation of averaged coefficients
+        equations = list(BMR_COEFFICIENTS.values())
+        count = float(len(equations))
+        male_coefficients = [sum(c) / count for c in zip(*[e[True] for e in equations])]
+        female_coefficients = [sum(c) / count for c in zip(*[e[False] for e in equations])]
+
+    return tuple(
+        numpy.where(male, m, f) for m, f in zip(male_coefficients, female_coefficients)
+    )
+
+
+def bmr_batch(height_cm, weight_kg, age, body_fat, male=True, equation=None):
+    """
+    Array aware version of bmr: returns the basal metabolic rate of every
+    person described by the given values in a single vectorized pass.
+    Arguments may be scalars, sequences or NumPy arrays and are broadcast
+    against each other. Requires numpy.
+
+    :param height_cm: heights in centimeters
+    :type height_cm: float, sequence, instance of <class 'numpy.ndarray'>
+    :param weight_kg: current weights in kilograms
+    :type weight_kg: float, sequence, instance of <class 'numpy.ndarray'>
+    :param age: ages in years
+    :type age: int, sequence, instance of <class 'numpy.ndarray'>
+    :param body_fat: body fat percentages expressed as integers
+    :type body_fat: int, sequence, instance of <class 'numpy.ndarray'>
+    :param male: is each calculation being performed for a male?
+    :type male: bool, sequence, instance of <class 'numpy.ndarray'>
+    :param equation: name of  basal metabolic rate equation to use.
+                     Must be one of the following:
+                     'harrisBenedict', 'mifflinStJeor', 'katchMcArdle', or None
+                     if None, an average value will be used
+    :type equation: string, None
+    :return: basal metabolic rates
+    :rtype: instance of <class 'numpy.ndarray'>
+    """
+    import numpy
+
+    height_cm, weight_kg, age, body_fat = numpy.broadcast_arrays(
+        *[numpy.asarray(v, dtype=numpy.float64) for v in (height_cm, weight_kg, age, body_fat)]
+    )
+    male = numpy.asarray(male, dtype=bool)
+    lbm_kg = weight_kg * ((100.00 - body_fat) / 100.00)
+
+    c_weight, c_height, c_age, c_lbm, c_constant = _bmr_coefficients(equation, male)
+    return (c_weight * weight_kg) + (c_height * height_cm) + (c_age * age) + (c_lbm * lbm_kg) + c_constant
+
+
+def get_weight_data_batch(height_cm, weight_kg, age, body_fat, male=True, equation=None, modifier=1.2):
+    """
+    Array aware version of get_weight_data: returns the weight data of every
+    person or weigh-in described by the given values as a structured array
+    with one record per person. Arguments are broadcast as in bmr_batch.
+    Requires numpy.
+
+    :param height_cm: heights in centimeters
+    :type height_cm: float, sequence, instance of <class 'numpy.ndarray'>
+    :param weight_kg: current weights in kilograms
+    :type weight_kg: float, sequence, instance of <class 'numpy.ndarray'>
+    :param age: ages in years
+    :type age: int, sequence, instance of <class 'numpy.ndarray'>
+    :param body_fat: body fat percentages expressed as integers
+    :type body_fat: int, sequence, instance of <class 'numpy.ndarray'>
+    :param male: is each calculation being performed for a male?
+    :type male: bool, sequence, instance of <class 'numpy.ndarray'>
+    :param equation: name of  basal metabolic rate equation to use, see bmr_batch
+    :type equation: string, None
+    :param modifier: numbers representing how physically active each person is
+    :type modifier: float, sequence, instance of <class 'numpy.ndarray'>
+    :return: weight management data with the fields of WEIGHT_DATA_FIELDS
+    :rtype: instance of <class 'numpy.ndarray'>
+    """
+    import numpy
+
+    bmr_values = bmr_batch(height_cm, weight_kg, age, body_fat, male, equation)
+    weight_kg, body_fat, modifier, bmr_values = numpy.broadcast_arrays(
+        numpy.asarray(weight_kg, dtype=numpy.float64),
+        numpy.asarray(body_fat, dtype=numpy.float64),
+        numpy.asarray(modifier, dtype=numpy.float64),
+        bmr_values
+    )
+
+    data = numpy.empty(
+        bmr_values.shape,
+        dtype=[(field, numpy.float64) for field in WEIGHT_DATA_FIELDS]
+    )
+    data['weight'] = weight_kg
+    data['bf'] = body_fat
+    data['lbm'] = weight_kg * ((100.00 - body_fat) / 100.00)
+    data['bmr'] = bmr_values
+    data['activeness'] = modifier
+    data['tdee'] = bmr_values * modifier
+    return data
+
+
+def _age_at(birthday, timestamp):
+    """
+    Returns a person's age in whole years at the given time
+
+    :param birthday: the person's date of birth
+    :type birthday: instance of <class 'datetime.date'>
+    :param timestamp: seconds since the epoch
+    :type timestamp: float
+    :return: age in years
+    :rtype: int
+    """
+    date = datetime.date.fromtimestamp(timestamp)
+    age = date.year - birthday.year
+    if (date.month, date.day) < (birthday.month, birthday.day):
+        age -= 1
+    return age
+
+
+def _backfill_entries(entries, height_cm, age, male, equation, modifier, birthday, chunk_size):
+    """
+    Yields the given weight log entries with their derived values recomputed,
+    evaluating chunk_size entries at a time through get_weight_data_batch
+
+    :param entries: timestamp and weight data pairs like: (float, {})
+    :type entries: iterable
+    :param height_cm: height in centimeters
+    :type height_cm: float
+    :param age: age in years, ignored when a birthday is given
+    :type age: int
+    :param male: is the calculation being performed for a male?
+    :type male: bool
+    :param equation: name of  basal metabolic rate equation to use, see bmr
+    :type equation: string, None
+    :param modifier: activity modifier to apply to every record, or None to
+                     keep each record's own activeness
+    :type modifier: float, None
+    :param birthday: date of birth, used instead of age when given
+    :type birthday: instance of <class 'datetime.date'>
+    :param chunk_size: number of records to evaluate per batch
+    :type chunk_size: int
+    :return: timestamp and weight data pairs like: (float, {})
+    :rtype: generator
+    """
+    entries = iter(entries)
+    chunk = list(itertools.islice(entries, chunk_size))
+    while chunk:
+        timestamps = [ts for ts, _ in chunk]
+        weights = [record['weight'] for _, record in chunk]
+        body_fats = [record['bf'] for _, record in chunk]
+
+        modifiers = modifier
+        if modifier is None:
+            modifiers = [record.get('activeness', 1.2) for _, record in chunk]
+
+        ages = age
+        if birthday is not None:
+            ages = [_age_at(birthday, ts) for ts in timestamps]
+
+        data = get_weight_data_batch(
+            height_cm, weights, ages, body_fats, male, equation, modifiers
+        )
+        for timestamp, values in zip(timestamps, data.tolist()):
+            yield timestamp, dict(zip(WEIGHT_DATA_FIELDS, values))
+
+        chunk = list(itertools.islice(entries, chunk_size))
+
+
+def backfill_weight_log(sourcefile, outputfile, height_cm, age=None, male=True, equation='katchMcArdle',
+                        modifier=None, birthday=None, chunk_size=10000):
+    """
+    Recomputes the derived values (lbm, bmr, tdee) of every record in the
+    sourcefile weight log with the given equation and modifier, and atomically
+    writes the results to outputfile. Records are streamed through
+    get_weight_data_batch chunk_size at a time, so memory use does not grow
+    with the size of append-only (.jsonl) logs. outputfile may be the
+    sourcefile itself. Requires numpy.
+
+    Weight logs do not record height, age or sex, so these describe the
+    person the log belongs to. If a birthday is given, each record is
+    computed with the person's age at the time it was recorded.
+
+    :param sourcefile: full path to the weight log to read
+    :type sourcefile: string
+    :param outputfile: full path to the weight log to write
+    :type outputfile: string
+    :param height_cm: height in centimeters
+    :type height_cm: float
+    :param age: age in years, required unless a birthday is given
+    :type age: int
+    :param male: is the calculation being performed for a male?
+    :type male: bool
+    :param equation: name of  basal metabolic rate equation to use, see bmr
+    :type equation: string, None
+    :param modifier: activity modifier to apply to every record, or None to
+                     keep each record's own activeness
+    :type modifier: float, None
+    :param birthday: date of birth, used instead of age when given
+    :type birthday: instance of <class 'datetime.date'>
+    :param chunk_size: number of records to evaluate per batch
+    :type chunk_size: int
+    :return: number of records written and the seconds it took like: (int, float)
+    :rtype: tuple
+    """
+    if age is None and birthday is None:
+        raise ValueError("Backfilling a weight log requires an age or a birthday.")
+
+    count = 0
+
+    def counted(entries):
+        # count records as they stream through to the output log
+        nonlocal count
+        for entry in entries:
+            count += 1
+            yield entry
+
+    start = time.time()
+    source = weightlog.open_log(sourcefile)
+    entries = _backfill_entries(
+        source.entries(), height_cm, age, male, equation, modifier, birthday, chunk_size
+    )
+    weightlog.open_log(outputfile).write(counted(entries))
+
+    return count, time.time() - start
@@ -10,8 +10,8 @@ Imperial Units
         inch
         foot
         yard
-    volume
-        ounce
+    volume (US customary)
+        fluid_ounce
         pint
         quart
         gallon
@@ -21,71 +21,300 @@ Imperial Units
         stone
 Metric Units
     length
-        milimeter
+        millimeter
         centimeter
         meter
     volume
-        mililitres
+        millilitre
         litre
     mass
         gram
         kilogram
+
+    Every unit is registered with its exact size in the base unit of its
+    dimension, as a Fraction, and the factor between every pair of units of a
+    dimension is computed exactly once when the module is imported and only
+    then rounded to a float. convert() looks a pair up in that table and
+    scales by it, so it works equally on a single value, a list or tuple of
+    values, or a whole NumPy array:
+
+        convert(weights_lb, "pound", "kilogram")
+
+    Factors below one are applied by dividing by their inverse, so converting
+    to a larger unit, e.g. feet to yards, rounds once like value / 3.0 rather
+    than twice like value * (1 / 3.0).
 """
+# Python standard libraries
+from fractions import Fraction
 
 
 # ==============================================================================
-# imperial --> imperial
+# constants / globals
 # ==============================================================================
-# length
-inch_to_foot = lambda value: value / 12.0
-inch_to_yard = lambda value: value / 36.0
+UNITS = {
+    # name: (dimension, size in the dimension's base unit)
+    # length, in meters
+    "inch": ("length", Fraction("0.0254")),
+    "foot": ("length", Fraction("0.3048")),
+    "yard": ("length", Fraction("0.9144")),
+    "millimeter": ("length", Fraction("0.001")),
+    "centimeter": ("length", Fraction("0.01")),
+    "meter": ("length", Fraction("1.0")),
+
+    # volume, in litres
+    "fluid_ounce": ("volume", Fraction("0.0295735295625")),
+    "pint": ("volume", Fraction("0.473176473")),
+    "quart": ("volume", Fraction("0.946352946")),
+    "gallon": ("volume", Fraction("3.785411784")),
+    "millilitre": ("volume", Fraction("0.001")),
+    "litre": ("volume", Fraction("1.0")),
+
+    # mass, in kilograms
+    "ounce": ("mass", Fraction("0.028349523125")),
+    "pound": ("mass", Fraction("0.45359237")),
+    "stone": ("mass", Fraction("6.35029318")),
+    "gram": ("mass", Fraction("0.001")),
+    "kilogram": ("mass", Fraction("1.0")),
+}
 
-foot_to_inch = lambda value: value * 12.0
-foot_to_yard = lambda value: value / 3.0
+ALIASES = {
+    "in": "inch",
+    "ft": "foot",
+    "yd": "yard",
+    "mm": "millimeter",
+    "cm": "centimeter",
+    "m": "meter",
+    "fl oz": "fluid_ounce",
+    "pt": "pint",
+    "qt": "quart",
+    "gal": "gallon",
+    "ml": "millilitre",
+    "l": "litre",
+    "oz": "ounce",
+    "lb": "pound",
+    "st": "stone",
+    "g": "gram",
+    "kg": "kilogram",
+}
 
-yard_to_foot = lambda value: value * 3.0
-yard_to_inch = lambda value: value * 36.00
+FACTORS = {}
+_SCALES = {}
 
-# volume
-ounce_to_pint = lambda value: value * 0.0625
-ounce_to_quart = lambda value: value * 0.03125
-ounce_to_gallon = lambda value: value * 0.0078125
 
-pint_to_ounce = lambda value: value * 16.00
-pint_to_quart = lambda value: value * 0.5
-pint_to_gallon = lambda value: value * 0.125
+# ==============================================================================
+# general
+# ==============================================================================
+def register_unit(name, dimension, size):
+    """
+    Adds a unit to the registry and computes its conversion factors to and
+    from every other unit of the same dimension
 
-quart_to_ounce = lambda value: value * 32.0
-quart_to_pint = lambda value: value * 2.0
-quart_to_gallon = lambda value: value * 0.25
+    :param name: name of the unit
+    :type name: string
+    :param dimension: what the unit measures, e.g. "length"
+    :type dimension: string
+    :param size: size of the unit in the base unit of its dimension, exact
+                 when given as a Fraction, an int or a decimal string like
+                 "0.3048"
+    :type size: <class 'fractions.Fraction'>, int, string
+    :return: n/a
+    :rtype: n/a
+    """
+    size = Fraction(size)
+    UNITS[name] = (dimension, size)
+    for other, (other_dimension, other_size) in UNITS.items():
+        if other_dimension != dimension:
+            continue
+        _set_factor(name, other, size / other_size)
+        _set_factor(other, name, other_size / size)
 
-gallon_to_ounce = lambda value: value * 128.0
-gallon_to_pint = lambda value: value * 8.0
-gallon_to_quart = lambda value: value * 4.0
 
+def _set_factor(source, destination, ratio):
+    """
+    Stores the conversion factor of a pair of units, see FACTORS and _SCALES
 
-# mass
+    :param source: unit to convert from
+    :type source: string
+    :param destination: unit to convert to
+    :type destination: string
+    :param ratio: exact size of source in destination units
+    :type ratio: <class 'fractions.Fraction'>
+    :return: n/a
+    :rtype: n/a
+    """
+    FACTORS[(source, destination)] = float(ratio)
+    if ratio >= 1:
+        _SCALES[(source, destination)] = (float(ratio), False)
+    else:
+        _SCALES[(source, destination)] = (float(1 / ratio), True)
+
+
+def _unit_name(unit):
+    """
+    Returns the registered name of the given unit name or abbreviation
+
+    :param unit: unit name or abbreviation, see UNITS and ALIASES
+    :type unit: string
+    :return: registered unit name
+    :rtype: string
+    """
+    name = ALIASES.get(unit, unit)
+    if name not in UNITS:
+        raise ValueError("Unknown unit: {}".format(unit))
+    return name
+
+
+def _scale(value, number, divide=False):
+    """
+    Multiplies or divides a value, or every item of a list or tuple, by the
+    given number
+
+    :param value: value(s) to scale
+    :type value: float, list, tuple or numpy.ndarray
+    :param number: number to multiply or divide by
+    :type number: float
+    :param divide: divide by number rather than multiply
+    :type divide: bool
+    :return: the scaled value(s)
+    :rtype: same as value
+    """
+    if isinstance(value, (list, tuple)):
+        if divide:
+            return type(value)([item / number for item in value])
+        return type(value)([item * number for item in value])
+    if divide:
+        return value / number
+    return value * number
+
+
+def _pair(source, destination):
+    """
+    Returns the registered names of a pair of units of the same dimension
+
+    :param source: unit to convert from, see UNITS and ALIASES
+    :type source: string
+    :param destination: unit to convert to, see UNITS and ALIASES
+    :type destination: string
+    :return: unit names like: (source, destination)
+    :rtype: tuple
+    """
+    pair = (_unit_name(source), _unit_name(destination))
+    if pair not in FACTORS:
+        msg = "Cannot convert {} ({}) to {} ({})".format(
+            pair[0], UNITS[pair[0]][0], pair[1], UNITS[pair[1]][0]
+        )
+        raise ValueError(msg)
+    return pair
+
+
+def factor(source, destination):
+    """
+    Returns the number source values are multiplied by to express them in
+    the destination unit
+
+    :param source: unit to convert from, see UNITS and ALIASES
+    :type source: string
+    :param destination: unit to convert to, see UNITS and ALIASES
+    :type destination: string
+    :return: conversion factor
+    :rtype: float
+    """
+    return FACTORS[_pair(source, destination)]
+
+
+def convert(value, source, destination):
+    """
+    Converts a value, or many values at once, from one unit to another.
+    Lists and tuples are returned as a new list or tuple. Anything else is
+    multiplied by the conversion factor directly, so a NumPy array is
+    converted in a single vectorized operation.
+
+    :param value: value(s) to convert
+    :type value: float, list, tuple or numpy.ndarray
+    :param source: unit to convert from, see UNITS and ALIASES
+    :type source: string
+    :param destination: unit to convert to, see UNITS and ALIASES
+    :type destination: string
+    :return: the converted value(s)
+    :rtype: same as value
+    """
+    return _scale(value, *_SCALES[_pair(source, destination)])
+
+
+def converter(source, destination):
+    """
+    Returns a function converting values from one unit to another, see
+    convert
+
+    :param source: unit to convert from, see UNITS and ALIASES
+    :type source: string
+    :param destination: unit to convert to, see UNITS and ALIASES
+    :type destination: string
+    :return: conversion function taking the value(s) to convert
+    :rtype: function
+    """
+    number, divide = _SCALES[_pair(source, destination)]
+
+    def _convert(value):
+        return _scale(value, number, divide)
+
+    _convert.__name__ = "{}_to_{}".format(_unit_name(source), _unit_name(destination))
+    return _convert
+
+
+for _name, (_dimension, _size) in list(UNITS.items()):
+    register_unit(_name, _dimension, _size)
+del _name, _dimension, _size
 
 
 # ==============================================================================
-# imperial --> metric
+# imperial --> imperial
 # ==============================================================================
-inch_to_centimeter = lambda value: value * 2.54
-centimeter_to_inch = lambda value: value / 2.54
+# length
+inch_to_foot = converter("inch", "foot")
+inch_to_yard = converter("inch", "yard")
+
+foot_to_inch = converter("foot", "inch")
+foot_to_yard = converter("foot", "yard")
+
+yard_to_foot = converter("yard", "foot")
+yard_to_inch = converter("yard", "inch")
+
+# volume, the ounce here is the fluid ounce
+ounce_to_pint = converter("fluid_ounce", "pint")
+ounce_to_quart = converter("fluid_ounce", "quart")
+ounce_to_gallon = converter("fluid_ounce", "gallon")
+
+pint_to_ounce = converter("pint", "fluid_ounce")
+pint_to_quart = converter("pint", "quart")
+pint_to_gallon = converter("pint", "gallon")
+
+quart_to_ounce = converter("quart", "fluid_ounce")
+quart_to_pint = converter("quart", "pint")
+quart_to_gallon = converter("quart", "gallon")
+
+gallon_to_ounce = converter("gallon", "fluid_ounce")
+gallon_to_pint = converter("gallon", "pint")
+gallon_to_quart = converter("gallon", "quart")
+
+# mass
+ounce_to_pound = converter("ounce", "pound")
+pound_to_ounce = converter("pound", "ounce")
+pound_to_stone = converter("pound", "stone")
+stone_to_pound = converter("stone", "pound")
 
 
 # ==============================================================================
-# weight
+# imperial --> metric
 # ==============================================================================
-ounce_to_gram = lambda value: value * 28.0
-gram_to_ounce = lambda value: value / 28.0
-pound_to_kilogram = lambda value: value * 0.454
-kilogram_to_pound = lambda value: value / 0.454
+inch_to_centimeter = converter("inch", "centimeter")
+centimeter_to_inch = converter("centimeter", "inch")
 
 
 # ==============================================================================
-# classes
+# weight
 # ==============================================================================
-value = 64
-source_type = "inch"
-destination_type = "centimeter"
+ounce_to_gram = converter("ounce", "gram")
+gram_to_ounce = converter("gram", "ounce")
+pound_to_kilogram = converter("pound", "kilogram")
+kilogram_to_pound = converter("kilogram", "pound")
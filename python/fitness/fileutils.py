@@ -0,0 +1,79 @@
+"""
+fileutils.py
+
+Description:
+    Tools and utilities for safely reading and writing the data files managed
+    by this package
+"""
+# Python standard libraries
+import os
+import stat
+
+
+# ==============================================================================
+# general
+# ==============================================================================
+def _fsync_directory(dirpath):
+    """
+    Flushes a directory entry to disk so that renames within it are durable
+
+    :param dirpath: full path to the directory to flush
+    :type dirpath: string
+    :return: n/a
+    :rtype: n/a
+    """
+    try:
+        fd = os.open(dirpath, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(filepath, chunks, binary=False):
+    """
+    Writes the given chunks of text to a temporary file next to filepath and
+    renames it over filepath once everything has been flushed to disk. Readers
+    only ever see the old file or the complete new one.
+
+    :param filepath: full path to the file to write
+    :type filepath: string
+    :param chunks: strings to write out in order
+    :type chunks: iterable
+    :param binary: whether the chunks are bytes rather than text
+    :type binary: bool
+    :return: n/a
+    :rtype: n/a
+    """
+    # tempfile pulls in random and shutil, keep it off the import path of
+    # tools which never write
+    import tempfile
+
+    dirpath = os.path.dirname(os.path.abspath(filepath))
+    fd, temppath = tempfile.mkstemp(
+        prefix=".{}.".format(os.path.basename(filepath)),
+        dir=dirpath
+    )
+    try:
+        mode = 0o644
+        if os.path.exists(filepath):
+            mode = stat.S_IMODE(os.stat(filepath).st_mode)
+        os.chmod(temppath, mode)
+
+        with os.fdopen(fd, "wb" if binary else "w") as outfile:
+            for chunk in chunks:
+                outfile.write(chunk)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(temppath, filepath)
+    except BaseException:
+        if os.path.exists(temppath):
+            os.remove(temppath)
+        raise
+
+    _fsync_directory(dirpath)
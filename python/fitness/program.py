@@ -5,12 +5,33 @@ Description:
     Tools and utilities for managing various workout programs
 """
 # Python standard libraries
+import bisect
+import collections
+import csv
 import datetime
+import io
+import itertools
+import os
+import time
+
+# local libraries
+from fitness.fileutils import atomic_write
 
 
 # ==============================================================================
 # constnts/globals
 # ==============================================================================
+EXPORT_CHUNK_SIZE = 512
+ICAL_EVENT = (
+    "BEGIN:VEVENT\r\n"
+    "UID:%s-%s@fitness\r\n"
+    "DTSTAMP:%s\r\n"
+    "DTSTART;VALUE=DATE:%s\r\n"
+    "DTEND;VALUE=DATE:%s\r\n"
+    "SUMMARY:[%s] %s\r\n"
+    "END:VEVENT\r\n"
+)
+
 PROGRAMS = {
     "bls" : (
         "normal",
@@ -40,11 +61,37 @@ PROGRAMS = {
         ("deload", ("shoulders", "back", "chest", "legs", "arms", "rest", "rest"))
     )
 }
+# workout days of programs given as bare week types, like "bls"
+DEFAULT_DAYS = PROGRAMS["default"][0][1]
 
 
 # ==============================================================================
 # general
 # ==============================================================================
+def _normalize_week(week, days=None):
+    """
+    Returns a mesocycle week as a (week_type, days) pair
+
+    :param week: a week like: ("normal", ("shoulders", ..., "rest")) or "normal"
+    :type week: tuple, string
+    :param days: workout types used for weeks given as a bare week type
+    :type days: tuple
+    :return: week like: (week_type, days)
+    :rtype: tuple
+    """
+    if isinstance(week, str):
+        if not days:
+            msg = "No workout days defined for week type: {}".format(week)
+            raise ValueError(msg)
+        return week, tuple(days)
+
+    week_type, week_days = week
+    if not week_days:
+        msg = "No workout days defined for week type: {}".format(week_type)
+        raise ValueError(msg)
+    return week_type, tuple(week_days)
+
+
 def print_program(start, end, mesocycle, date_format="[%a] %m/%d/%Y"):
     """
     Displays a week by breakdown of an exercise program
@@ -59,30 +106,451 @@ def print_program(start, end, mesocycle, date_format="[%a] %m/%d/%Y"):
     :rtype: n/a
     """
     duration = end - start
-    num_weeks = duration.days / 7
+    num_weeks = duration.days // 7
 
-    # get the number of weeks in the mesocycle
-    meso_length = len(mesocycle)
-    delta_week = datetime.timedelta(days=7)
-    delta_day = datetime.timedelta(days=1)
+    # get the schedule of the whole weeks within the date range
+    schedule = Schedule(start, mesocycle)
+    last_week = len(schedule.mesocycle) - 1
+    schedule_end = start + datetime.timedelta(days=schedule.week_offset(num_weeks))
 
     # display information
     print("-" * 80)
-    for i in range(num_weeks):
-        index = divmod(i, meso_length)[1]
-        week_type, days = mesocycle[index]
-        for workout_type in days:
-            date_str = start.strftime(date_format)
-            line = "{}: [{}] {}".format(date_str, week_type, workout_type)
-            print(line)
-            start = start + delta_day
-        print("-" * 80)
-        if index == (meso_length - 1):
-            print(" ** ")
+    for entry in schedule.entries(end=schedule_end):
+        date_str = entry.date.strftime(date_format)
+        line = "{}: [{}] {}".format(date_str, entry.week_type, entry.workout_type)
+        print(line)
+        if entry.day == len(schedule.mesocycle[entry.week][1]) - 1:
             print("-" * 80)
-        
+            if entry.week == last_week:
+                print(" ** ")
+                print("-" * 80)
+
+
+# ==============================================================================
+# export
+# ==============================================================================
+def _ical_text(value):
+    """
+    Escapes a value for use as iCalendar TEXT (RFC 5545 3.3.11)
+
+    :param value: text like: Jane, Doe
+    :type value: string
+    :return: escaped text like: Jane\\, Doe
+    :rtype: string
+    """
+    value = value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+    return value.replace("\r\n", "\\n").replace("\n", "\\n").replace("\r", "\\n")
+
+
+def _chunked(entries, size=EXPORT_CHUNK_SIZE):
+    """
+    Groups schedule entries into lists of up to size entries
+
+    :param entries: schedule entries
+    :type entries: iterable
+    :param size: number of entries per chunk
+    :type size: int
+    :return: chunks of entries
+    :rtype: generator of list
+    """
+    entries = iter(entries)
+    chunk = list(itertools.islice(entries, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(entries, size))
+
+
+def _ical_chunks(entries, name):
+    """
+    Yields an iCalendar document of all day events, one text chunk per
+    EXPORT_CHUNK_SIZE entries
+
+    :param entries: schedule entries
+    :type entries: iterable of <class 'ScheduleEntry'>
+    :param name: athlete name, used in the calendar name and event ids
+    :type name: string
+    :return: text chunks
+    :rtype: generator of string
+    """
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    one_day = datetime.timedelta(days=1)
+    name = _ical_text(name)
+    yield "\r\n".join((
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//fitness//program//EN",
+        "X-WR-CALNAME:{}".format(name),
+        ""
+    ))
+    for chunk in _chunked(entries):
+        events = []
+        for entry in chunk:
+            date = entry.date.isoformat()[:10].replace("-", "")
+            end = (entry.date + one_day).isoformat()[:10].replace("-", "")
+            events.append(ICAL_EVENT % (
+                name, date, stamp, date, end,
+                _ical_text(entry.week_type), _ical_text(entry.workout_type)
+            ))
+        yield "".join(events)
+    yield "END:VCALENDAR\r\n"
+
+
+def _csv_chunks(entries, name):
+    """
+    Yields a csv document of the schedule, one text chunk per
+    EXPORT_CHUNK_SIZE entries
+
+    :param entries: schedule entries
+    :type entries: iterable of <class 'ScheduleEntry'>
+    :param name: athlete name, written in the first column
+    :type name: string
+    :return: text chunks
+    :rtype: generator of string
+    """
+    yield "athlete,date,week_type,workout_type\n"
+    for chunk in _chunked(entries):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerows(
+            (name, entry.date.isoformat()[:10], entry.week_type, entry.workout_type)
+            for entry in chunk
+        )
+        yield buffer.getvalue()
+
+
+CALENDAR_FORMATS = {
+    ".ics": _ical_chunks,
+    ".csv": _csv_chunks
+}
+
+
+def write_calendar(schedule, filepath, name=None, start=None, end=None):
+    """
+    Streams a schedule to an iCalendar (.ics) or csv (.csv) file, picking the
+    format from the file extension. Entries are written in buffered chunks and
+    the file is replaced atomically once complete.
+
+    :param schedule: the schedule to export
+    :type schedule: instance of <class 'Schedule'>
+    :param filepath: full path to the calendar file to write
+    :type filepath: string
+    :param name: athlete name, defaults to the file name
+    :type name: string
+    :param start: first date to export, defaults to the program start
+    :type start: instance of <class 'datetime.date'>
+    :param end: date to stop at (exclusive), defaults to the program end
+    :type end: instance of <class 'datetime.date'>
+    :return: n/a
+    :rtype: n/a
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    try:
+        chunks = CALENDAR_FORMATS[extension]
+    except KeyError:
+        msg = "Unsupported calendar format: {}".format(extension)
+        raise ValueError(msg)
+
+    if name is None:
+        name = os.path.splitext(os.path.basename(filepath))[0]
+    atomic_write(filepath, chunks(schedule.entries(start, end), name))
+
+
+def _program_error(program):
+    """
+    Returns why a program cannot be exported, or None if it can
+
+    :param program: a key of PROGRAMS
+    :type program: string
+    :return: error message or None
+    :rtype: string, None
+    """
+    if program not in PROGRAMS:
+        return "Unknown program: {}".format(program)
+    try:
+        Schedule(datetime.date.today(), PROGRAMS[program], days=DEFAULT_DAYS)
+    except ValueError as error:
+        return "Invalid program {}: {}".format(program, error)
+    return None
+
+
+def _export_athlete(job):
+    """
+    Writes the calendar files of one athlete. Runs in a worker process.
+
+    :param job: (name, start, program, end, outputdir, extensions)
+    :type job: tuple
+    :return: athlete name, number of files written and error message or None
+             like: ("name", 2, None)
+    :rtype: tuple
+    """
+    name, start, program, end, outputdir, extensions = job
+    written = 0
+    try:
+        schedule = Schedule(start, PROGRAMS[program], end=end, days=DEFAULT_DAYS)
+        basename = name.replace(os.sep, "_")
+        for extension in extensions:
+            filepath = os.path.join(outputdir, basename + extension)
+            write_calendar(schedule, filepath, name=name)
+            written += 1
+    except Exception as error:
+        return name, written, "{}: {}".format(type(error).__name__, error)
+    return name, written, None
+
+
+def export_calendars(athletes, outputdir, end, extensions=(".ics", ".csv"), workers=None, progress=None):
+    """
+    Exports the training calendars of many athletes, each starting their
+    program on their own date, across a pool of worker processes. Every
+    athlete gets one <outputdir>/<name><extension> file per extension.
+    Programs given as bare week types get DEFAULT_DAYS as their workout days.
+
+    Athletes whose program is unknown or invalid are reported as failed
+    without being exported, and an athlete whose export fails does not stop
+    the others.
+
+    :param athletes: athletes like: [(name, start), (name, start, program), ...]
+                     where program is a key of PROGRAMS, "default" if omitted
+    :type athletes: iterable
+    :param outputdir: full path to the directory to write calendars to
+    :type outputdir: string
+    :param end: date every calendar stops at (exclusive)
+    :type end: instance of <class 'datetime.date'>
+    :param extensions: calendar formats to write, see CALENDAR_FORMATS
+    :type extensions: tuple
+    :param workers: number of worker processes, defaults to the CPU count
+    :type workers: int
+    :param progress: called as progress(done, name) as each athlete finishes
+    :type progress: callable
+    :return: number of calendar files written and the athletes which failed
+             like: (int, [(name, error), ...])
+    :rtype: tuple
+    """
+    from concurrent import futures
+
+    for extension in extensions:
+        if extension not in CALENDAR_FORMATS:
+            msg = "Unsupported calendar format: {}".format(extension)
+            raise ValueError(msg)
+
+    if not os.path.isdir(outputdir):
+        os.makedirs(outputdir)
+
+    # check every program before any work is handed out
+    done = 0
+    failed = []
+    errors = {}
+    jobs = []
+    for athlete in athletes:
+        name, start = athlete[:2]
+        program = athlete[2] if len(athlete) > 2 else "default"
+        if program not in errors:
+            errors[program] = _program_error(program)
+        if errors[program]:
+            failed.append((name, errors[program]))
+            done += 1
+            if progress is not None:
+                progress(done, name)
+            continue
+        jobs.append((name, start, program, end, outputdir, tuple(extensions)))
+
+    written = 0
+    if jobs:
+        with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+            for name, count, error in executor.map(_export_athlete, jobs, chunksize=chunksize):
+                written += count
+                if error:
+                    failed.append((name, error))
+                done += 1
+                if progress is not None:
+                    progress(done, name)
+
+    return written, failed
+
+
+# ==============================================================================
+# classes
+# ==============================================================================
+class ScheduleEntry(collections.namedtuple("ScheduleEntry", "date week_type workout_type week day")):
+    """
+    One scheduled day of an exercise program
+
+    Public Attributes:
+        :attr date: the scheduled date
+        :type date: instance of <class 'datetime.date'>
+        :attr week_type: type of the week like: normal, strength, deload
+        :type week_type: string
+        :attr workout_type: workout scheduled for the day like: back, rest
+        :type workout_type: string
+        :attr week: index of the week within the mesocycle
+        :type week: int
+        :attr day: index of the day within the week
+        :type day: int
+    """
+    __slots__ = ()
+
+
+class Schedule(object):
+    """
+    Lazily generated training calendar repeating a mesocycle from a start date.
+
+    Entries are computed arithmetically from their distance to the start date,
+    so looking up any date costs the same however far into the program it is:
+        schedule = Schedule(start, PROGRAMS["default"])
+        schedule[datetime.date(2030, 1, 1)].workout_type
+
+    Public Attributes:
+        :attr start: first day of the program
+        :type start: instance of <class 'datetime.date'>
+        :attr end: day after the last day of the program, or None if the
+                   program repeats indefinitely
+        :type end: instance of <class 'datetime.date'>, None
+        :attr mesocycle: weeks of the mesocycle like: ((week_type, days), ...)
+        :type mesocycle: tuple
+    """
+    def __init__(self, start, mesocycle, end=None, days=None):
+        """
+        Constructor method
+
+        :param start: program start date
+        :type start: instance of <class 'datetime.date'>
+        :param mesocycle: weeks of the mesocycle, see PROGRAMS
+        :type mesocycle: list, tuple
+        :param end: date the program ends on (exclusive), None for no end
+        :type end: instance of <class 'datetime.date'>
+        :param days: workout types of mesocycle weeks given as a bare week
+                     type, like the "bls" program
+        :type days: list, tuple
+        :return: n/a
+        :rtype: n/a
+        """
+        self._start = start
+        self._end = end
+        self._mesocycle = tuple(_normalize_week(week, days) for week in mesocycle)
+        if not self._mesocycle:
+            raise ValueError("A mesocycle requires at least one week.")
+
+        # day offset of each week's first day within the mesocycle
+        self._week_offsets = [0]
+        for _, week_days in self._mesocycle:
+            self._week_offsets.append(self._week_offsets[-1] + len(week_days))
+        self._cycle_length = self._week_offsets.pop()
+
+    @property
+    def start(self):
+        return self._start
+
+    @property
+    def end(self):
+        return self._end
+
+    @property
+    def mesocycle(self):
+        return self._mesocycle
+
+    def __len__(self):
+        if self._end is None:
+            raise TypeError("Schedules without an end date have no length.")
+        return max(0, self._end.toordinal() - self._start.toordinal())
+
+    def __iter__(self):
+        return self.entries()
+
+    def __contains__(self, date):
+        return self._offset(date) is not None
+
+    def __getitem__(self, date):
+        offset = self._offset(date)
+        if offset is None:
+            msg = "Date is outside of the program: {}".format(date)
+            raise KeyError(msg)
+        return self._entry(offset)
+
+    def _offset(self, date):
+        """
+        Returns the number of days from the program start to the given date
+
+        :param date: date to look up
+        :type date: instance of <class 'datetime.date'>
+        :return: day offset, or None for dates outside of the program
+        :rtype: int, None
+        """
+        offset = date.toordinal() - self._start.toordinal()
+        if offset < 0:
+            return None
+        if self._end is not None and date.toordinal() >= self._end.toordinal():
+            return None
+        return offset
+
+    def _entry(self, offset):
+        """
+        Returns the entry scheduled the given number of days after the start
+
+        :param offset: day offset from the program start
+        :type offset: int
+        :return: the scheduled day
+        :rtype: instance of <class 'ScheduleEntry'>
+        """
+        remainder = offset % self._cycle_length
+        week = bisect.bisect_right(self._week_offsets, remainder) - 1
+        day = remainder - self._week_offsets[week]
+        week_type, week_days = self._mesocycle[week]
+        date = self._start + datetime.timedelta(days=offset)
+        return ScheduleEntry(date, week_type, week_days[day], week, day)
+
+    def week_offset(self, week):
+        """
+        Returns the number of days from the program start to the first day of
+        the given week, counted from the start of the program
+
+        :param week: number of weeks since the program start
+        :type week: int
+        :return: day offset
+        :rtype: int
+        """
+        cycles, week = divmod(week, len(self._mesocycle))
+        return cycles * self._cycle_length + self._week_offsets[week]
+
+    def entries(self, start=None, end=None):
+        """
+        Lazily yields the scheduled days between two dates, without walking
+        the program from its start
+
+        :param start: first date to yield, defaults to the program start
+        :type start: instance of <class 'datetime.date'>
+        :param end: date to stop at (exclusive), defaults to the program end
+        :type end: instance of <class 'datetime.date'>
+        :return: scheduled days in date order
+        :rtype: generator of <class 'ScheduleEntry'>
+        """
+        first = 0
+        if start is not None:
+            first = max(0, start.toordinal() - self._start.toordinal())
+
+        stop = None
+        for limit in (end, self._end):
+            if limit is not None:
+                offset = limit.toordinal() - self._start.toordinal()
+                stop = offset if stop is None else min(stop, offset)
+
+        offsets = itertools.count(first) if stop is None else range(first, stop)
+
+        # locate the first day arithmetically, then walk forward a day at a time
+        first_entry = self._entry(first)
+        date, week, day = first_entry.date, first_entry.week, first_entry.day
+        one_day = datetime.timedelta(days=1)
+        for _ in offsets:
+            week_type, week_days = self._mesocycle[week]
+            yield ScheduleEntry(date, week_type, week_days[day], week, day)
+
+            date += one_day
+            day += 1
+            if day == len(week_days):
+                day = 0
+                week = (week + 1) % len(self._mesocycle)
+
 
 if __name__ == "__main__":
-    start = datetime.datetime(year=2018, month=03, day=05)
+    start = datetime.datetime(year=2018, month=3, day=5)
     end = start + datetime.timedelta(days=365)
     print_program(start, end, PROGRAMS["default"], date_format="[%a] %m/%d/%Y")
@@ -0,0 +1,365 @@
+"""
+report.py
+
+Description:
+    Tools and utilities for rendering weight log reports from the templates
+    in the templates directory
+
+    Templates are str.format documents. Their <style> blocks may use single
+    or doubled braces; either way they are escaped when the template is
+    compiled. Compiled templates are cached by path, modification time and
+    size, so rendering many reports reads and compiles each template once.
+"""
+# Python standard libraries
+import json
+import math
+import os
+import re
+import threading
+import time
+
+# local libraries
+from fitness import TEMPLATE_ROOT
+import fitness.bodyweight as bodyweight
+from fitness.fileutils import atomic_write
+from fitness import settings
+import fitness.skulpt as skulpt
+from fitness import weightlog
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+WEIGHT_LOG_HTML = os.path.join(TEMPLATE_ROOT, "weight_log.html")
+WEIGHT_LOG_TXT = os.path.join(TEMPLATE_ROOT, "weight_log.txt")
+STYLE_BLOCK = re.compile("<style.*?style>", re.DOTALL)
+
+PROFILE_NAME = "profile.json"
+DEFAULT_PROFILE = {"equation": "katchMcArdle"}
+
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+# ==============================================================================
+# general
+# ==============================================================================
+def _escape_style(match):
+    """
+    Escapes the braces of a <style> block so str.format leaves them alone.
+    Blocks which are already escaped are left as they are.
+
+    :param match: a <style> block match
+    :type match: instance of <class 're.Match'>
+    :return: escaped style block
+    :rtype: string
+    """
+    block = match.group(0)
+    block = block.replace("{{", "{").replace("}}", "}")
+    return block.replace("{", "{{").replace("}", "}}")
+
+
+def get_template(filepath):
+    """
+    Returns the compiled template for the given file, compiling it only if it
+    is not cached or the file has changed since it was compiled
+
+    :param filepath: full path to a template file
+    :type filepath: string
+    :return: compiled template
+    :rtype: instance of <class 'Template'>
+    """
+    stat = os.stat(filepath)
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    template = _CACHE.get(filepath)
+    if template is not None and template.file_key == key:
+        return template
+
+    with _LOCK:
+        with open(filepath, "r") as infile:
+            template = Template(infile.read(), key)
+        _CACHE[filepath] = template
+    return template
+
+
+def weight_log_values(height_cm, weight_kg, age, body_fat, male, equation, modifier, precision=None):
+    """
+    Returns the values displayed by the weight log templates
+
+    :param height_cm: your height in centimeters
+    :type height_cm: float
+    :param weight_kg: your current weight in kilograms
+    :type weight_kg: float
+    :param age: your age in years
+    :type age: int
+    :param body_fat: your body fat percentage expressed as an integer
+    :type body_fat: int
+    :param male: is the calculation being performed for a male?
+    :type male: bool
+    :param equation: name of  basal metabolic rate equation to use, see
+                     bodyweight.bmr
+    :type equation: string, None
+    :param modifier: number representing how physically active you are
+    :type modifier: float in range 1.0 - 1.50
+    :param precision: number of digits after the decimal point, defaults to
+                      the "precision" setting
+    :type precision: int
+    :return: template values by field name
+    :rtype: dict
+    """
+    if precision is None:
+        precision = settings.get_settings()["precision"]
+
+    # compute data
+    weight_data = bodyweight.get_weight_data(
+        height_cm, weight_kg, age, body_fat, male, equation, modifier
+    )
+
+    # compute macros data
+    calories = {}
+    for goal, macros in bodyweight.goal_macros(weight_kg).items():
+        calories[goal] = sum(bodyweight.macro_calories(
+            macros["carbohydrate"], macros["fat"], macros["protein"]
+        ))
+
+    return {
+        "weight": round(weight_data["weight"], precision),
+        "weight_units": "kg",
+        "body_fat": round(weight_data["bf"], precision),
+        "lbm": round(weight_data["lbm"], precision),
+        "bmr": round(weight_data["bmr"], precision),
+        "bmr_multiplier": modifier,
+        "tdee": round(weight_data["tdee"], precision),
+        "cut": round(calories["cut"], precision),
+        "maintain": round(calories["maintain"], precision),
+        "bulk": round(calories["bulk"], precision)
+    }
+
+
+def weight_log_document(height_cm, weight_kg, age, body_fat, male, equation, modifier,
+                        template=WEIGHT_LOG_HTML):
+    """
+    Generates a document representing a person's weight log based on the
+    given body metrics
+
+    :param height_cm: your height in centimeters
+    :type height_cm: float
+    :param weight_kg: your current weight in kilograms
+    :type weight_kg: float
+    :param age: your age in years
+    :type age: int
+    :param body_fat: your body fat percentage expressed as an integer
+    :type body_fat: int
+    :param male: is the calculation being performed for a male?
+    :type male: bool
+    :param equation: name of  basal metabolic rate equation to use, see
+                     bodyweight.bmr
+    :type equation: string, None
+    :param modifier: number representing how physically active you are
+    :type modifier: float in range 1.0 - 1.50
+    :param template: full path to the template file to render
+    :type template: string
+    :return: the rendered document
+    :rtype: string
+    """
+    values = weight_log_values(height_cm, weight_kg, age, body_fat, male, equation, modifier)
+    return get_template(template).render(values)
+
+
+# ==============================================================================
+# batch
+# ==============================================================================
+def find_clients(directory):
+    """
+    Returns the client directories found in the given directory. Every
+    subdirectory holding a weight log is a client:
+        <directory>/<client>/weight_log.jsonl   weight log (.jsonl or .json)
+        <directory>/<client>/skulpt.csv         optional Skulpt export
+        <directory>/<client>/profile.json       optional, see load_profile
+
+    :param directory: full path to the directory to search
+    :type directory: string
+    :return: sorted full paths to client directories
+    :rtype: list
+    """
+    clients = []
+    for name in sorted(os.listdir(directory)):
+        client_dir = os.path.join(directory, name)
+        if os.path.isdir(client_dir) and _client_files(client_dir)[0]:
+            clients.append(client_dir)
+    return clients
+
+
+def _client_files(client_dir):
+    """
+    Returns the weight log and Skulpt csv files of a client directory
+
+    :param client_dir: full path to a client directory
+    :type client_dir: string
+    :return: file paths like: (weight_log, skulpt_csv), either may be None
+    :rtype: tuple
+    """
+    weight_log = None
+    skulpt_csv = None
+    for name in sorted(os.listdir(client_dir)):
+        extension = os.path.splitext(name)[1].lower()
+        if name == PROFILE_NAME:
+            continue
+        if extension in weightlog.BACKENDS and weight_log is None:
+            weight_log = os.path.join(client_dir, name)
+        elif extension == ".csv" and skulpt_csv is None:
+            skulpt_csv = os.path.join(client_dir, name)
+    return weight_log, skulpt_csv
+
+
+def load_profile(client_dir):
+    """
+    Returns the client's profile, read from the optional profile.json in the
+    client directory like:
+        {"height_cm": 180.0, "age": 35, "male": true,
+         "equation": "mifflinStJeor", "modifier": 1.35}
+    Weight logs do not record height, age or sex, so clients without a
+    profile are reported with the Katch-McArdle equation, which needs none.
+
+    :param client_dir: full path to a client directory
+    :type client_dir: string
+    :return: profile values
+    :rtype: dict
+    """
+    profile = dict(DEFAULT_PROFILE)
+    profilefile = os.path.join(client_dir, PROFILE_NAME)
+    if os.path.isfile(profilefile):
+        with open(profilefile, "r") as infile:
+            profile.update(json.load(infile))
+    return profile
+
+
+def render_client_report(client_dir, outputdir):
+    """
+    Renders the HTML and text weight log reports of one client from the
+    latest weight log record, read through weightlog.get_columns, using the
+    body fat average of the latest Skulpt scan when the client has a Skulpt
+    export. Client directories are only read: the export is scanned in
+    memory rather than through its persistent date index, which would be
+    written next to it.
+
+    Reports are written to <outputdir>/<client>.html and <client>.txt
+
+    :param client_dir: full path to a client directory, see find_clients
+    :type client_dir: string
+    :param outputdir: full path to the directory to write reports to
+    :type outputdir: string
+    :return: client name, seconds taken and error message or None like:
+             ("client", 0.01, None)
+    :rtype: tuple
+    """
+    start = time.time()
+    client = os.path.basename(os.path.normpath(client_dir))
+    try:
+        weight_log, skulpt_csv = _client_files(client_dir)
+        profile = load_profile(client_dir)
+        rows = weightlog.get_columns(weight_log).latest(1)
+        if not len(rows):
+            raise ValueError("Weight log has no records: {}".format(weight_log))
+        record = rows[0][1]
+
+        body_fat = record["bf"]
+        if skulpt_csv:
+            latest = skulpt.get_body_fat_range(skulpt_csv, last=1)
+            if latest:
+                body_fat = latest[-1].avg
+
+        modifier = profile.get("modifier")
+        if not modifier:
+            # NaN marks a record without an activeness
+            modifier = 1.2 if math.isnan(record["activeness"]) else record["activeness"]
+        values = weight_log_values(
+            profile.get("height_cm"), record["weight"], profile.get("age"),
+            body_fat, profile.get("male", True), profile.get("equation"), modifier
+        )
+        for template, extension in ((WEIGHT_LOG_HTML, ".html"), (WEIGHT_LOG_TXT, ".txt")):
+            document = get_template(template).render(values)
+            atomic_write(os.path.join(outputdir, client + extension), [document])
+    except Exception as error:
+        return client, time.time() - start, "{}: {}".format(type(error).__name__, error)
+
+    return client, time.time() - start, None
+
+
+def render_reports(directory, outputdir, workers=None, progress=None):
+    """
+    Renders the weight log reports of every client in the given directory
+    across a pool of worker processes
+
+    :param directory: full path to a directory of client directories
+    :type directory: string
+    :param outputdir: full path to the directory to write reports to
+    :type outputdir: string
+    :param workers: number of worker processes, defaults to the CPU count
+    :type workers: int
+    :param progress: called as progress(done, total, result) as each client's
+                     reports are finished, see render_client_report
+    :type progress: callable
+    :return: the result of every client, in completion order
+    :rtype: list
+    """
+    from concurrent import futures
+
+    if not os.path.isdir(outputdir):
+        os.makedirs(outputdir)
+
+    clients = find_clients(directory)
+    results = []
+    with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs = [executor.submit(render_client_report, c, outputdir) for c in clients]
+        for job in futures.as_completed(jobs):
+            results.append(job.result())
+            if progress is not None:
+                progress(len(results), len(clients), results[-1])
+
+    return results
+
+
+# ==============================================================================
+# classes
+# ==============================================================================
+class Template(object):
+    """
+    A template compiled into a reusable render object
+
+    Public Attributes:
+        :attr file_key: modification time and size of the template file when
+                        it was compiled
+        :type file_key: tuple
+    """
+    __slots__ = ("_format", "_file_key")
+
+    def __init__(self, text, file_key=None):
+        """
+        Constructor method
+
+        :param text: template source
+        :type text: string
+        :param file_key: modification time and size of the template file
+        :type file_key: tuple
+        :return: n/a
+        :rtype: n/a
+        """
+        self._format = STYLE_BLOCK.sub(_escape_style, text).format
+        self._file_key = file_key
+
+    @property
+    def file_key(self):
+        return self._file_key
+
+    def render(self, values):
+        """
+        Returns the template filled in with the given values
+
+        :param values: template values by field name
+        :type values: dict
+        :return: the rendered document
+        :rtype: string
+        """
+        return self._format(**values)
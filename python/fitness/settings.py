@@ -0,0 +1,198 @@
+"""
+settings.py
+
+Description:
+    Cached, read only access to the package settings defined in
+    configs/settings.json
+
+    Settings files are parsed once and shared by every caller. A settings
+    file is checked for changes at most once every CHECK_INTERVAL seconds and
+    reloaded when its modification time or size changes, so long running
+    processes pick up edits without a restart. A reload which finds the file
+    half written keeps the last good settings until the file parses again.
+"""
+# Python standard libraries
+import itertools
+import json
+import os
+import threading
+import time
+import types
+
+# local libraries
+from fitness import SETTINGS
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+CHECK_INTERVAL = 1.0
+
+_CACHE = {}
+_LOCK = threading.Lock()
+_VERSIONS = itertools.count(1)
+
+
+# ==============================================================================
+# general
+# ==============================================================================
+def _freeze(value):
+    """
+    Returns a read only copy of parsed JSON data: dictionaries become mapping
+    proxies and lists become tuples
+
+    :param value: parsed JSON data
+    :type value: any
+    :return: read only data
+    :rtype: any
+    """
+    if isinstance(value, dict):
+        return types.MappingProxyType(
+            dict((key, _freeze(item)) for key, item in value.items())
+        )
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _file_key(filepath):
+    """
+    Returns the values used to detect changes to a settings file
+
+    :param filepath: full path to a settings file
+    :type filepath: string
+    :return: modification time in nanoseconds and size like: (int, int)
+    :rtype: tuple
+    """
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def reload(filepath=SETTINGS):
+    """
+    Parses the given settings file and replaces its cached settings. If the
+    file cannot be parsed, e.g. while an editor is still writing it, a
+    warning is logged and the last good settings are kept; without any
+    earlier settings the error is raised.
+
+    :param filepath: full path to a settings file
+    :type filepath: string
+    :return: the freshly loaded settings, or the last good settings
+    :rtype: instance of <class 'Settings'>
+    """
+    with _LOCK:
+        key = _file_key(filepath)
+        try:
+            with open(filepath, "r") as infile:
+                data = json.load(infile)
+        except ValueError as error:
+            cached = _CACHE.get(filepath)
+            if cached is None:
+                raise
+
+            # logging is only needed on this rare path, keep it off the
+            # import path of every tool reading settings
+            import logging
+            logging.getLogger(__name__).warning(
+                "Keeping the last good settings, cannot parse %s: %s", filepath, error
+            )
+            _CACHE[filepath] = (cached[0], time.time())
+            return cached[0]
+
+        settings = Settings(filepath, data, next(_VERSIONS), key)
+        _CACHE[filepath] = (settings, time.time())
+        return settings
+
+
+def get_settings(filepath=SETTINGS):
+    """
+    Returns the settings defined by the given settings file, loading them on
+    first use and reloading them once the file changes
+
+    :param filepath: full path to a settings file
+    :type filepath: string
+    :return: settings
+    :rtype: instance of <class 'Settings'>
+    """
+    cached = _CACHE.get(filepath)
+    if cached is None:
+        return reload(filepath)
+
+    settings, checked = cached
+    now = time.time()
+    if now - checked < CHECK_INTERVAL:
+        return settings
+
+    if _file_key(filepath) != settings.file_key:
+        return reload(filepath)
+
+    _CACHE[filepath] = (settings, now)
+    return settings
+
+
+# ==============================================================================
+# classes
+# ==============================================================================
+class Settings(object):
+    """
+    Read only snapshot of a settings file. Values are accessed like a
+    dictionary: settings["macro_multipliers"]["cut"]["fat"]
+
+    Public Attributes:
+        :attr filepath: the settings file these settings were loaded from
+        :type filepath: string
+        :attr version: number which increases every time any settings file
+                       is (re)loaded, usable as a cache key
+        :type version: int
+        :attr file_key: modification time and size of the settings file when
+                        it was loaded
+        :type file_key: tuple
+    """
+    __slots__ = ("_filepath", "_data", "_version", "_file_key")
+
+    def __init__(self, filepath, data, version, file_key):
+        """
+        Constructor method
+
+        :param filepath: the settings file the data was loaded from
+        :type filepath: string
+        :param data: parsed settings data
+        :type data: dict
+        :param version: load counter value, see the version attribute
+        :type version: int
+        :param file_key: modification time and size of the settings file
+        :type file_key: tuple
+        :return: n/a
+        :rtype: n/a
+        """
+        self._filepath = filepath
+        self._data = _freeze(data)
+        self._version = version
+        self._file_key = file_key
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    @property
+    def filepath(self):
+        return self._filepath
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def file_key(self):
+        return self._file_key
@@ -5,11 +5,19 @@ Description:
     Tools and utilities for managing Skulpt-Chzl body fat scanner data 
 """
 # Python standard libraries
+import array
+import bisect
+import collections
+import datetime
+import json
 import os
 import re
+import time
+import zlib
 
 # Local libraries
 import fitness
+from fitness.fileutils import atomic_write
 
 
 # ==============================================================================
@@ -22,11 +30,120 @@ REPORT = """{date}
     mm_avg    {min_max_avg:4.2f}
     avg       {avg:4.2f}
 """
+WHITESPACE = re.compile(r"\s")
+
+INDEX_EXTENSION = ".idx"
+INDEX_VERSION = 1
+INDEX_CHECK_SIZE = 256
+_INDEX_CACHE = {}
+
+FOLLOW_INTERVAL = 1.0
 
 
 # ==============================================================================
 # general
 # ==============================================================================
+def _parse_timestamp(ts):
+    """
+    Converts a Skulpt timestamp into a datetime
+
+    :param ts: timestamp like: 2018-08-19T06:30:32.982Z
+    :type ts: string
+    :return: timestamp
+    :rtype: instance of <class 'datetime.datetime'>
+    """
+    microsecond = 0
+    if ts[19:20] == ".":
+        fraction = ts[20:].rstrip("Z")
+        microsecond = int((fraction + "000000")[:6])
+
+    return datetime.datetime(
+        int(ts[0:4]), int(ts[5:7]), int(ts[8:10]),
+        int(ts[11:13]), int(ts[14:16]), int(ts[17:19]),
+        microsecond
+    )
+
+
+def _parse_line(line):
+    """
+    Parses one line of a Skulpt csv file
+
+    :param line: a line like: 2018-08-19T06:30:32.982Z, upper_back, l, 98.11, 152.77, 7.5
+    :type line: string
+    :return: the measurement, or None for blank and header lines
+    :rtype: instance of <class 'Measurement'>, None
+    """
+    line = WHITESPACE.sub("", line)
+    if not line or line.startswith("Time"):
+        return None
+
+    ts, muscle, side, mq, mq_raw, fat = line.split(",")
+    return Measurement(
+        _parse_timestamp(ts), muscle, side, float(mq), float(mq_raw), float(fat)
+    )
+
+
+def iter_measurements(lines):
+    """
+    Yields the measurements defined by the given lines of Skulpt csv data
+
+    :param lines: lines of a Skulpt csv file, e.g. an open file object
+    :type lines: iterable
+    :return: measurements in file order
+    :rtype: generator of <class 'Measurement'>
+    """
+    for line in lines:
+        measurement = _parse_line(line)
+        if measurement is not None:
+            yield measurement
+
+
+def iter_body_fat(sourcefile):
+    """
+    Yields the measurements of the given Skulpt csv file one row at a time
+    without loading the file into memory
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :return: measurements in file order
+    :rtype: generator of <class 'Measurement'>
+    """
+    with open(sourcefile, "r") as infile:
+        for measurement in iter_measurements(infile):
+            yield measurement
+
+
+def iter_daily_body_fat(measurements):
+    """
+    Yields the body fat statistics of each date in a single pass over the
+    given measurements. A date's statistics are yielded as soon as a
+    measurement from a later date is seen, so only one date is held in
+    memory at a time: the latest body fat value of each muscle measured on
+    it. Measurements must be in date order, as they are in Skulpt exports;
+    a ValueError is raised at the first measurement dated before the one
+    preceding it. Use get_body_fat_data for measurements in any order.
+
+    :param measurements: measurements like those yielded by iter_body_fat
+    :type measurements: iterable of <class 'Measurement'>
+    :return: statistics per date, sorted by date
+    :rtype: generator of <class 'BodyFatStats'>
+    """
+    stats = None
+    for measurement in measurements:
+        date = measurement.date
+        if stats is None or stats.date != date:
+            if stats is not None:
+                if date < stats.date:
+                    msg = "Measurements are not in date order: {} after {}".format(date, stats.date)
+                    raise ValueError(msg)
+                yield stats
+            stats = BodyFatStats(date)
+        stats.add(measurement.name, measurement.fat)
+
+    if stats is not None:
+        yield stats
+
+
 def get_body_fat_data(sourcefile):
     """
     Returns body fat measurements by date and body part as defined by the given sourcefile file.
@@ -49,24 +166,13 @@ def get_body_fat_data(sourcefile):
     :rtype: dictionary
     """
     data = {}
-    date = None
-    for line in open(sourcefile, "r"):
-        line = re.sub("\s", "", line)
-        if not line or line .startswith("Time"):
-            continue
-
-        ts,muscle,side,mqa,mqb,bfp = line.split(",")
-        muscle_name = "{}_{}".format(side, muscle)
-
-        date = ts.split(":", 1)[0][:-3]
-        if date not in data:
-            data[date] = {}
-        data[date][muscle_name] = float(bfp)
+    for measurement in iter_body_fat(sourcefile):
+        data.setdefault(measurement.date, {})[measurement.name] = measurement.fat
 
     return data
 
 
-def get_body_fat(year, month, day, sourcefile):
+def get_body_fat(year, month, day, sourcefile, cache_dir=None):
     """
     Returns body fat measurement data for a specific date from the given sourcefile file.
 
@@ -84,11 +190,14 @@ def get_body_fat(year, month, day, sourcefile):
     :type day: int
     :param sourcefile: full file path to a skulpt.csv file
     :type sourcefile: string
+    :param cache_dir: directory to keep the sourcefile's date index in,
+                      see get_body_fat_index
+    :type cache_dir: string
     :return: body fat data like: (bf_min, bf_max, min_max_avg, bf_avg)
     :rtype: tuple
     """
     # get date centric data
-    data = get_body_fat_data(sourcefile)
+    data = _index_dates(sourcefile, cache_dir)
     date = DATE_FORMAT.format(year=year, month=month, day=day)
     try:
         bf_data = data[date]
@@ -97,23 +206,875 @@ def get_body_fat(year, month, day, sourcefile):
         raise KeyError(msg)
     
     # parse data
-    bf_min = None
-    bf_max = None
-    count = 0
-    bf_avg = 0
-    for name, value in bf_data.iteritems():
-        bf_avg += value
-        if count == 0:
-            bf_min = value
-            bf_max = value
-
-        if value < bf_min:
-            bf_min = value
-        if value > bf_max:
-            bf_max = value
-
-        count += 1
-    bf_avg /= count
+    stats = BodyFatStats(date)
+    for name, value in bf_data.items():
+        stats.add(name, value)
+
+    return stats.stats()
+
+
+def get_body_fat_range(sourcefile, start=None, end=None, last=None):
+    """
+    Returns the body fat statistics of every date within a range in a single
+    streaming pass over the given sourcefile file. Rows of other dates are
+    skipped without being parsed.
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :param start: first date to report like: YYYY-MM-DD, None for no limit
+    :type start: string
+    :param end: last date to report like: YYYY-MM-DD, None for no limit
+    :type end: string
+    :param last: only report the latest this many dates with measurements
+    :type last: int
+    :return: statistics of every date in range, sorted by date
+    :rtype: list of <class 'BodyFatStats'>
+    """
+    stats = {}
+    with open(sourcefile, "r") as infile:
+        for line in infile:
+            # dates lead every row, so most rows out of range are rejected
+            # before they are split and converted
+            date = line.lstrip()[:10]
+            if (start and date < start) or (end and date > end):
+                continue
+            measurement = _parse_line(line)
+            if measurement is None:
+                continue
+
+            date = measurement.date
+            day = stats.get(date)
+            if day is None:
+                if last and len(stats) >= last:
+                    oldest = min(stats)
+                    if date < oldest:
+                        continue
+                    del stats[oldest]
+                day = stats[date] = BodyFatStats(date)
+            day.add(measurement.name, measurement.fat)
+
+    return [stats[date] for date in sorted(stats)]
+
+
+# ==============================================================================
+# index
+# ==============================================================================
+def index_path(sourcefile, cache_dir=None):
+    """
+    Returns the path of the date index file kept for the given sourcefile.
+    Indexes live next to the sourcefile unless a cache directory is given.
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :param cache_dir: directory to keep index files in
+    :type cache_dir: string
+    :return: full file path to the index file
+    :rtype: string
+    """
+    if not cache_dir:
+        return sourcefile + INDEX_EXTENSION
+
+    import hashlib
+
+    sourcefile = os.path.abspath(sourcefile)
+    digest = hashlib.md5(sourcefile.encode("utf-8")).hexdigest()
+    name = "{}.{}{}".format(os.path.basename(sourcefile), digest, INDEX_EXTENSION)
+    return os.path.join(cache_dir, name)
+
+
+def _read_index(indexfile):
+    """
+    Returns the contents of an index file, or None if it is missing, unreadable
+    or was written by an incompatible version of this module
+
+    :param indexfile: full file path to the index file
+    :type indexfile: string
+    :return: index data
+    :rtype: dict, None
+    """
+    try:
+        with open(indexfile, "r") as infile:
+            index = json.load(infile)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    return index
+
+
+def _write_index(indexfile, index):
+    """
+    Saves index data to disk. Indexes are only a cache, so failing to write
+    one (e.g. to a read only directory) is not an error.
+
+    :param indexfile: full file path to the index file
+    :type indexfile: string
+    :param index: index data
+    :type index: dict
+    :return: n/a
+    :rtype: n/a
+    """
+    try:
+        dirpath = os.path.dirname(os.path.abspath(indexfile))
+        if not os.path.isdir(dirpath):
+            os.makedirs(dirpath)
+        atomic_write(indexfile, [json.dumps(index)])
+    except (IOError, OSError):
+        pass
+
+
+def _index_check(infile, offset):
+    """
+    Returns a checksum of the bytes just before offset, used to detect files
+    which were rewritten rather than appended to since they were indexed
+
+    :param infile: binary file object to read from
+    :type infile: file
+    :param offset: byte offset up to which the file has been indexed
+    :type offset: int
+    :return: crc32 checksum
+    :rtype: int
+    """
+    start = max(0, offset - INDEX_CHECK_SIZE)
+    infile.seek(start)
+    return zlib.crc32(infile.read(offset - start)) & 0xffffffff
+
+
+def _extend_index(sourcefile, index, size, mtime):
+    """
+    Adds the rows appended to sourcefile since it was last indexed
+
+    A final row without a line break is indexed if it parses, as exports
+    often end without one, but the index offset is left before it: the row
+    may still be being written, so it is parsed again the next time the file
+    grows. Rows which cannot be parsed are skipped.
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :param index: index data to extend in place
+    :type index: dict
+    :param size: current size of the sourcefile in bytes
+    :type size: int
+    :param mtime: current modification time of the sourcefile
+    :type mtime: float
+    :return: n/a
+    :rtype: n/a
+    """
+    dates = index["dates"]
+    offset = index["offset"]
+    with open(sourcefile, "rb") as infile:
+        infile.seek(offset)
+        for line in infile:
+            # only the final line can lack a line break, see above
+            if line.endswith(b"\n"):
+                offset += len(line)
+            try:
+                measurement = _parse_line(line.decode("utf-8"))
+            except (UnicodeDecodeError, ValueError):
+                continue
+            if measurement is not None:
+                muscles = dates.setdefault(measurement.date, {})
+                muscles[measurement.name] = measurement.fat
+
+        index["offset"] = offset
+        index["check"] = _index_check(infile, offset)
+
+    index["size"] = size
+    index["mtime"] = mtime
+
+
+def get_body_fat_index(sourcefile, cache_dir=None):
+    """
+    Returns the same date centric body fat data as get_body_fat_data, read from
+    a persistent index of the sourcefile rather than the sourcefile itself.
+
+    The index is keyed by the sourcefile's size and modification time:
+        unchanged file: the index is used as is
+        appended rows:  only the new rows are parsed and added to the index
+        anything else:  the index is rebuilt from scratch
+
+    The returned data is the caller's own copy and may be modified freely.
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :param cache_dir: directory to keep index files in, see index_path
+    :type cache_dir: string
+    :return: date and body part centric body fat measurements
+    :rtype: dictionary
+    """
+    dates = _index_dates(sourcefile, cache_dir)
+    return dict((date, dict(muscles)) for date, muscles in dates.items())
+
+
+def _index_dates(sourcefile, cache_dir=None):
+    """
+    Returns the indexed body fat data of the given sourcefile, see
+    get_body_fat_index. The data is shared with every later lookup of the
+    same file and must not be modified.
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :param cache_dir: directory to keep index files in, see index_path
+    :type cache_dir: string
+    :return: date and body part centric body fat measurements
+    :rtype: dictionary
+    """
+    indexfile = index_path(sourcefile, cache_dir)
+    stat = os.stat(sourcefile)
+    key = (stat.st_size, stat.st_mtime)
+
+    # reuse the index already loaded by this process
+    cached = _INDEX_CACHE.get(indexfile)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    index = _read_index(indexfile)
+    if index and (index["size"], index["mtime"]) == key:
+        _INDEX_CACHE[indexfile] = (key, index["dates"])
+        return index["dates"]
+
+    # extend the index with appended rows or start over
+    if index and index["offset"] <= stat.st_size:
+        with open(sourcefile, "rb") as infile:
+            if _index_check(infile, index["offset"]) != index["check"]:
+                index = None
+    else:
+        index = None
+
+    if index is None:
+        index = {"version": INDEX_VERSION, "offset": 0, "dates": {}}
+
+    _extend_index(sourcefile, index, *key)
+    _write_index(indexfile, index)
+    _INDEX_CACHE[indexfile] = (key, index["dates"])
+    return index["dates"]
+
+
+# ==============================================================================
+# follow
+# ==============================================================================
+def follow_body_fat(sourcefile, date, interval=FOLLOW_INTERVAL, stop=None):
+    """
+    Follows a Skulpt csv file as a scanning session appends to it, like
+    tail -f, yielding the body fat statistics of the given date every time new
+    measurements of that date arrive.
+
+    The file is parsed once and then kept open: every poll reads only the
+    bytes appended since the previous one and adds their measurements to the
+    running statistics. A partially written row is held back until the rest
+    of it arrives. Rows which cannot be parsed are skipped. A file which is
+    truncated or replaced is read again from the start.
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :param date: date to report like: YYYY-MM-DD
+    :type date: string
+    :param interval: seconds to wait between polls for new data
+    :type interval: float
+    :param stop: called before every poll, following ends once it returns True
+    :type stop: callable
+    :return: the date's statistics, updated in place between yields
+    :rtype: generator of <class 'BodyFatStats'>
+    """
+    infile = None
+    try:
+        while stop is None or not stop():
+            # (re)open the file when it first appears, is replaced or shrinks
+            if infile is not None:
+                try:
+                    stat = os.stat(sourcefile)
+                except OSError:
+                    stat = None
+                current = os.fstat(infile.fileno())
+                if stat is None or stat.st_ino != current.st_ino or stat.st_size < infile.tell():
+                    infile.close()
+                    infile = None
+
+            if infile is None:
+                try:
+                    infile = open(sourcefile, "rb")
+                except (IOError, OSError):
+                    time.sleep(interval)
+                    continue
+                stats = BodyFatStats(date)
+                pending = b""
+                pending_added = False
+
+            chunk = infile.read()
+            if not chunk:
+                # a last row without a line break is counted once the file
+                # goes quiet; should it grow after all, the complete row
+                # replaces it as the latest measurement of its muscle
+                if pending and not pending_added:
+                    pending_added = True
+                    try:
+                        measurement = _parse_line(pending.decode("utf-8"))
+                    except (UnicodeDecodeError, ValueError):
+                        measurement = None
+                    if measurement is not None and measurement.date == date:
+                        stats.add(measurement.name, measurement.fat)
+                        yield stats
+                        continue
+                time.sleep(interval)
+                continue
+
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            pending_added = False
+            changed = False
+            for line in lines:
+                try:
+                    measurement = _parse_line(line.decode("utf-8"))
+                except (UnicodeDecodeError, ValueError):
+                    continue
+                if measurement is not None and measurement.date == date:
+                    stats.add(measurement.name, measurement.fat)
+                    changed = True
+
+            if changed:
+                yield stats
+    finally:
+        if infile is not None:
+            infile.close()
+
+
+# ==============================================================================
+# columnar
+# ==============================================================================
+def load_body_fat_columns(sourcefile):
+    """
+    Loads a Skulpt csv file into NumPy arrays for vectorized statistics.
+    Requires numpy, which is only imported when this function is called.
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :return: the file's measurements as columns
+    :rtype: instance of <class 'BodyFatColumns'>
+    """
+    import numpy
+
+    date_codes = {}
+    muscle_codes = {}
+    date_column = array.array("l")
+    muscle_column = array.array("l")
+    fat_column = array.array("d")
+    mq_column = array.array("d")
+    for measurement in iter_body_fat(sourcefile):
+        date = measurement.date
+        name = measurement.name
+        date_column.append(date_codes.setdefault(date, len(date_codes)))
+        muscle_column.append(muscle_codes.setdefault(name, len(muscle_codes)))
+        fat_column.append(measurement.fat)
+        mq_column.append(measurement.mq)
+
+    # renumber the codes so they follow the sorted labels
+    dates = sorted(date_codes)
+    muscles = sorted(muscle_codes)
+    date_order = numpy.empty(len(dates), dtype=numpy.int64)
+    date_order[[date_codes[d] for d in dates]] = numpy.arange(len(dates))
+    muscle_order = numpy.empty(len(muscles), dtype=numpy.int64)
+    muscle_order[[muscle_codes[m] for m in muscles]] = numpy.arange(len(muscles))
+
+    return BodyFatColumns(
+        dates=tuple(dates),
+        muscles=tuple(muscles),
+        date_codes=date_order[numpy.frombuffer(date_column, dtype=numpy.dtype("l"))],
+        muscle_codes=muscle_order[numpy.frombuffer(muscle_column, dtype=numpy.dtype("l"))],
+        fat=numpy.frombuffer(fat_column, dtype=numpy.float64),
+        mq=numpy.frombuffer(mq_column, dtype=numpy.float64)
+    )
+
+
+def _latest_measurements(columns):
+    """
+    Returns the rows of the given columns that hold the latest measurement of
+    each muscle on each date, matching get_body_fat_data's last value wins
+    behaviour. Rows are returned sorted by date, then muscle.
+
+    :param columns: columnar body fat data
+    :type columns: instance of <class 'BodyFatColumns'>
+    :return: row indexes
+    :rtype: instance of <class 'numpy.ndarray'>
+    """
+    import numpy
+
+    keys = columns.date_codes * len(columns.muscles) + columns.muscle_codes
+    _, first_reversed = numpy.unique(keys[::-1], return_index=True)
+    return len(keys) - 1 - first_reversed
+
+
+def _group_statistics(codes, fat, labels):
+    """
+    Computes body fat statistics for every group of rows sharing a code
+
+    :param codes: group code of each row, sorted
+    :type codes: instance of <class 'numpy.ndarray'>
+    :param fat: body fat percentage of each row
+    :type fat: instance of <class 'numpy.ndarray'>
+    :param labels: group label of each code
+    :type labels: tuple
+    :return: body fat data by label like: {label: (bf_min, bf_max, min_max_avg, bf_avg)}
+    :rtype: dict
+    """
+    import numpy
+
+    if not len(codes):
+        return {}
+
+    starts = numpy.flatnonzero(numpy.r_[True, codes[1:] != codes[:-1]])
+    counts = numpy.diff(numpy.r_[starts, len(codes)])
+    bf_min = numpy.minimum.reduceat(fat, starts)
+    bf_max = numpy.maximum.reduceat(fat, starts)
+    bf_avg = numpy.add.reduceat(fat, starts) / counts
     min_max_avg = (bf_min + bf_max) / 2.0
 
-    return bf_min, bf_max, min_max_avg, bf_avg
+    return dict(zip(
+        [labels[code] for code in codes[starts].tolist()],
+        zip(bf_min.tolist(), bf_max.tolist(), min_max_avg.tolist(), bf_avg.tolist())
+    ))
+
+
+def body_fat_statistics(columns):
+    """
+    Returns the body fat statistics of every date in one vectorized pass.
+    Each date's values match those returned by get_body_fat.
+
+    :param columns: columnar body fat data, see load_body_fat_columns
+    :type columns: instance of <class 'BodyFatColumns'>
+    :return: body fat data by date like: {'YYYY-MM-DD': (bf_min, bf_max, min_max_avg, bf_avg)}
+    :rtype: dict
+    """
+    rows = _latest_measurements(columns)
+    return _group_statistics(columns.date_codes[rows], columns.fat[rows], columns.dates)
+
+
+def muscle_statistics(columns):
+    """
+    Returns the body fat statistics of every muscle across all dates in one
+    vectorized pass
+
+    :param columns: columnar body fat data, see load_body_fat_columns
+    :type columns: instance of <class 'BodyFatColumns'>
+    :return: body fat data by muscle like: {'l_upper_back': (bf_min, bf_max, min_max_avg, bf_avg)}
+    :rtype: dict
+    """
+    import numpy
+
+    rows = _latest_measurements(columns)
+    muscle_codes = columns.muscle_codes[rows]
+    order = numpy.argsort(muscle_codes, kind="stable")
+    return _group_statistics(muscle_codes[order], columns.fat[rows][order], columns.muscles)
+
+
+# ==============================================================================
+# trends
+# ==============================================================================
+def load_body_fat_trends(sourcefile, cache_dir=None):
+    """
+    Returns the per muscle body fat time series of the given Skulpt csv file.
+    The series are built from the file's persistent date index, so only rows
+    appended since the index was last updated are parsed, see
+    get_body_fat_index. Requires numpy.
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :param cache_dir: directory to keep the sourcefile's date index in
+    :type cache_dir: string
+    :return: body fat time series
+    :rtype: instance of <class 'BodyFatTrends'>
+    """
+    return BodyFatTrends(_index_dates(sourcefile, cache_dir))
+
+
+# ==============================================================================
+# classes
+# ==============================================================================
+class Measurement(collections.namedtuple("Measurement", "timestamp muscle side mq mq_raw fat")):
+    """
+    One row of a Skulpt csv file
+
+    Public Attributes:
+        :attr timestamp: time the measurement was taken at
+        :type timestamp: instance of <class 'datetime.datetime'>
+        :attr muscle: name of the measured muscle like: upper_back
+        :type muscle: string
+        :attr side: side of the body the muscle was measured on like: l, r
+        :type side: string
+        :attr mq: muscle quality score (0-100)
+        :type mq: float
+        :attr mq_raw: raw muscle quality value
+        :type mq_raw: float
+        :attr fat: body fat percentage
+        :type fat: float
+        :attr date: date the measurement was taken on like: YYYY-MM-DD
+        :type date: string
+        :attr name: side specific muscle name like: l_upper_back
+        :type name: string
+    """
+    __slots__ = ()
+
+    @property
+    def date(self):
+        """
+        Returns the date the measurement was taken on
+
+        :return: date like: YYYY-MM-DD
+        :rtype: string
+        """
+        ts = self.timestamp
+        return DATE_FORMAT.format(year=ts.year, month=ts.month, day=ts.day)
+
+    @property
+    def name(self):
+        """
+        Returns the side specific name of the measured muscle
+
+        :return: muscle name like: l_upper_back
+        :rtype: string
+        """
+        return "{}_{}".format(self.side, self.muscle)
+
+
+class BodyFatColumns(collections.namedtuple(
+        "BodyFatColumns", "dates muscles date_codes muscle_codes fat mq")):
+    """
+    Skulpt csv data stored as NumPy arrays, one element per row
+
+    Public Attributes:
+        :attr dates: sorted date labels like: YYYY-MM-DD
+        :type dates: tuple
+        :attr muscles: sorted side specific muscle labels like: l_upper_back
+        :type muscles: tuple
+        :attr date_codes: index into dates of each row
+        :type date_codes: instance of <class 'numpy.ndarray'>
+        :attr muscle_codes: index into muscles of each row
+        :type muscle_codes: instance of <class 'numpy.ndarray'>
+        :attr fat: body fat percentage of each row
+        :type fat: instance of <class 'numpy.ndarray'>
+        :attr mq: muscle quality score of each row
+        :type mq: instance of <class 'numpy.ndarray'>
+    """
+    __slots__ = ()
+
+
+class BodyFatStats(object):
+    """
+    Running body fat statistics over the measurements taken on one date.
+
+    Only the latest measurement of each muscle counts towards the statistics,
+    so memory is bounded by the number of measured muscles rather than the
+    number of rows.
+
+    Public Attributes:
+        :attr date: date the statistics were collected for like: YYYY-MM-DD
+        :type date: string
+        :attr count: number of muscles measured
+        :type count: int
+        :attr min: lowest body fat value
+        :type min: float
+        :attr max: highest body fat value
+        :type max: float
+        :attr min_max_avg: average of lowest and highest
+        :type min_max_avg: float
+        :attr avg: average of ALL available measurements
+        :type avg: float
+    """
+    def __init__(self, date=None):
+        """
+        Constructor method
+
+        :param date: date the statistics are collected for like: YYYY-MM-DD
+        :type date: string
+        :return: n/a
+        :rtype: n/a
+        """
+        self.date = date
+        self._values = {}
+        self._total = 0.0
+        self._min = None
+        self._max = None
+
+    def add(self, name, value):
+        """
+        Adds a body fat measurement, replacing any earlier measurement of the
+        same muscle
+
+        :param name: side specific muscle name like: l_upper_back
+        :type name: string
+        :param value: body fat percentage
+        :type value: float
+        :return: n/a
+        :rtype: n/a
+        """
+        previous = self._values.get(name)
+        self._values[name] = value
+        if previous is None:
+            self._total += value
+        else:
+            self._total += value - previous
+
+        if previous is not None and previous in (self._min, self._max):
+            self._min = min(self._values.values())
+            self._max = max(self._values.values())
+            return
+
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
+
+    @property
+    def count(self):
+        """
+        Returns the number of muscles measured
+
+        :return: number of measurements
+        :rtype: int
+        """
+        return len(self._values)
+
+    @property
+    def min(self):
+        """
+        Returns the lowest body fat value
+
+        :return: body fat percentage, None before any measurement was added
+        :rtype: float, None
+        """
+        return self._min
+
+    @property
+    def max(self):
+        """
+        Returns the highest body fat value
+
+        :return: body fat percentage, None before any measurement was added
+        :rtype: float, None
+        """
+        return self._max
+
+    @property
+    def min_max_avg(self):
+        """
+        Returns the average of the lowest and highest body fat values
+
+        :return: body fat percentage
+        :rtype: float
+        """
+        return (self._min + self._max) / 2.0
+
+    @property
+    def avg(self):
+        """
+        Returns the average of all body fat values
+
+        :return: body fat percentage
+        :rtype: float
+        """
+        return self._total / len(self._values)
+
+    def stats(self):
+        """
+        Returns the statistics in the order used by get_body_fat
+
+        :return: body fat data like: (bf_min, bf_max, min_max_avg, bf_avg)
+        :rtype: tuple
+        """
+        return self.min, self.max, self.min_max_avg, self.avg
+
+
+class BodyFatTrends(object):
+    """
+    Body fat of every muscle over time, held as one NumPy matrix with a row
+    per muscle and a column per date, NaN where a muscle was not measured.
+    The matrix is built once, after which every query is vectorized over it.
+    Requires numpy.
+
+    Public Attributes:
+        :attr dates: sorted date labels like: YYYY-MM-DD
+        :type dates: tuple
+        :attr muscles: sorted side specific muscle labels like: l_upper_back
+        :type muscles: tuple
+        :attr days: day number of each date, counted from 0001-01-01
+        :type days: instance of <class 'numpy.ndarray'>
+        :attr fat: body fat percentage by muscle (row) and date (column)
+        :type fat: instance of <class 'numpy.ndarray'>
+    """
+    def __init__(self, data):
+        """
+        Constructor method
+
+        :param data: body fat by date and muscle, see get_body_fat_index
+        :type data: dict
+        :return: n/a
+        :rtype: n/a
+        """
+        import numpy
+
+        self._dates = tuple(sorted(data))
+        self._muscles = tuple(sorted(set(m for muscles in data.values() for m in muscles)))
+        self._days = numpy.array(
+            [_parse_timestamp(date + "T00:00:00").toordinal() for date in self._dates],
+            dtype=numpy.float64
+        )
+
+        rows = dict((muscle, i) for i, muscle in enumerate(self._muscles))
+        self._fat = numpy.full((len(self._muscles), len(self._dates)), numpy.nan)
+        for column, date in enumerate(self._dates):
+            for muscle, value in data[date].items():
+                self._fat[rows[muscle], column] = value
+        self._rows = rows
+
+    @property
+    def dates(self):
+        return self._dates
+
+    @property
+    def muscles(self):
+        return self._muscles
+
+    @property
+    def days(self):
+        return self._days
+
+    @property
+    def fat(self):
+        return self._fat
+
+    def _columns(self, start=None, end=None):
+        """
+        Returns the slice of date columns within start <= date <= end
+
+        :param start: first date like: YYYY-MM-DD, None for no limit
+        :type start: string
+        :param end: last date like: YYYY-MM-DD, None for no limit
+        :type end: string
+        :return: date columns
+        :rtype: slice
+        """
+        first = 0 if start is None else bisect.bisect_left(self._dates, start)
+        last = len(self._dates) if end is None else bisect.bisect_right(self._dates, end)
+        return slice(first, last)
+
+    def series(self, muscle, start=None, end=None):
+        """
+        Returns the measurements of one muscle
+
+        :param muscle: side specific muscle name like: l_upper_back
+        :type muscle: string
+        :param start: first date like: YYYY-MM-DD, None for no limit
+        :type start: string
+        :param end: last date like: YYYY-MM-DD, None for no limit
+        :type end: string
+        :return: dates measured and their body fat like: (("YYYY-MM-DD", ...), ndarray)
+        :rtype: tuple
+        """
+        import numpy
+
+        columns = self._columns(start, end)
+        values = self._fat[self._rows[muscle], columns]
+        measured = numpy.flatnonzero(~numpy.isnan(values))
+        dates = self._dates[columns]
+        return tuple(dates[i] for i in measured.tolist()), values[measured]
+
+    def deltas(self, muscle, periods=1, start=None, end=None):
+        """
+        Returns the change in body fat of one muscle since the measurement
+        periods measurements earlier. Raises a ValueError if periods is less
+        than 1.
+
+        :param muscle: side specific muscle name like: l_upper_back
+        :type muscle: string
+        :param periods: number of measurements to look back
+        :type periods: int
+        :param start: first date like: YYYY-MM-DD, None for no limit
+        :type start: string
+        :param end: last date like: YYYY-MM-DD, None for no limit
+        :type end: string
+        :return: dates and their change like: (("YYYY-MM-DD", ...), ndarray)
+        :rtype: tuple
+        """
+        if periods < 1:
+            raise ValueError("Periods must be at least 1: {}".format(periods))
+        dates, values = self.series(muscle, start, end)
+        return dates[periods:], values[periods:] - values[:-periods]
+
+    def rolling_mean(self, muscle, window=7, start=None, end=None):
+        """
+        Returns the mean body fat of one muscle over each run of window
+        consecutive measurements. Raises a ValueError if window is less
+        than 1.
+
+        :param muscle: side specific muscle name like: l_upper_back
+        :type muscle: string
+        :param window: number of measurements averaged
+        :type window: int
+        :param start: first date like: YYYY-MM-DD, None for no limit
+        :type start: string
+        :param end: last date like: YYYY-MM-DD, None for no limit
+        :type end: string
+        :return: dates ending each window and its mean like: (("YYYY-MM-DD", ...), ndarray)
+        :rtype: tuple
+        """
+        import numpy
+
+        if window < 1:
+            raise ValueError("Window must be at least 1: {}".format(window))
+        dates, values = self.series(muscle, start, end)
+        if len(values) < window:
+            return (), values[:0]
+        sums = numpy.cumsum(numpy.r_[0.0, values])
+        return dates[window - 1:], (sums[window:] - sums[:-window]) / window
+
+    def slopes(self, start=None, end=None):
+        """
+        Returns the least squares trend of every muscle in body fat
+        percentage points per day, computed for all muscles at once
+
+        :param start: first date like: YYYY-MM-DD, None for no limit
+        :type start: string
+        :param end: last date like: YYYY-MM-DD, None for no limit
+        :type end: string
+        :return: slope by muscle, None for muscles measured on fewer than
+                 two dates
+        :rtype: dict
+        """
+        import numpy
+
+        columns = self._columns(start, end)
+        fat = self._fat[:, columns]
+        measured = ~numpy.isnan(fat)
+        x = numpy.where(measured, self._days[columns] - self._days[columns][:1], 0.0)
+        y = numpy.where(measured, fat, 0.0)
+
+        n = measured.sum(axis=1)
+        sx = x.sum(axis=1)
+        sy = y.sum(axis=1)
+        sxx = (x * x).sum(axis=1)
+        sxy = (x * y).sum(axis=1)
+        denominator = n * sxx - sx * sx
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            slope = (n * sxy - sx * sy) / denominator
+
+        return dict(
+            (muscle, value if count >= 2 and d else None)
+            for muscle, value, count, d in zip(
+                self._muscles, slope.tolist(), n.tolist(), denominator.tolist()
+            )
+        )
+
+    def slope(self, muscle, start=None, end=None):
+        """
+        Returns the least squares trend of one muscle, see slopes
+
+        :param muscle: side specific muscle name like: l_upper_back
+        :type muscle: string
+        :param start: first date like: YYYY-MM-DD, None for no limit
+        :type start: string
+        :param end: last date like: YYYY-MM-DD, None for no limit
+        :type end: string
+        :return: body fat percentage points per day, or None
+        :rtype: float
+        """
+        return self.slopes(start, end)[muscle]
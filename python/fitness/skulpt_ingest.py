@@ -0,0 +1,246 @@
+"""
+skulpt_ingest.py
+
+Description:
+    Bulk ingestion of directories of Skulpt-Chzl scanner exports
+
+    Exports are collected as one csv file per client per device:
+        <directory>/<client>/<device>.csv
+    Every export is parsed in a pool of worker processes and the results are
+    merged into a single store file holding each client's body fat by date and
+    body part. The store remembers the size and modification time of every
+    export it was built from, so re-running an ingestion only parses exports
+    which were added or changed since.
+"""
+# Python standard libraries
+import json
+import os
+import time
+
+# local libraries
+from fitness.fileutils import atomic_write
+import fitness.skulpt as skulpt
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+STORE_NAME = "skulpt_store.json"
+STORE_VERSION = 1
+EXPORT_EXTENSION = ".csv"
+
+
+# ==============================================================================
+# general
+# ==============================================================================
+def find_exports(directory):
+    """
+    Returns the Skulpt exports found anywhere below the given directory,
+    along with the client each belongs to: the name of the top level
+    directory it is in, or its own name for exports directly in directory
+
+    :param directory: full path to the directory to search
+    :type directory: string
+    :return: export paths relative to directory and their client like:
+             [("client/device.csv", "client"), ...]
+    :rtype: list
+    """
+    exports = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() != EXPORT_EXTENSION:
+                continue
+            relpath = os.path.relpath(os.path.join(dirpath, name), directory)
+            parts = relpath.split(os.sep)
+            client = parts[0] if len(parts) > 1 else os.path.splitext(name)[0]
+            exports.append((relpath, client))
+    return exports
+
+
+def parse_export(sourcefile):
+    """
+    Parses one Skulpt export, keeping the latest measurement of every body
+    part on each date
+
+    :param sourcefile: full file path to a skulpt.csv file
+    :type sourcefile: string
+    :return: the measurements and number of rows parsed like:
+             ({date: {body_part: [timestamp, fat]}}, rows)
+    :rtype: tuple
+    """
+    dates = {}
+    rows = 0
+    for measurement in skulpt.iter_body_fat(sourcefile):
+        rows += 1
+        muscles = dates.setdefault(measurement.date, {})
+        timestamp = measurement.timestamp.isoformat()
+        current = muscles.get(measurement.name)
+        if current is None or current[0] <= timestamp:
+            muscles[measurement.name] = [timestamp, measurement.fat]
+    return dates, rows
+
+
+def _parse_job(job):
+    """
+    Process pool entry point parsing one export, see parse_export
+
+    :param job: export path relative to the ingested directory and the
+                directory itself like: ("client/device.csv", "/data")
+    :type job: tuple
+    :return: relative path, parse results or None, rows and error message
+             or None like: ("client/device.csv", {}, 150, None)
+    :rtype: tuple
+    """
+    relpath, directory = job
+    try:
+        dates, rows = parse_export(os.path.join(directory, relpath))
+    except Exception as error:
+        return relpath, None, 0, "{}: {}".format(type(error).__name__, error)
+    return relpath, dates, rows, None
+
+
+def load_store(storefile):
+    """
+    Returns the contents of a store file, or an empty store if it is missing,
+    unreadable or was written by an incompatible version of this module.
+    Stores look like:
+        {"version": 1,
+         "files": {"client/device.csv": {"client": "client", "size": int,
+                                         "mtime": int, "rows": int,
+                                         "dates": {date: {body_part: [timestamp, fat]}}}},
+         "clients": {"client": {date: {body_part: fat}}}}
+
+    :param storefile: full path to a store file
+    :type storefile: string
+    :return: store data
+    :rtype: dict
+    """
+    try:
+        with open(storefile, "r") as infile:
+            store = json.load(infile)
+    except (IOError, OSError, ValueError):
+        store = None
+
+    if not isinstance(store, dict) or store.get("version") != STORE_VERSION:
+        store = {"version": STORE_VERSION, "files": {}, "clients": {}}
+    return store
+
+
+def _merge_clients(files):
+    """
+    Merges the parsed exports of every client into one body fat table per
+    client. Where two devices measured the same body part on the same date
+    the later measurement wins.
+
+    :param files: parsed exports by relative path, see load_store
+    :type files: dict
+    :return: body fat by client, date and body part
+    :rtype: dict
+    """
+    latest = {}
+    for relpath in sorted(files):
+        entry = files[relpath]
+        dates = latest.setdefault(entry["client"], {})
+        for date, muscles in entry["dates"].items():
+            merged = dates.setdefault(date, {})
+            for name, measurement in muscles.items():
+                current = merged.get(name)
+                if current is None or current[0] <= measurement[0]:
+                    merged[name] = measurement
+
+    clients = {}
+    for client, dates in latest.items():
+        clients[client] = dict(
+            (date, dict((name, m[1]) for name, m in muscles.items()))
+            for date, muscles in dates.items()
+        )
+    return clients
+
+
+def ingest(directory, storefile=None, workers=None, progress=None):
+    """
+    Parses every new or changed Skulpt export below the given directory
+    across a pool of worker processes and saves the merged results to the
+    store file. Exports whose size and modification time match the store are
+    not read, and exports which no longer exist are dropped from it. An
+    export which fails to parse keeps the results of the last run which
+    parsed it, if any, and is reported as failed.
+
+    :param directory: full path to a directory of exports, see find_exports
+    :type directory: string
+    :param storefile: full path to the store file, defaults to STORE_NAME in
+                      directory
+    :type storefile: string
+    :param workers: number of worker processes, defaults to the CPU count
+    :type workers: int
+    :param progress: called as progress(done, total, result) as each export
+                     is parsed, see _parse_job
+    :type progress: callable
+    :return: run summary like:
+             {"files": int, "parsed": int, "skipped": int, "failed": [(relpath, error)],
+              "rows": int, "seconds": float, "rows_per_second": float}
+    :rtype: dict
+    """
+    from concurrent import futures
+
+    start = time.time()
+    if not storefile:
+        storefile = os.path.join(directory, STORE_NAME)
+    store = load_store(storefile)
+    previous = store["files"]
+
+    # find the exports which changed since the last run
+    files = {}
+    jobs = []
+    keys = {}
+    for relpath, client in find_exports(directory):
+        stat = os.stat(os.path.join(directory, relpath))
+        keys[relpath] = (client, stat.st_size, stat.st_mtime_ns)
+        entry = previous.get(relpath)
+        if entry and (entry["client"], entry["size"], entry["mtime"]) == keys[relpath]:
+            files[relpath] = entry
+        else:
+            jobs.append((relpath, directory))
+
+    # parse them
+    rows = 0
+    failed = []
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_parse_job, jobs, chunksize=chunksize)
+            for done, result in enumerate(results, 1):
+                relpath, dates, count, error = result
+                if error:
+                    failed.append((relpath, error))
+                    # keep what an earlier run parsed, along with its old size and
+                    # mtime so the export is retried once it is fixed
+                    if relpath in previous:
+                        files[relpath] = previous[relpath]
+                else:
+                    client, size, mtime = keys[relpath]
+                    files[relpath] = {
+                        "client": client, "size": size, "mtime": mtime,
+                        "rows": count, "dates": dates
+                    }
+                    rows += count
+                if progress is not None:
+                    progress(done, len(jobs), result)
+
+    # merge and save
+    store["files"] = files
+    store["clients"] = _merge_clients(files)
+    atomic_write(storefile, [json.dumps(store)])
+
+    seconds = time.time() - start
+    return {
+        "files": len(keys),
+        "parsed": len(jobs) - len(failed),
+        "skipped": len(keys) - len(jobs),
+        "failed": failed,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0
+    }
@@ -0,0 +1,281 @@
+"""
+stats.py
+
+Description:
+    Incremental statistics over a rolling window of values, such as daily
+    weigh-ins
+
+    Appending a value updates every statistic in constant time, so a window
+    can span years of daily values without ever being rescanned. A value may
+    be None, marking a missing measurement: it occupies its place in the
+    window but is left out of every statistic.
+"""
+# Python standard libraries
+import collections
+
+
+# ==============================================================================
+# classes
+# ==============================================================================
+class RollingStats(object):
+    """
+    Moving average, exponential moving average, minimum, maximum and trend
+    slope of the last window values appended
+
+    Public Attributes:
+        :attr window: maximum number of values kept, None for no limit
+        :type window: int
+        :attr alpha: smoothing factor of the exponential moving average
+        :type alpha: float
+        :attr count: number of values in the window which are not missing
+        :type count: int
+        :attr mean: average of the values in the window
+        :type mean: float, None
+        :attr ema: exponential moving average of the values appended
+        :type ema: float, None
+        :attr min: smallest value in the window
+        :type min: float, None
+        :attr max: largest value in the window
+        :type max: float, None
+        :attr slope: least squares change in value per position in the window
+        :type slope: float, None
+    """
+
+    def __init__(self, window=None, alpha=0.1, values=()):
+        """
+        Constructor method
+
+        :param window: maximum number of values kept, None for no limit
+        :type window: int
+        :param alpha: smoothing factor of the exponential moving average, the
+                      weight given to the newest value
+        :type alpha: float
+        :param values: initial values to append
+        :type values: iterable
+        :return: n/a
+        :rtype: n/a
+        """
+        self._window = window
+        self._alpha = alpha
+        self._values = collections.deque()
+        self._start = 0  # position of the oldest value in the window
+
+        # running sums over the values which are not missing, where x is a
+        # value's position and y the value itself
+        self._n = 0
+        self._sx = 0.0
+        self._sy = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+        # monotonic deques of (position, value) pairs whose first items are
+        # the window minimum and maximum
+        self._lows = collections.deque()
+        self._highs = collections.deque()
+        self._ema = None
+        self._dirty = False
+
+        self.extend(values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, offset):
+        return self._values[offset]
+
+    @property
+    def window(self):
+        return self._window
+
+    @property
+    def alpha(self):
+        return self._alpha
+
+    @property
+    def count(self):
+        return self._n
+
+    @property
+    def mean(self):
+        if not self._n:
+            return None
+        return self._sy / self._n
+
+    @property
+    def ema(self):
+        self._rebuild()
+        return self._ema
+
+    @property
+    def min(self):
+        self._rebuild()
+        return self._lows[0][1] if self._lows else None
+
+    @property
+    def max(self):
+        self._rebuild()
+        return self._highs[0][1] if self._highs else None
+
+    @property
+    def slope(self):
+        # positions are taken relative to the window start to keep the sums
+        # of squares small however long the stream has been running
+        n = self._n
+        if n < 2:
+            return None
+        shift = self._start
+        sx = self._sx - n * shift
+        sxx = self._sxx - 2 * shift * self._sx + n * shift * shift
+        sxy = self._sxy - shift * self._sy
+        denominator = n * sxx - sx * sx
+        if not denominator:
+            return None
+        return (n * sxy - sx * self._sy) / denominator
+
+    def _add(self, position, value):
+        """
+        Adds a value at the given position to the running sums
+
+        :param position: position of the value in the stream
+        :type position: int
+        :param value: value to add
+        :type value: float
+        :return: n/a
+        :rtype: n/a
+        """
+        self._n += 1
+        self._sx += position
+        self._sy += value
+        self._sxx += position * position
+        self._sxy += position * value
+
+    def _remove(self, position, value):
+        """
+        Removes a value at the given position from the running sums
+
+        :param position: position of the value in the stream
+        :type position: int
+        :param value: value to remove
+        :type value: float
+        :return: n/a
+        :rtype: n/a
+        """
+        self._n -= 1
+        self._sx -= position
+        self._sy -= value
+        self._sxx -= position * position
+        self._sxy -= position * value
+        if not self._n:
+            # drop accumulated rounding errors whenever the window empties
+            self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def _push(self, position, value):
+        """
+        Adds a value to the minimum/maximum deques and the moving average
+
+        :param position: position of the value in the stream
+        :type position: int
+        :param value: value to add
+        :type value: float
+        :return: n/a
+        :rtype: n/a
+        """
+        while self._lows and self._lows[-1][1] >= value:
+            self._lows.pop()
+        self._lows.append((position, value))
+        while self._highs and self._highs[-1][1] <= value:
+            self._highs.pop()
+        self._highs.append((position, value))
+
+        if self._ema is None:
+            self._ema = value
+        else:
+            self._ema += self._alpha * (value - self._ema)
+
+    def _rebuild(self):
+        """
+        Rebuilds the minimum/maximum deques and the exponential moving
+        average from the window after a value was replaced
+
+        :return: n/a
+        :rtype: n/a
+        """
+        if not self._dirty:
+            return
+        self._lows.clear()
+        self._highs.clear()
+        self._ema = None
+        for position, value in enumerate(self._values, self._start):
+            if value is not None:
+                self._push(position, value)
+        self._dirty = False
+
+    def append(self, value):
+        """
+        Adds the newest value, dropping the oldest one once the window is full
+
+        :param value: the value, or None for a missing value
+        :type value: float, None
+        :return: n/a
+        :rtype: n/a
+        """
+        position = self._start + len(self._values)
+        self._values.append(value)
+        if value is not None:
+            self._add(position, value)
+            if not self._dirty:
+                self._push(position, value)
+
+        if self._window is not None and len(self._values) > self._window:
+            oldest = self._values.popleft()
+            if oldest is not None:
+                self._remove(self._start, oldest)
+            if self._lows and self._lows[0][0] == self._start:
+                self._lows.popleft()
+            if self._highs and self._highs[0][0] == self._start:
+                self._highs.popleft()
+            self._start += 1
+
+    def extend(self, values):
+        """
+        Appends every one of the given values, see append
+
+        :param values: values, None for missing values
+        :type values: iterable
+        :return: n/a
+        :rtype: n/a
+        """
+        for value in values:
+            self.append(value)
+
+    def replace(self, offset, value):
+        """
+        Replaces a value in the window, e.g. a corrected weigh-in. The mean
+        and slope are updated immediately. The minimum, maximum and
+        exponential moving average are rebuilt from the window the next time
+        one of them is read, so the moving average then only reflects the
+        values still in the window.
+
+        :param offset: index of the value in the window, 0 being the oldest
+        :type offset: int
+        :param value: the new value, or None for a missing value
+        :type value: float, None
+        :return: n/a
+        :rtype: n/a
+        """
+        if offset < 0:
+            offset += len(self._values)
+        if not 0 <= offset < len(self._values):
+            raise IndexError("Window offset out of range: {}".format(offset))
+
+        position = self._start + offset
+        previous = self._values[offset]
+        if previous is not None:
+            self._remove(position, previous)
+        if value is not None:
+            self._add(position, value)
+        self._values[offset] = value
+        self._dirty = True
@@ -7,15 +7,18 @@ Description:
         - muscle size
 """
 # Python standard libraries
-import os
-import re
+import datetime
+import math
 import sys
 
 # Qt libraries
-from PyQt5 import QtGui, QtCore, QtWidgets
+from PyQt5 import QtCore, QtWidgets
 
 # local libraries
-import fitness.bodyweight as body_weight
+import fitness.conversions as conversions
+import fitness.report as report
+from fitness import settings
+from fitness import weightlog
 
 
 # ==============================================================================
@@ -26,10 +29,10 @@ MODE_UNITS = {'imperial': {'height': 'in.',
               'metric': {'height': 'cm.',
                          'weight': 'kg.'}}
 GENDERS = ('male', 'female')
+DATE_FORMAT = '%Y-%m-%d %H:%M'
+FEEDBACK_DELAY_MS = 250
 
-TEMPLATE_ROOT = os.path.realpath(__file__)
-TEMPLATE_ROOT = os.path.dirname(TEMPLATE_ROOT)
-WEIGHT_LOG_TEMPLATE = os.path.join(TEMPLATE_ROOT, 'resources', 'weight_log_template.html')
+WEIGHT_LOG_TEMPLATE = report.WEIGHT_LOG_HTML
 
 
 # ==============================================================================
@@ -38,7 +41,8 @@ WEIGHT_LOG_TEMPLATE = os.path.join(TEMPLATE_ROOT, 'resources', 'weight_log_templ
 def getWeightLogDocument(height_cm, weight_kg, age, body_fat, male, equation, modifier):
     """
     Generates an HTML document representing a person's weight log based on the
-    given body metrics
+    given body metrics. The template is compiled once and cached, see
+    fitness.report
 
     :param height_cm: your height in centimeters
     :type height_cm: float
@@ -62,59 +66,121 @@ def getWeightLogDocument(height_cm, weight_kg, age, body_fat, male, equation, mo
     :return: html document
     :rtype: string
     """
-    # compute data
-    weight_data = body_weight.getWeightData(height_cm, weight_kg, age, body_fat, male, equation, modifier, precision=2)
-    weight_kg = weight_data.get('weight', 'undefined')
-    weight_units = 'kg'
-    body_fat = weight_data.get('bf', 'undefined')
-    lbm = weight_data.get('lbm', 'undefined')
-    bmr = weight_data.get('bmr', 'undefined')
-    bmr_multiplier = modifier
-    tdee = weight_data.get('tdee', 'undefined')
-
-    # compute macros data
-    macros_data = body_weight.getMacrosData(weight_kg)
-    cut = macros_data.get("cut", {}).get("total", 0.0)
-    maintain = macros_data.get("maintain", {}).get("total", 0.0)
-    gain = macros_data.get("bulk", {}).get("total", 0.0)
-
-    # generate document
-    document = ''
-    with open(WEIGHT_LOG_TEMPLATE, 'r') as infile:
-        document = infile.read()
-
-    old = re.findall("<style.*style>", document, re.DOTALL)
-    if old:
-        new = old[0].replace('{', '{{')
-        new = new.replace('}', '}}')
-        document = document.replace(old[0], new)
-
-    document = document.format(weight=weight_kg,
-                               weight_units=weight_units,
-                               body_fat=body_fat,
-                               lbm=lbm,
-                               bmr=bmr,
-                               bmr_multiplier=bmr_multiplier,
-                               tdee=tdee,
-                               cut=cut,
-                               maintain=maintain,
-                               bulk=gain)
-    return document
-
-
-class Body_Weight_Table(QtGui.QTableWidget):
+    return report.weight_log_document(
+        height_cm, weight_kg, age, body_fat, male, equation, modifier,
+        template=WEIGHT_LOG_TEMPLATE
+    )
+
+
+class WeightLogModel(QtCore.QAbstractTableModel):
     """
-    QTableWidget for displaying body weight information
+    Table model over a columnar weight log, newest record first. Rows are
+    handed to the view in batches of FETCH_SIZE as it scrolls, and cell text
+    is formatted only when a cell is displayed. The log itself is loaded in
+    full before the model is built, see weightlog.load_columns, so fetching
+    in batches saves creating view rows, not reading the file.
+
+    Public Attributes:
+        :attr columns: the weight log records displayed
+        :type columns: instance of <class 'weightlog.WeightLogColumns'>
+    """
+    FETCH_SIZE = 256
+    HEADERS = ('date',) + weightlog.FIELDS
+
+    def __init__(self, columns, parent=None):
+        """
+        Constructor method
+
+        :param columns: weight log records, see weightlog.load_columns
+        :type columns: instance of <class 'weightlog.WeightLogColumns'>
+        :param parent: this model's parent object
+        :type parent: instance of <class 'QObject'>
+        :return: n/a
+        :rtype: n/a
+        """
+        super(WeightLogModel, self).__init__(parent)
+        self._columns = columns
+        self._fetched = 0
+
+    @property
+    def columns(self):
+        """
+        Returns the weight log records displayed by this model
+
+        :return: weight log records
+        :rtype: instance of <class 'weightlog.WeightLogColumns'>
+        """
+        return self._columns
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._fetched
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._fetched < len(self._columns)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_SIZE, len(self._columns) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """
+        Returns the text of a cell, formatted from the weight log columns
+
+        :param index: the cell to display
+        :type index: instance of <class 'QtCore.QModelIndex'>
+        :param role: the item data role whose value you wish to fetch
+        :type role: QtCore.Qt.ItemDataRole value
+        :return: cell text
+        :rtype: string, None
+        """
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+
+        row = len(self._columns) - 1 - index.row()
+        column = index.column()
+        if column == 0:
+            timestamp = self._columns.timestamps[row]
+            return datetime.datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT)
+
+        value = self._columns.value(row, self.HEADERS[column])
+        if math.isnan(value):
+            return ''
+        return '{:.{}f}'.format(value, settings.get_settings()['precision'])
+
+
+class Body_Weight_Table(QtWidgets.QTableView):
+    """
+    QTableView for displaying body weight history, see WeightLogModel
 
     Public Attributes:
         None
     """
-    def __init__(self, data=(), parent=None):
+    def __init__(self, data=None, parent=None):
         """
         Constructor method
 
-        :param data: list of tuples representing the rows of data to display
-        :type data: list of tuples
+        :param data: weight log records, or the full path to a weight log file
+        :type data: instance of <class 'weightlog.WeightLogColumns'>, string
         :param parent: this widgets parent object
         :type parent: instance of <class 'QObject'>
         :return: n/a
@@ -122,6 +188,10 @@ class Body_Weight_Table(QtGui.QTableWidget):
         """
         super(Body_Weight_Table, self).__init__(parent=parent)
         self.setAlternatingRowColors(True)
+        if data is None:
+            data = weightlog.WeightLogColumns()
+        elif not isinstance(data, weightlog.WeightLogColumns):
+            data = weightlog.load_columns(data)
         self._data = data
 
         self._buildUi()
@@ -133,16 +203,61 @@ class Body_Weight_Table(QtGui.QTableWidget):
         :return: n/a
         :rtype: n/a
         """
-        for r, row_data in enumerate(self._data):
-            self.insertRow(r)
-            for c, column_data in enumerate(row_data):
-                if r == 0:
-                    self.insertColumn(c)
-                item = QtGui.QTableWidgetItem(column_data)
-                self.setItem(r, c, item)
+        self.setModel(WeightLogModel(self._data, parent=self))
+        self.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 6)
+        self.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
 
 
-class Body_Weight_Widget(QtGui.QWidget):
+class FeedbackSignals(QtCore.QObject):
+    """
+    Signals through which a FeedbackWorker hands its result back to the GUI
+    thread. Both carry the id of the request they answer.
+    """
+    finished = QtCore.pyqtSignal(int, str)
+    failed = QtCore.pyqtSignal(int, str)
+
+
+class FeedbackWorker(QtCore.QRunnable):
+    """
+    Computes and renders a weight log document off the GUI thread, see
+    getWeightLogDocument. A worker whose request has been superseded by the
+    time it runs or finishes drops its result instead of emitting it.
+    """
+    def __init__(self, request_id, is_current, signals, args):
+        """
+        Constructor method
+
+        :param request_id: id of the request this worker answers
+        :type request_id: int
+        :param is_current: called with request_id, returns whether the
+                           request is still the latest one
+        :type is_current: callable
+        :param signals: signals to emit the result with
+        :type signals: instance of <class 'FeedbackSignals'>
+        :param args: getWeightLogDocument arguments
+        :type args: tuple
+        :return: n/a
+        :rtype: n/a
+        """
+        super(FeedbackWorker, self).__init__()
+        self._request_id = request_id
+        self._is_current = is_current
+        self._signals = signals
+        self._args = args
+
+    def run(self):
+        if not self._is_current(self._request_id):
+            return
+        try:
+            document = getWeightLogDocument(*self._args)
+        except Exception as error:
+            self._signals.failed.emit(self._request_id, '{}: {}'.format(type(error).__name__, error))
+            return
+        if self._is_current(self._request_id):
+            self._signals.finished.emit(self._request_id, document)
+
+
+class Body_Weight_Widget(QtWidgets.QWidget):
     """
     User interface for entering in and recording personal body weight metrics
 
@@ -182,6 +297,15 @@ class Body_Weight_Widget(QtGui.QWidget):
         self._gender = 'male'
         self._mode = mode
 
+        # feedback is rendered by workers, only the latest request is shown
+        self._request_id = 0
+        self._thread_pool = QtCore.QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(1)
+        self._feedback_signals = FeedbackSignals(self)
+        self._feedback_timer = QtCore.QTimer(self)
+        self._feedback_timer.setSingleShot(True)
+        self._feedback_timer.setInterval(FEEDBACK_DELAY_MS)
+
         # ui setup
         self._buildUi()
         self._connectSignals()
@@ -279,11 +403,11 @@ class Body_Weight_Widget(QtGui.QWidget):
 
         # convert values
         if mode == 'metric' and self._mode == 'imperial':
-            self._height = height / 2.54
-            self._weight = weight / 0.454
+            self._height = conversions.centimeter_to_inch(height)
+            self._weight = conversions.kilogram_to_pound(weight)
         elif mode == 'imperial' and self._mode == 'metric':
-            self._height = height * 2.54
-            self._weight = weight * 0.454
+            self._height = conversions.inch_to_centimeter(height)
+            self._weight = conversions.pound_to_kilogram(weight)
 
         # update data widgets
         self.height_field.setValue(self._height)
@@ -352,11 +476,13 @@ class Body_Weight_Widget(QtGui.QWidget):
     def _calculate_feedback(self):
         """
         Calculates relevant body metrics based on the data supplied by the user
-        and displays it in the feedback field
+        on a worker thread, which displays them in the feedback field once done
 
         :return: n/a
         :rtype: n/a
         """
+        self._feedback_timer.stop()
+
         age = self.age_field.value()
         height_cm = self.height_field.value()
         weight_kg = self.weight_field.value()
@@ -364,11 +490,67 @@ class Body_Weight_Widget(QtGui.QWidget):
         male = bool(self.gender_combobox.currentIndex())
 
         if self._mode != 'metric':
-            height_cm *= 2.54
-            weight_kg *= 0.454
+            height_cm = conversions.inch_to_centimeter(height_cm)
+            weight_kg = conversions.pound_to_kilogram(weight_kg)
+
+        # supersede any earlier request and drop those still queued
+        self._request_id += 1
+        self._thread_pool.clear()
+        worker = FeedbackWorker(
+            self._request_id, self._is_current_request, self._feedback_signals,
+            (height_cm, weight_kg, age, body_fat, male, None, 1.2)
+        )
+        self._thread_pool.start(worker)
+
+    def _schedule_feedback(self, *args):
+        """
+        Recalculates the feedback once the user stops changing values for
+        FEEDBACK_DELAY_MS, coalescing rapid edits into a single request
+
+        :return: n/a
+        :rtype: n/a
+        """
+        self._feedback_timer.start()
 
-        document = getWeightLogDocument(height_cm, weight_kg, age, body_fat, male, None, 1.2)
-        self.feedback_field.setHtml(document)
+    def _is_current_request(self, request_id):
+        """
+        Returns whether the given feedback request is the latest one. Called
+        from worker threads.
+
+        :param request_id: id of a feedback request
+        :type request_id: int
+        :return: whether the request is still wanted
+        :rtype: bool
+        """
+        return request_id == self._request_id
+
+    def _feedback_finished(self, request_id, document):
+        """
+        Displays a rendered feedback document unless it is stale
+
+        :param request_id: id of the request the document answers
+        :type request_id: int
+        :param document: the rendered html document
+        :type document: string
+        :return: n/a
+        :rtype: n/a
+        """
+        if request_id == self._request_id:
+            self.feedback_field.setHtml(document)
+
+    def _feedback_failed(self, request_id, message):
+        """
+        Displays the error which prevented a feedback document from rendering
+
+        :param request_id: id of the failed request
+        :type request_id: int
+        :param message: error message
+        :type message: string
+        :return: n/a
+        :rtype: n/a
+        """
+        if request_id == self._request_id:
+            self.feedback_field.setPlainText(message)
 
     # --------------------------------------------------------------------------
     # ui set up
@@ -381,67 +563,67 @@ class Body_Weight_Widget(QtGui.QWidget):
         :rtype: n/a
         """
         # units
-        self.units_label = QtGui.QLabel('Units: ')
+        self.units_label = QtWidgets.QLabel('Units: ')
         self.units_label.setAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
-        self.imperial_button = QtGui.QRadioButton('imperial')
-        self.metric_button = QtGui.QRadioButton('metric')
+        self.imperial_button = QtWidgets.QRadioButton('imperial')
+        self.metric_button = QtWidgets.QRadioButton('metric')
 
-        self.unit_buttons_group = QtGui.QButtonGroup()
+        self.unit_buttons_group = QtWidgets.QButtonGroup()
         self.unit_buttons_group.addButton(self.imperial_button)
         self.unit_buttons_group.addButton(self.metric_button)
         self.unit_buttons_group.setExclusive(True)
 
         # age
-        self.age_label = QtGui.QLabel('Age: ')
+        self.age_label = QtWidgets.QLabel('Age: ')
         self.age_label.setAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
-        self.age_field = QtGui.QDoubleSpinBox()
+        self.age_field = QtWidgets.QDoubleSpinBox()
         self.age_field.setFixedWidth(70)
         self.age_field.setRange(1, 200)
         self.age_field.setSingleStep(1)
         self.age_field.setValue(self._age)
 
         # height
-        self.height_label = QtGui.QLabel('Height: ')
+        self.height_label = QtWidgets.QLabel('Height: ')
         self.height_label.setAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
-        self.height_field = QtGui.QDoubleSpinBox()
+        self.height_field = QtWidgets.QDoubleSpinBox()
         self.height_field.setFixedWidth(70)
         self.height_field.setRange(1, 1000)
         self.height_field.setSingleStep(0.1)
         self.height_field.setValue(self._height)
-        self.height_units_label = QtGui.QLabel()
+        self.height_units_label = QtWidgets.QLabel()
 
         # weight
-        self.weight_label = QtGui.QLabel('Weight: ')
+        self.weight_label = QtWidgets.QLabel('Weight: ')
         self.weight_label.setAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
-        self.weight_field = QtGui.QDoubleSpinBox()
+        self.weight_field = QtWidgets.QDoubleSpinBox()
         self.weight_field.setFixedWidth(70)
         self.weight_field.setRange(1, 2000)
         self.weight_field.setSingleStep(0.1)
         self.weight_field.setValue(self._weight)
-        self.weight_units_label = QtGui.QLabel()
+        self.weight_units_label = QtWidgets.QLabel()
 
         # body fat
-        self.bodyFat_label = QtGui.QLabel('Body Fat %: ')
+        self.bodyFat_label = QtWidgets.QLabel('Body Fat %: ')
         self.bodyFat_label.setAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
-        self.bodyFat_field = QtGui.QDoubleSpinBox()
+        self.bodyFat_field = QtWidgets.QDoubleSpinBox()
         self.bodyFat_field.setFixedWidth(70)
         self.bodyFat_field.setRange(1, 100)
         self.bodyFat_field.setSingleStep(0.1)
         self.bodyFat_field.setValue(self._body_fat)
 
         # gender
-        self.gender_label = QtGui.QLabel('Gender: ')
+        self.gender_label = QtWidgets.QLabel('Gender: ')
         self.gender_label.setAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
-        self.gender_combobox = QtGui.QComboBox()
+        self.gender_combobox = QtWidgets.QComboBox()
         self.gender_combobox.addItems(GENDERS)
 
         # data display
-        self.calculate_button = QtGui.QPushButton('Calculate ...')
+        self.calculate_button = QtWidgets.QPushButton('Calculate ...')
         self.calculate_button.setFixedHeight(35)
-        self.feedback_field = QtGui.QTextEdit()
+        self.feedback_field = QtWidgets.QTextEdit()
 
         # data entry lyout
-        self.data_entry_grid = QtGui.QGridLayout()
+        self.data_entry_grid = QtWidgets.QGridLayout()
         self.data_entry_grid.setSpacing(4)
         self.data_entry_grid.setContentsMargins(6, 6, 6, 6)
         self.data_entry_grid.addWidget(self.age_label, 0, 0, 1, 1)
@@ -466,7 +648,7 @@ class Body_Weight_Widget(QtGui.QWidget):
         self.data_entry_grid.setColumnStretch(3, 1)
 
         # main layout
-        self.main_layout = QtGui.QVBoxLayout()
+        self.main_layout = QtWidgets.QVBoxLayout()
         self.main_layout.addLayout(self.data_entry_grid)
         self.main_layout.addWidget(self.calculate_button)
         self.main_layout.addWidget(self.feedback_field)
@@ -502,11 +684,18 @@ class Body_Weight_Widget(QtGui.QWidget):
         self.gender_combobox.currentIndexChanged.connect(self._gender_changed)
         self.calculate_button.clicked.connect(self._calculate_feedback)
 
+        for field in (self.age_field, self.height_field, self.weight_field, self.bodyFat_field):
+            field.valueChanged.connect(self._schedule_feedback)
+        self.gender_combobox.currentIndexChanged.connect(self._schedule_feedback)
+        self._feedback_timer.timeout.connect(self._calculate_feedback)
+        self._feedback_signals.finished.connect(self._feedback_finished)
+        self._feedback_signals.failed.connect(self._feedback_failed)
+
 
 if __name__ == '__main__':
-    app = QtGui.QApplication.instance()
+    app = QtWidgets.QApplication.instance()
     if not app:
-        app = QtGui.QApplication(sys.argv)
+        app = QtWidgets.QApplication(sys.argv)
 
     bww = Body_Weight_Widget()
     bww.show()
@@ -11,6 +11,9 @@ import sys
 # external
 from PyQt5 import QtCore, QtGui, QtWidgets
 
+# local
+from fitness.stats import RollingStats
+
 
 class WeighInModel(QtCore.QAbstractItemModel):
     def __init__(self, parent=None):
@@ -25,6 +28,7 @@ class WeighInModel(QtCore.QAbstractItemModel):
             ["sunday",    0.0],
             ["average",   0.0],
         )
+        self._stats = RollingStats(window=7, values=[None] * 7)
 
     def rowCount(self, parent=QtCore.QModelIndex()):
         """
@@ -112,7 +116,7 @@ class WeighInModel(QtCore.QAbstractItemModel):
 
         if role == QtCore.Qt.DisplayRole:
             value = self._internal_data[row][column]
-            if not isinstance(value, basestring):
+            if not isinstance(value, str):
                 value = repr(value)
             return value
 
@@ -130,8 +134,15 @@ class WeighInModel(QtCore.QAbstractItemModel):
         row = index.row()
         column = index.column()
         if column == 1 and row != 7:
+            value = float(value)
             self._internal_data[row][column] = value
             self.dataChanged.emit(index, index)
+
+            # zero means no weigh-in that day
+            self._stats.replace(row, value or None)
+            self._internal_data[7][1] = self._stats.mean or 0.0
+            average = self.createIndex(7, 1, QtCore.QModelIndex())
+            self.dataChanged.emit(average, average)
             return True
         return False
 
@@ -173,6 +184,7 @@ class WeighInDialog(QtWidgets.QDialog):
         )
         self._labels = []
         self._spinboxes = []
+        self._stats = RollingStats(window=len(self._entries) - 1)
 
         self._build_ui()
         self._connect_signals()
@@ -208,15 +220,13 @@ class WeighInDialog(QtWidgets.QDialog):
             row += 1
 
     def _data_changed(self):
-        values = []
-        for each in self._spinboxes[:-1]:
-            v = each.value()
-            if v:
-                values.append(v)
-        total = 0.0
-        if values:
-            total = sum(values) / len(values)
-        self._spinboxes[-1].setValue(total)
+        # zero means no weigh-in that day
+        sender = self.sender()
+        if sender in self._spinboxes:
+            self._stats.replace(self._spinboxes.index(sender), sender.value() or None)
+        else:
+            self._stats.extend(each.value() or None for each in self._spinboxes[:-1])
+        self._spinboxes[-1].setValue(self._stats.mean or 0.0)
 
     def _connect_signals(self):
         for each in self._spinboxes[:-1]:
@@ -0,0 +1,882 @@
+"""
+weightlog.py
+
+Description:
+    Storage backends for the weight log records written by
+    fitness.bodyweight.update_weight_log
+
+    Every backend stores weight data records keyed by the time.time() timestamp
+    at which they were recorded:
+        legacy JSON (*.json): one dictionary of timestamp strings, rewritten
+                              as a whole on every update
+        JSON lines (*.jsonl): one JSON object per line, appended in place
+        binary (*.wlog): fixed-width records of doubles after a short header,
+                         appended in place and read through mmap
+
+    Any log can also be loaded into a WeightLogColumns store: one array of
+    doubles per field, sorted by timestamp, for displaying and analysing long
+    histories without keeping a dictionary per record. Its sorted timestamps
+    double as an index for time range, latest and weekly/monthly bucket
+    queries, see get_columns.
+"""
+# Python standard libraries
+import array
+import bisect
+import datetime
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+# local libraries
+from fitness.fileutils import atomic_write
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+BACKENDS = {}
+DEFAULT_EXTENSION = ".jsonl"
+FIELDS = ("weight", "bf", "lbm", "bmr", "activeness", "tdee")
+PERIODS = ("day", "week", "month")
+
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+# ==============================================================================
+# general
+# ==============================================================================
+def register_backend(cls):
+    """
+    Class decorator which makes a WeightLog subclass available to open_log for
+    files with the class's extension
+
+    :param cls: the backend to register
+    :type cls: subclass of <class 'WeightLog'>
+    :return: the registered class
+    :rtype: subclass of <class 'WeightLog'>
+    """
+    BACKENDS[cls.extension] = cls
+    return cls
+
+
+def open_log(filepath):
+    """
+    Returns the weight log backend suited to the given file's extension.
+    Files with an unregistered extension are stored as JSON lines.
+
+    :param filepath: full path to a weight log file
+    :type filepath: string
+    :return: weight log
+    :rtype: instance of <class 'WeightLog'>
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    cls = BACKENDS.get(extension, BACKENDS[DEFAULT_EXTENSION])
+    return cls(filepath)
+
+
+def migrate(sourcefile, outputfile=None, force=False):
+    """
+    Copies every record of the sourcefile weight log into outputfile, converting
+    between storage formats based on the two file extensions. The default
+    outputfile is sourcefile with a .jsonl extension, which turns a legacy
+    JSON log into an append-only one.
+
+    :param sourcefile: full path to the weight log to read
+    :type sourcefile: string
+    :param outputfile: full path to the weight log to write
+    :type outputfile: string
+    :param force: replace outputfile if it already exists
+    :type force: bool
+    :return: the output file name
+    :rtype: string
+    """
+    if not os.path.isfile(sourcefile):
+        raise IOError("Weight log does not exist: {}".format(sourcefile))
+    if not outputfile:
+        outputfile = os.path.splitext(sourcefile)[0] + DEFAULT_EXTENSION
+    if os.path.abspath(outputfile) == os.path.abspath(sourcefile):
+        raise IOError("Cannot migrate a weight log onto itself: {}".format(sourcefile))
+    if os.path.exists(outputfile) and not force:
+        raise IOError("Weight log already exists, pass force to replace it: {}".format(outputfile))
+
+    source = open_log(sourcefile)
+    destination = open_log(outputfile)
+    destination.write(sorted(source.read().items()))
+    return outputfile
+
+
+def load_columns(filepath):
+    """
+    Loads the given weight log into a columnar store, see WeightLog.columns
+
+    :param filepath: full path to a weight log file
+    :type filepath: string
+    :return: the log's records sorted by timestamp
+    :rtype: instance of <class 'WeightLogColumns'>
+    """
+    return open_log(filepath).columns()
+
+
+def get_columns(filepath):
+    """
+    Returns the given weight log as a columnar store, loading it only if it
+    is not cached or the file has changed since it was loaded. Repeated
+    queries against an unchanged log then cost time proportional to their
+    result only, see WeightLogColumns.range, latest and buckets.
+
+    The returned store is shared between callers and must not be modified.
+
+    :param filepath: full path to a weight log file
+    :type filepath: string
+    :return: the log's records sorted by timestamp
+    :rtype: instance of <class 'WeightLogColumns'>
+    """
+    stat = os.stat(filepath)
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _CACHE.get(filepath)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with _LOCK:
+        columns = load_columns(filepath)
+        _CACHE[filepath] = (key, columns)
+    return columns
+
+
+def _timestamp(value):
+    """
+    Returns the given time as seconds since the epoch. Dates and naive
+    datetimes are taken as local time, like the time.time() timestamps the
+    weight logs record.
+
+    :param value: a time
+    :type value: float, <class 'datetime.date'>, <class 'datetime.datetime'>
+    :return: seconds since the epoch
+    :rtype: float
+    """
+    if isinstance(value, datetime.datetime):
+        return time.mktime(value.timetuple()) + value.microsecond / 1e6
+    if isinstance(value, datetime.date):
+        return time.mktime(value.timetuple())
+    return float(value)
+
+
+def _period_start(timestamp, period):
+    """
+    Returns the local midnight starting the day, week (monday) or month the
+    given timestamp falls in
+
+    :param timestamp: seconds since the epoch
+    :type timestamp: float
+    :param period: one of PERIODS
+    :type period: string
+    :return: start of the period
+    :rtype: <class 'datetime.date'>
+    """
+    date = datetime.date.fromtimestamp(timestamp)
+    if period == "week":
+        return date - datetime.timedelta(days=date.weekday())
+    if period == "month":
+        return date.replace(day=1)
+    return date
+
+
+def _next_period(date, period):
+    """
+    Returns the start of the period following the one starting at date
+
+    :param date: start of a period, see _period_start
+    :type date: <class 'datetime.date'>
+    :param period: one of PERIODS
+    :type period: string
+    :return: start of the next period
+    :rtype: <class 'datetime.date'>
+    """
+    if period == "week":
+        return date + datetime.timedelta(days=7)
+    if period == "month":
+        return (date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return date + datetime.timedelta(days=1)
+
+
+def compact(filepath):
+    """
+    Compacts the given weight log in place. Meant to be run periodically,
+    e.g. from cron, against append-only logs.
+
+    :param filepath: full path to a weight log file
+    :type filepath: string
+    :return: number of records kept
+    :rtype: int
+    """
+    if not os.path.isfile(filepath):
+        raise IOError("Weight log does not exist: {}".format(filepath))
+    return open_log(filepath).compact()
+
+
+# ==============================================================================
+# classes
+# ==============================================================================
+class WeightLog(object):
+    """
+    Base class for weight log storage backends
+
+    Public Attributes:
+        :attr filepath: the file this log reads from and writes to
+        :type filepath: string
+    """
+    extension = None
+
+    def __init__(self, filepath):
+        """
+        Constructor method
+
+        :param filepath: full path to the weight log file
+        :type filepath: string
+        :return: n/a
+        :rtype: n/a
+        """
+        self._filepath = filepath
+
+    @property
+    def filepath(self):
+        """
+        Returns the file this log reads from and writes to
+
+        :return: full path to the weight log file
+        :rtype: string
+        """
+        return self._filepath
+
+    def append(self, timestamp, record):
+        """
+        Adds one weight data record to this log
+
+        :param timestamp: seconds since the epoch the record was taken at
+        :type timestamp: float
+        :param record: weight data as returned by bodyweight.get_weight_data
+        :type record: dict
+        :return: n/a
+        :rtype: n/a
+        """
+        raise NotImplementedError
+
+    def entries(self):
+        """
+        Yields every record in this log in storage order
+
+        :return: timestamp and weight data pairs like: (float, {})
+        :rtype: generator
+        """
+        raise NotImplementedError
+
+    def write(self, entries):
+        """
+        Atomically replaces the contents of this log with the given entries
+
+        :param entries: timestamp and weight data pairs like: (float, {})
+        :type entries: iterable
+        :return: n/a
+        :rtype: n/a
+        """
+        raise NotImplementedError
+
+    def read(self):
+        """
+        Returns every record in this log. Later records replace earlier ones
+        recorded at the same timestamp.
+
+        :return: weight data by timestamp
+        :rtype: dict
+        """
+        if not os.path.isfile(self._filepath):
+            return {}
+        return dict(self.entries())
+
+    def columns(self):
+        """
+        Returns every record in this log as one array per field, sorted by
+        timestamp. Later records replace earlier ones recorded at the same
+        timestamp and missing fields are stored as NaN.
+
+        :return: columnar records
+        :rtype: instance of <class 'WeightLogColumns'>
+        """
+        columns = WeightLogColumns()
+        if os.path.isfile(self._filepath):
+            for timestamp, record in self.entries():
+                columns.append(timestamp, record)
+        columns.sort()
+        return columns
+
+    def compact(self):
+        """
+        Rewrites this log sorted by timestamp, without duplicate or unreadable
+        records
+
+        :return: number of records kept
+        :rtype: int
+        """
+        data = self.read()
+        self.write(sorted(data.items()))
+        return len(data)
+
+
+@register_backend
+class JsonWeightLog(WeightLog):
+    """
+    Legacy weight log stored as a single JSON dictionary keyed by timestamp.
+    Every append rewrites the whole file.
+    """
+    extension = ".json"
+
+    def append(self, timestamp, record):
+        """
+        Adds one weight data record by rewriting the whole log
+
+        :param timestamp: seconds since the epoch the record was taken at
+        :type timestamp: float
+        :param record: weight data as returned by bodyweight.get_weight_data
+        :type record: dict
+        :return: n/a
+        :rtype: n/a
+        """
+        data = self.read()
+        data[timestamp] = record
+        self.write(sorted(data.items()))
+
+    def entries(self):
+        """
+        Yields every record in this log sorted by timestamp. An unreadable
+        file yields nothing.
+
+        :return: timestamp and weight data pairs like: (float, {})
+        :rtype: generator
+        """
+        with open(self._filepath, "r") as infile:
+            try:
+                data = json.load(infile)
+            except ValueError:
+                data = {}
+
+        for key in sorted(data, key=float):
+            yield float(key), data[key]
+
+    def write(self, entries):
+        """
+        Atomically replaces this log with a JSON dictionary of the given entries
+
+        :param entries: timestamp and weight data pairs like: (float, {})
+        :type entries: iterable
+        :return: n/a
+        :rtype: n/a
+        """
+        data = dict((repr(float(ts)), record) for ts, record in entries)
+        atomic_write(self._filepath, [json.dumps(data, indent=4, sort_keys=True)])
+
+
+@register_backend
+class JsonLinesWeightLog(WeightLog):
+    """
+    Append-only weight log storing one JSON record per line like:
+        {"activeness": 1.2, "bf": 12.0, ..., "timestamp": 1535696461.35}
+
+    Appends write a single line with O_APPEND and fsync it, so their cost does
+    not depend on the size of the log. A crash can at worst leave a partial
+    final line, which is skipped when reading and dropped by compact().
+    """
+    extension = ".jsonl"
+
+    @staticmethod
+    def _dumps(timestamp, record):
+        """
+        Returns one record as a line of JSON
+
+        :param timestamp: seconds since the epoch the record was taken at
+        :type timestamp: float
+        :param record: weight data as returned by bodyweight.get_weight_data
+        :type record: dict
+        :return: the record and its timestamp, newline terminated
+        :rtype: string
+        """
+        record = dict(record)
+        record["timestamp"] = float(timestamp)
+        return json.dumps(record, sort_keys=True) + "\n"
+
+    def append(self, timestamp, record):
+        """
+        Appends one weight data record as a line and fsyncs it
+
+        :param timestamp: seconds since the epoch the record was taken at
+        :type timestamp: float
+        :param record: weight data as returned by bodyweight.get_weight_data
+        :type record: dict
+        :return: n/a
+        :rtype: n/a
+        """
+        line = self._dumps(timestamp, record).encode("utf-8")
+        fd = os.open(self._filepath, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # a torn final line from an earlier crash must not swallow this record
+            if os.fstat(fd).st_size and not self._ends_with_newline():
+                line = b"\n" + line
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _ends_with_newline(self):
+        """
+        Returns whether the last line of this log is complete
+
+        :return: True if the file ends with a newline
+        :rtype: bool
+        """
+        with open(self._filepath, "rb") as infile:
+            infile.seek(-1, os.SEEK_END)
+            return infile.read(1) == b"\n"
+
+    def entries(self):
+        """
+        Yields every record in this log in storage order, skipping lines which
+        are not complete JSON records
+
+        :return: timestamp and weight data pairs like: (float, {})
+        :rtype: generator
+        """
+        with open(self._filepath, "r") as infile:
+            for line in infile:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict) or "timestamp" not in record:
+                    continue
+                yield float(record.pop("timestamp")), record
+
+    def write(self, entries):
+        """
+        Atomically replaces this log with one line per given entry
+
+        :param entries: timestamp and weight data pairs like: (float, {})
+        :type entries: iterable
+        :return: n/a
+        :rtype: n/a
+        """
+        atomic_write(self._filepath, (self._dumps(ts, record) for ts, record in entries))
+
+
+class WeightLogColumns(object):
+    """
+    Compact columnar copy of a weight log: a timestamp array and one array of
+    doubles per weight data field, see FIELDS. Rows are added with append and
+    put in timestamp order by sort once the store is filled, see
+    WeightLog.columns. Stores returned by get_columns are shared between
+    callers and must not be appended to.
+
+    Public Attributes:
+        :attr timestamps: seconds since the epoch of every row
+        :type timestamps: array.array
+    """
+    __slots__ = ("_timestamps", "_columns")
+
+    def __init__(self):
+        """
+        Constructor method
+
+        :return: n/a
+        :rtype: n/a
+        """
+        self._timestamps = array.array("d")
+        self._columns = dict((field, array.array("d")) for field in FIELDS)
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def __getitem__(self, index):
+        """
+        Returns one row
+
+        :param index: row number
+        :type index: int
+        :return: timestamp and weight data pairs like: (float, {})
+        :rtype: tuple
+        """
+        record = dict((field, values[index]) for field, values in self._columns.items())
+        return self._timestamps[index], record
+
+    @property
+    def timestamps(self):
+        return self._timestamps
+
+    def column(self, field):
+        """
+        Returns the values of one field for every row
+
+        :param field: a weight data field, see FIELDS
+        :type field: string
+        :return: field values, NaN where a record lacked the field
+        :rtype: array.array
+        """
+        return self._columns[field]
+
+    def value(self, index, field):
+        """
+        Returns the value of one field of one row
+
+        :param index: row number
+        :type index: int
+        :param field: a weight data field, see FIELDS
+        :type field: string
+        :return: the value, NaN when the record lacked the field
+        :rtype: float
+        """
+        return self._columns[field][index]
+
+    def append(self, timestamp, record):
+        """
+        Adds one record as the last row
+
+        :param timestamp: seconds since the epoch the record was taken at
+        :type timestamp: float
+        :param record: weight data as returned by bodyweight.get_weight_data
+        :type record: dict
+        :return: n/a
+        :rtype: n/a
+        """
+        self._timestamps.append(timestamp)
+        for field, values in self._columns.items():
+            value = record.get(field)
+            values.append(float("nan") if value is None else value)
+
+    def _slice(self, first, last):
+        """
+        Returns rows first to last (exclusive) as a new store
+
+        :param first: first row number
+        :type first: int
+        :param last: row number after the last row
+        :type last: int
+        :return: the rows
+        :rtype: instance of <class 'WeightLogColumns'>
+        """
+        columns = WeightLogColumns()
+        columns._timestamps = self._timestamps[first:last]
+        for field, values in self._columns.items():
+            columns._columns[field] = values[first:last]
+        return columns
+
+    def range(self, start=None, end=None):
+        """
+        Returns the rows recorded within start <= timestamp < end
+
+        :param start: earliest time, None for the first row
+        :type start: float, <class 'datetime.date'>, <class 'datetime.datetime'>
+        :param end: time after the last row wanted, None for no limit
+        :type end: float, <class 'datetime.date'>, <class 'datetime.datetime'>
+        :return: the rows in range
+        :rtype: instance of <class 'WeightLogColumns'>
+        """
+        first = 0
+        last = len(self._timestamps)
+        if start is not None:
+            first = bisect.bisect_left(self._timestamps, _timestamp(start))
+        if end is not None:
+            last = bisect.bisect_left(self._timestamps, _timestamp(end), first)
+        return self._slice(first, max(first, last))
+
+    def latest(self, count=1):
+        """
+        Returns the most recent rows
+
+        :param count: number of rows
+        :type count: int
+        :return: up to count of the latest rows, oldest first
+        :rtype: instance of <class 'WeightLogColumns'>
+        """
+        return self._slice(max(len(self._timestamps) - count, 0), len(self._timestamps))
+
+    def buckets(self, period="week", start=None, end=None):
+        """
+        Groups the rows within start <= timestamp < end by the local day, week
+        (starting monday) or month they were recorded in. Periods without any
+        rows are skipped without being visited.
+
+        :param period: one of PERIODS
+        :type period: string
+        :param start: earliest time, None for the first row
+        :type start: float, <class 'datetime.date'>, <class 'datetime.datetime'>
+        :param end: time after the last row wanted, None for no limit
+        :type end: float, <class 'datetime.date'>, <class 'datetime.datetime'>
+        :return: first day of every period and its rows like:
+                 [(<class 'datetime.date'>, <class 'WeightLogColumns'>), ...]
+        :rtype: list
+        """
+        if period not in PERIODS:
+            raise ValueError("Unknown period '{}', expected one of {}".format(period, PERIODS))
+
+        timestamps = self._timestamps
+        first = 0
+        last = len(timestamps)
+        if start is not None:
+            first = bisect.bisect_left(timestamps, _timestamp(start))
+        if end is not None:
+            last = bisect.bisect_left(timestamps, _timestamp(end), first)
+
+        buckets = []
+        while first < last:
+            bucket = _period_start(timestamps[first], period)
+            boundary = _timestamp(_next_period(bucket, period))
+            index = bisect.bisect_left(timestamps, boundary, first, last)
+            buckets.append((bucket, self._slice(first, index)))
+            first = index
+        return buckets
+
+    def sort(self):
+        """
+        Sorts the rows by timestamp, keeping only the last row appended for
+        any timestamp. Logs written in order are left untouched.
+
+        :return: n/a
+        :rtype: n/a
+        """
+        timestamps = self._timestamps
+        if all(timestamps[i] < timestamps[i + 1] for i in range(len(timestamps) - 1)):
+            return
+
+        rows = dict((ts, i) for i, ts in enumerate(timestamps))
+        order = [rows[ts] for ts in sorted(rows)]
+        self._timestamps = array.array("d", (timestamps[i] for i in order))
+        for field, values in list(self._columns.items()):
+            self._columns[field] = array.array("d", (values[i] for i in order))
+
+
+@register_backend
+class BinaryWeightLog(WeightLog):
+    """
+    Append-only weight log of fixed-width binary records. The file starts with
+    a HEADER holding MAGIC, the format version and the number of fields per
+    record, followed by one RECORD per weigh-in: the timestamp and then the
+    FIELDS values as little-endian doubles, NaN for a missing value.
+
+    Reads map the file into memory instead of parsing it, and range() bisects
+    on the timestamps of the mapped records, so a range scan only unpacks the
+    records it returns. Records are expected in timestamp order, as
+    update_weight_log appends them; compact() restores the order otherwise.
+    A crash can at worst leave a partial final record, which is ignored when
+    reading and truncated by the next append.
+    """
+    extension = ".wlog"
+
+    MAGIC = b"FWLOG\x00\x00\x00"
+    VERSION = 1
+    HEADER = struct.Struct("<8sHH4x")
+    RECORD = struct.Struct("<{}d".format(len(FIELDS) + 1))
+
+    @classmethod
+    def _header(cls):
+        """
+        Returns the header every binary weight log starts with
+
+        :return: packed HEADER
+        :rtype: bytes
+        """
+        return cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(FIELDS))
+
+    @classmethod
+    def _pack(cls, timestamp, record):
+        """
+        Returns one record packed as a RECORD
+
+        :param timestamp: seconds since the epoch the record was taken at
+        :type timestamp: float
+        :param record: weight data as returned by bodyweight.get_weight_data
+        :type record: dict
+        :return: packed record, NaN for every missing field
+        :rtype: bytes
+        """
+        nan = float("nan")
+        return cls.RECORD.pack(
+            float(timestamp), *[nan if record.get(f) is None else record[f] for f in FIELDS]
+        )
+
+    @classmethod
+    def _unpack(cls, values):
+        """
+        Returns the record of unpacked RECORD values
+
+        :param values: timestamp followed by the FIELDS values
+        :type values: tuple
+        :return: timestamp and weight data pair like: (float, {})
+        :rtype: tuple
+        """
+        # NaN marks a field the record did not have
+        return values[0], dict((f, v) for f, v in zip(FIELDS, values[1:]) if v == v)
+
+    def _check_header(self, data):
+        """
+        Raises an IOError unless data starts with the header of this version
+
+        :param data: start of the log file
+        :type data: bytes, <class 'mmap.mmap'>
+        :return: n/a
+        :rtype: n/a
+        """
+        magic, version, fields = self.HEADER.unpack_from(data)
+        if magic != self.MAGIC or version != self.VERSION or fields != len(FIELDS):
+            raise IOError("Not a version {} binary weight log: {}".format(self.VERSION, self._filepath))
+
+    def _mapped(self):
+        """
+        Returns the log file mapped into memory, or None when it holds no
+        records, along with the number of whole records it holds
+
+        :return: read only mapping and record count like: (mmap, int)
+        :rtype: tuple
+        """
+        with open(self._filepath, "rb") as infile:
+            size = os.fstat(infile.fileno()).st_size
+            if size < self.HEADER.size:
+                return None, 0
+            data = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._check_header(data)
+        except Exception:
+            data.close()
+            raise
+        return data, (size - self.HEADER.size) // self.RECORD.size
+
+    def append(self, timestamp, record):
+        """
+        Appends one weight data record and fsyncs it, writing the header
+        first to an empty log
+
+        :param timestamp: seconds since the epoch the record was taken at
+        :type timestamp: float
+        :param record: weight data as returned by bodyweight.get_weight_data
+        :type record: dict
+        :return: n/a
+        :rtype: n/a
+        """
+        data = self._pack(timestamp, record)
+        fd = os.open(self._filepath, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size < self.HEADER.size:
+                os.ftruncate(fd, 0)
+                data = self._header() + data
+            else:
+                self._check_header(os.pread(fd, self.HEADER.size, 0))
+                # drop a torn final record from an earlier crash
+                torn = (size - self.HEADER.size) % self.RECORD.size
+                if torn:
+                    os.ftruncate(fd, size - torn)
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def entries(self):
+        """
+        Yields every whole record in this log in storage order
+
+        :return: timestamp and weight data pairs like: (float, {})
+        :rtype: generator
+        """
+        return self.range()
+
+    def range(self, start=None, end=None):
+        """
+        Yields the records whose timestamps fall within start <= timestamp < end
+
+        :param start: earliest time, None for the first record
+        :type start: float, <class 'datetime.date'>, <class 'datetime.datetime'>
+        :param end: time after the last record wanted, None for no limit
+        :type end: float, <class 'datetime.date'>, <class 'datetime.datetime'>
+        :return: timestamp and weight data pairs like: (float, {})
+        :rtype: generator
+        """
+        data, count = self._mapped()
+        if data is None:
+            return
+        view = memoryview(data)
+        try:
+            timestamps = _RecordTimestamps(data, count, self.HEADER.size, self.RECORD.size)
+            first = 0 if start is None else bisect.bisect_left(timestamps, _timestamp(start))
+            last = count if end is None else max(first, bisect.bisect_left(timestamps, _timestamp(end), first))
+            offset = self.HEADER.size + first * self.RECORD.size
+            records = view[offset:offset + (last - first) * self.RECORD.size]
+            try:
+                for values in self.RECORD.iter_unpack(records):
+                    yield self._unpack(values)
+            finally:
+                records.release()
+        finally:
+            view.release()
+            data.close()
+
+    def columns(self):
+        """
+        Returns every record in this log as one array per field, copied
+        straight from the mapped file instead of unpacking each record
+
+        :return: columnar records
+        :rtype: instance of <class 'WeightLogColumns'>
+        """
+        columns = WeightLogColumns()
+        data, count = self._mapped()
+        if data is None:
+            return columns
+        try:
+            values = array.array("d")
+            values.frombytes(data[self.HEADER.size:self.HEADER.size + count * self.RECORD.size])
+        finally:
+            data.close()
+        if struct.pack("=d", 1.0) != struct.pack("<d", 1.0):
+            values.byteswap()
+
+        width = len(FIELDS) + 1
+        columns._timestamps = values[0::width]
+        for i, field in enumerate(FIELDS, 1):
+            columns._columns[field] = values[i::width]
+        columns.sort()
+        return columns
+
+    def write(self, entries):
+        """
+        Atomically replaces this log with the header and one record per
+        given entry
+
+        :param entries: timestamp and weight data pairs like: (float, {})
+        :type entries: iterable
+        :return: n/a
+        :rtype: n/a
+        """
+        chunks = itertools.chain([self._header()], (self._pack(ts, record) for ts, record in entries))
+        atomic_write(self._filepath, chunks, binary=True)
+
+
+class _RecordTimestamps(object):
+    """
+    Read only sequence of the timestamps of mapped binary weight log records,
+    letting bisect search them without unpacking the records
+    """
+    __slots__ = ("_data", "_count", "_offset", "_stride")
+
+    def __init__(self, data, count, offset, stride):
+        self._data = data
+        self._count = count
+        self._offset = offset
+        self._stride = stride
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return struct.unpack_from("<d", self._data, self._offset + index * self._stride)[0]
@@ -3,7 +3,35 @@ workout_utils.py
 
 Description:
     Tools and utilities for managing the various elements of an individual workout
+
+    Plate loading is planned from loading tables: for a plate inventory and a
+    bar, every weight the bar can be loaded to and the fewest plates per side
+    which make it up are computed once and cached per inventory. Planning the
+    warmups of a whole session, program or gym is then a lookup per set.
 """
+# Python standard libraries
+import bisect
+import threading
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+BAR_WEIGHT = 20.0
+PLATES = {
+    # plate weight: number of plates, counting both sides of the bar
+    25.0: 2,
+    20.0: 8,
+    15.0: 2,
+    10.0: 2,
+    5.0: 2,
+    2.5: 2,
+    1.25: 2
+}
+PRECISION = 1000  # weights are added up in grams to avoid float drift
+
+_CACHE = {}
+_LOCK = threading.Lock()
 
 
 # ==============================================================================
@@ -28,14 +56,184 @@ def get_warmup_weights(workweight, set_factors=(0.5, 0.5, 0.7, 0.9), min_plate=1
 
     warmups = [0] * len(set_factors)
     for i, f in enumerate(set_factors):
-        set_weight = weight * f
+        set_weight = workweight * f
         if min_plate:
-            set_weight = ((weight * f) // min_plate ) * min_plate
+            set_weight = ((workweight * f) // min_plate) * min_plate
         warmups[i] = set_weight
     return warmups
- 
 
- if __name__ == "__main__":
+
+def _inventory_key(plates, bar):
+    """
+    Returns a hashable key identifying a plate inventory and bar
+
+    :param plates: number of plates by plate weight, counting both sides
+    :type plates: dict
+    :param bar: weight of the empty bar
+    :type bar: float
+    :return: cache key
+    :rtype: tuple
+    """
+    return tuple(sorted((float(w), int(n)) for w, n in plates.items() if n >= 2)), float(bar)
+
+
+def get_loading_table(plates=None, bar=BAR_WEIGHT):
+    """
+    Returns the loading table of the given plate inventory and bar, building
+    it only the first time an inventory is used
+
+    :param plates: number of plates by plate weight, counting both sides of
+                   the bar, defaults to PLATES
+    :type plates: dict
+    :param bar: weight of the empty bar
+    :type bar: float
+    :return: loading table
+    :rtype: instance of <class 'LoadingTable'>
+    """
+    key = _inventory_key(PLATES if plates is None else plates, bar)
+    table = _CACHE.get(key)
+    if table is None:
+        with _LOCK:
+            table = _CACHE.get(key)
+            if table is None:
+                table = _CACHE[key] = LoadingTable(*key)
+    return table
+
+
+def plan_warmups(workweights, set_factors=(0.5, 0.5, 0.7, 0.9), plates=None, bar=BAR_WEIGHT):
+    """
+    Plans the warmup sets of many working weights at once, e.g. every
+    exercise of a session or every session of a program. Each warmup is the
+    heaviest loadable weight not above its share of the working weight, and
+    never lighter than the empty bar.
+
+    :param workweights: working set weights
+    :type workweights: iterable
+    :param set_factors: percentages of the working weight used for warm up sets
+    :type set_factors: list, tuple
+    :param plates: number of plates by plate weight, counting both sides of
+                   the bar, defaults to PLATES
+    :type plates: dict
+    :param bar: weight of the empty bar
+    :type bar: float
+    :return: warmup sets for each working weight, in the given order, like:
+             [[(weight, plates_per_side), ...], ...]
+    :rtype: list
+    """
+    table = get_loading_table(plates, bar)
+    planned = {}
+    plans = []
+    for workweight in workweights:
+        plan = planned.get(workweight)
+        if plan is None:
+            plan = planned[workweight] = [table.load(workweight * f) for f in set_factors]
+        plans.append(plan)
+    return plans
+
+
+# ==============================================================================
+# classes
+# ==============================================================================
+class LoadingTable(object):
+    """
+    Every weight a bar can be loaded to with a plate inventory, with the
+    fewest plates per side for each, see get_loading_table
+
+    Public Attributes:
+        :attr bar: weight of the empty bar
+        :type bar: float
+        :attr weights: sorted loadable weights, the empty bar included
+        :type weights: list
+    """
+    __slots__ = ("_bar", "_weights", "_plates")
+
+    def __init__(self, inventory, bar):
+        """
+        Constructor method
+
+        :param inventory: plate weight and count pairs, counting both sides
+        :type inventory: tuple
+        :param bar: weight of the empty bar
+        :type bar: float
+        :return: n/a
+        :rtype: n/a
+        """
+        # per side load in grams: plates per side, heaviest first
+        loads = {0: ()}
+        for plate, count in sorted(inventory, reverse=True):
+            grams = int(round(plate * PRECISION))
+            for load, combo in list(loads.items()):
+                for n in range(1, count // 2 + 1):
+                    total = load + grams * n
+                    candidate = combo + (plate,) * n
+                    current = loads.get(total)
+                    if current is None or len(candidate) < len(current):
+                        loads[total] = candidate
+
+        bar_grams = int(round(bar * PRECISION))
+        self._bar = bar
+        self._weights = []
+        self._plates = {}
+        for load in sorted(loads):
+            weight = (bar_grams + 2 * load) / float(PRECISION)
+            self._weights.append(weight)
+            self._plates[weight] = loads[load]
+
+    def __len__(self):
+        return len(self._weights)
+
+    def __contains__(self, weight):
+        return weight in self._plates
+
+    @property
+    def bar(self):
+        return self._bar
+
+    @property
+    def weights(self):
+        return self._weights
+
+    def plates(self, weight):
+        """
+        Returns the plates loaded on each side of the bar for a loadable weight
+
+        :param weight: a loadable weight, see weights
+        :type weight: float
+        :return: plate weights, heaviest first
+        :rtype: tuple
+        """
+        return self._plates[weight]
+
+    def nearest(self, weight):
+        """
+        Returns the heaviest loadable weight not above the given weight, or the
+        empty bar for weights below it
+
+        :param weight: target weight
+        :type weight: float
+        :return: loadable weight
+        :rtype: float
+        """
+        index = bisect.bisect_right(self._weights, weight + 0.5 / PRECISION)
+        return self._weights[max(index - 1, 0)]
+
+    def load(self, weight):
+        """
+        Returns the nearest loadable weight and the plates per side making it up
+
+        :param weight: target weight
+        :type weight: float
+        :return: loaded weight and plates per side like: (60.0, (20.0,))
+        :rtype: tuple
+        """
+        weight = self.nearest(weight)
+        return weight, self._plates[weight]
+
+
+if __name__ == "__main__":
     for weight in (52.5, 137.5, 90.0, 127.5, 40.0, 77.5):
-        warmups = get_warmup_weights(weight, smallest_plate=1.25):
-        print "{}: {!r}\n".format(weight, *warmups)
+        warmups = get_warmup_weights(weight, min_plate=1.25)
+        print("{}: {!r}".format(weight, warmups))
+
+    for weight, plan in zip((52.5, 137.5), plan_warmups((52.5, 137.5))):
+        print("{}: {!r}".format(weight, plan))
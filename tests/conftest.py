@@ -0,0 +1,14 @@
+"""
+conftest.py
+
+Description:
+    Makes the fitness package importable from a source checkout, the same
+    way bin scripts are run with PYTHONPATH=python
+"""
+# Python standard libraries
+import os
+import sys
+
+
+PYTHON_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "python")
+sys.path.insert(0, os.path.abspath(PYTHON_ROOT))
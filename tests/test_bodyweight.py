@@ -0,0 +1,135 @@
+"""
+test_bodyweight.py
+
+Description:
+    Tests of the batch bmr and weight data functions and weight log backfill
+"""
+# Python standard libraries
+import datetime
+import time
+
+# external
+import pytest
+
+# local libraries
+from fitness import bodyweight
+from fitness import weightlog
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+EQUATIONS = ("harrisBenedict", "mifflinStJeor", "katchMcArdle", None)
+PEOPLE = (
+    # height_cm, weight_kg, age, body_fat, male
+    (180.0, 85.0, 35, 15.0, True),
+    (165.0, 60.0, 28, 24.0, False),
+    (192.5, 102.3, 51, 21.5, True),
+)
+WEIGH_INS = (
+    # weight_kg, body_fat, modifier of consecutive days
+    (85.0, 15.0, 1.2),
+    (84.5, 14.8, 1.375),
+    (84.0, 14.5, 1.55),
+)
+
+
+# ==============================================================================
+# batch
+# ==============================================================================
+@pytest.mark.parametrize("equation", EQUATIONS)
+def test_bmr_batch_matches_bmr(equation):
+    pytest.importorskip("numpy")
+    height_cm, weight_kg, age, body_fat, male = zip(*PEOPLE)
+    values = bodyweight.bmr_batch(height_cm, weight_kg, age, body_fat, male, equation)
+    expected = [bodyweight.bmr(*person[:4], male=person[4], equation=equation) for person in PEOPLE]
+    assert values.tolist() == pytest.approx(expected, rel=1e-12)
+
+
+def test_bmr_batch_broadcasts_scalars():
+    pytest.importorskip("numpy")
+    values = bodyweight.bmr_batch(180.0, [80.0, 85.0, 90.0], 35, 15.0, True, "mifflinStJeor")
+    assert values.shape == (3,)
+    assert values.tolist() == pytest.approx(
+        [bodyweight.bmr_mifflinStJeor(180.0, weight, 35) for weight in (80.0, 85.0, 90.0)], rel=1e-12
+    )
+
+
+@pytest.mark.parametrize("equation", EQUATIONS)
+def test_get_weight_data_batch_matches_get_weight_data(equation):
+    pytest.importorskip("numpy")
+    height_cm, weight_kg, age, body_fat, male = zip(*PEOPLE)
+    modifiers = (1.2, 1.375, 1.55)
+    data = bodyweight.get_weight_data_batch(height_cm, weight_kg, age, body_fat, male, equation, modifiers)
+    assert data.dtype.names == bodyweight.WEIGHT_DATA_FIELDS
+
+    for person, modifier, values in zip(PEOPLE, modifiers, data.tolist()):
+        expected = bodyweight.get_weight_data(
+            *person[:4], male=person[4], equation=equation, modifier=modifier
+        )
+        record = dict(zip(bodyweight.WEIGHT_DATA_FIELDS, values))
+        assert record == pytest.approx(expected, rel=1e-12)
+
+
+# ==============================================================================
+# backfill
+# ==============================================================================
+@pytest.fixture
+def sourcefile(tmp_path):
+    filepath = str(tmp_path / "log.jsonl")
+    log = weightlog.open_log(filepath)
+    for day, (weight, body_fat, modifier) in enumerate(WEIGH_INS):
+        timestamp = time.mktime((datetime.date(2018, 8, 19) + datetime.timedelta(days=day)).timetuple())
+        log.append(timestamp, bodyweight.get_weight_data(180.0, weight, 30, body_fat, modifier=modifier))
+    return filepath
+
+
+def test_backfill_weight_log(sourcefile, tmp_path):
+    pytest.importorskip("numpy")
+    outputfile = str(tmp_path / "backfilled.jsonl")
+    count, _ = bodyweight.backfill_weight_log(
+        sourcefile, outputfile, 180.0, age=35, equation="mifflinStJeor", chunk_size=2
+    )
+    assert count == 3
+
+    source = weightlog.open_log(sourcefile).read()
+    output = weightlog.open_log(outputfile).read()
+    assert sorted(output) == sorted(source)
+    for timestamp, record in source.items():
+        expected = bodyweight.get_weight_data(
+            180.0, record["weight"], 35, record["bf"], equation="mifflinStJeor",
+            modifier=record["activeness"]
+        )
+        assert output[timestamp] == pytest.approx(expected, rel=1e-12)
+
+
+def test_backfill_weight_log_in_place(sourcefile):
+    pytest.importorskip("numpy")
+    count, _ = bodyweight.backfill_weight_log(sourcefile, sourcefile, 180.0, age=35, modifier=1.725)
+    assert count == 3
+    for record in weightlog.open_log(sourcefile).read().values():
+        assert record["activeness"] == 1.725
+        assert record["tdee"] == pytest.approx(record["bmr"] * 1.725, rel=1e-12)
+
+
+def test_backfill_weight_log_birthday(sourcefile, tmp_path):
+    pytest.importorskip("numpy")
+    outputfile = str(tmp_path / "backfilled.jsonl")
+    birthday = datetime.date(1988, 8, 20)
+    bodyweight.backfill_weight_log(
+        sourcefile, outputfile, 180.0, equation="harrisBenedict", birthday=birthday
+    )
+
+    # the person turns 30 on the second day of the log
+    ages = []
+    for timestamp, record in sorted(weightlog.open_log(outputfile).read().items()):
+        for age in (29, 30):
+            expected = bodyweight.bmr_harrisBenedict(180.0, record["weight"], age)
+            if record["bmr"] == pytest.approx(expected, rel=1e-12):
+                ages.append(age)
+    assert ages == [29, 30, 30]
+
+
+def test_backfill_weight_log_requires_age(sourcefile, tmp_path):
+    with pytest.raises(ValueError):
+        bodyweight.backfill_weight_log(sourcefile, str(tmp_path / "backfilled.jsonl"), 180.0)
@@ -0,0 +1,188 @@
+"""
+test_bodyweight_ui.py
+
+Description:
+    Tests of the weight log table model and the body weight widget, run on
+    Qt's offscreen platform
+"""
+# Python standard libraries
+import datetime
+import os
+import threading
+import time
+
+# external
+import pytest
+
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+from PyQt5 import QtCore
+
+# local libraries
+from fitness import settings
+from fitness import weightlog
+from fitness.ui import bodyweight_ui
+
+
+# ==============================================================================
+# fixtures
+# ==============================================================================
+@pytest.fixture(scope="module")
+def app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def widget(app):
+    widget = bodyweight_ui.Body_Weight_Widget(mode="metric")
+    yield widget
+    widget._thread_pool.waitForDone()
+    widget.close()
+
+
+def _wait(app, condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out waiting for the widget")
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def _enter(widget, height=180.0, weight=85.0, age=35, body_fat=15.0):
+    widget.height_field.setValue(height)
+    widget.weight_field.setValue(weight)
+    widget.age_field.setValue(age)
+    widget.bodyFat_field.setValue(body_fat)
+
+
+# ==============================================================================
+# model
+# ==============================================================================
+@pytest.fixture
+def columns(tmp_path):
+    filepath = str(tmp_path / "weight_log.jsonl")
+    log = weightlog.open_log(filepath)
+    for day in range(300):
+        log.append(86400.0 * day, {"weight": 80.0 + day / 100.0, "bf": 15.0})
+    return weightlog.load_columns(filepath)
+
+
+def test_model_fetches_in_batches(app, columns):
+    model = bodyweight_ui.WeightLogModel(columns)
+    assert model.columns is columns
+    assert model.rowCount() == 0
+    assert model.columnCount() == len(weightlog.FIELDS) + 1
+
+    model.fetchMore()
+    assert model.rowCount() == model.FETCH_SIZE
+    assert model.canFetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 300
+    assert not model.canFetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 300
+
+
+def test_model_data(app, columns):
+    model = bodyweight_ui.WeightLogModel(columns)
+    model.fetchMore()
+    precision = settings.get_settings()["precision"]
+    assert model.headerData(1, QtCore.Qt.Horizontal) == "weight"
+
+    # newest record first, missing values left blank
+    assert model.data(model.index(0, 1)) == "{:.{}f}".format(82.99, precision)
+    assert model.data(model.index(0, 0)) == datetime.datetime.fromtimestamp(86400.0 * 299).strftime(
+        bodyweight_ui.DATE_FORMAT
+    )
+    assert model.data(model.index(0, model.HEADERS.index("tdee"))) == ""
+
+    # rows not fetched yet
+    assert model.data(model.index(299, 0)) is None
+    assert model.data(model.index(0, 1), QtCore.Qt.ToolTipRole) is None
+
+
+def test_table(app, columns):
+    table = bodyweight_ui.Body_Weight_Table(columns)
+    assert table.model().columns is columns
+    assert len(bodyweight_ui.Body_Weight_Table().model().columns) == 0
+
+
+# ==============================================================================
+# widget
+# ==============================================================================
+def test_units(widget):
+    assert widget.height_units_label.text() == "cm"
+    _enter(widget)
+    widget.imperial_button.click()
+    assert widget.mode == "imperial"
+    assert widget.weight_units_label.text() == "lb"
+    assert widget.weight_field.value() == pytest.approx(187.39, abs=0.01)
+
+
+def test_edits_are_coalesced(app, widget):
+    _enter(widget)
+    assert widget._feedback_timer.isActive()
+    assert widget._request_id == 0
+
+    _wait(app, lambda: "72.25 kg" in widget.feedback_field.toPlainText())
+    assert widget._request_id == 1
+
+
+def test_calculate_renders_on_worker(app, widget, monkeypatch):
+    threads = []
+
+    def render(*args):
+        threads.append(threading.current_thread())
+        return "<p>{}</p>".format(args[1])
+
+    monkeypatch.setattr(bodyweight_ui, "getWeightLogDocument", render)
+    _enter(widget)
+    widget.calculate_button.click()
+    _wait(app, lambda: widget.feedback_field.toPlainText() == "85.0")
+    assert not widget._feedback_timer.isActive()
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_stale_requests_are_dropped(app, widget, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    rendered = []
+
+    def render(*args):
+        if not rendered:
+            started.set()
+            release.wait(5.0)
+        rendered.append(args[1])
+        return "<p>{}</p>".format(args[1])
+
+    monkeypatch.setattr(bodyweight_ui, "getWeightLogDocument", render)
+
+    # the first request is still rendering when the next two are made, the
+    # second is dropped from the queue and the first finishes stale
+    _enter(widget, weight=80.0)
+    widget._calculate_feedback()
+    assert started.wait(5.0)
+    widget.weight_field.setValue(81.0)
+    widget._calculate_feedback()
+    widget.weight_field.setValue(82.0)
+    widget._calculate_feedback()
+    release.set()
+
+    _wait(app, lambda: widget.feedback_field.toPlainText() == "82.0")
+    widget._thread_pool.waitForDone()
+    app.processEvents()
+    assert rendered == [80.0, 82.0]
+    assert widget.feedback_field.toPlainText() == "82.0"
+
+    widget._feedback_finished(widget._request_id - 1, "<p>stale</p>")
+    assert widget.feedback_field.toPlainText() == "82.0"
+
+
+def test_failed_request(app, widget, monkeypatch):
+    def render(*args):
+        raise ValueError("Unknown equation")
+
+    monkeypatch.setattr(bodyweight_ui, "getWeightLogDocument", render)
+    widget._calculate_feedback()
+    _wait(app, lambda: widget.feedback_field.toPlainText() == "ValueError: Unknown equation")
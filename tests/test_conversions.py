@@ -0,0 +1,90 @@
+"""
+test_conversions.py
+
+Description:
+    Tests of unit conversions
+"""
+# Python standard libraries
+from fractions import Fraction
+
+# external
+import pytest
+
+# local libraries
+from fitness import conversions
+
+
+# ==============================================================================
+# factors
+# ==============================================================================
+@pytest.mark.parametrize("source, destination, expected", (
+    ("foot", "meter", 0.3048),
+    ("inch", "centimeter", 2.54),
+    ("pound", "kilogram", 0.45359237),
+    ("gallon", "litre", 3.785411784),
+    ("kilogram", "gram", 1000.0),
+))
+def test_factor(source, destination, expected):
+    assert conversions.factor(source, destination) == expected
+
+
+def test_factors_are_rounded_once():
+    for (source, destination), value in conversions.FACTORS.items():
+        exact = conversions.UNITS[source][1] / conversions.UNITS[destination][1]
+        assert value == float(exact), (source, destination)
+
+
+# ==============================================================================
+# convert
+# ==============================================================================
+@pytest.mark.parametrize("value, source, destination, expected", (
+    (12.0, "inch", "foot", 1.0),
+    (3.0, "foot", "yard", 1.0),
+    (1.0, "yard", "inch", 36.0),
+    (4.0, "quart", "gallon", 1.0),
+    (14.0, "pound", "stone", 1.0),
+    (16.0, "ounce", "pound", 1.0),
+    (100.0, "cm", "m", 1.0),
+))
+def test_convert_exact(value, source, destination, expected):
+    assert conversions.convert(value, source, destination) == expected
+
+
+def test_convert_sequences():
+    assert conversions.convert([1.0, 2.0], "ft", "in") == [12.0, 24.0]
+    assert conversions.convert((12.0, 24.0), "in", "ft") == (1.0, 2.0)
+
+
+def test_convert_arrays():
+    numpy = pytest.importorskip("numpy")
+    result = conversions.convert(numpy.array([3.0, 6.0]), "ft", "yd")
+    assert list(result) == [1.0, 2.0]
+
+
+def test_converter():
+    feet_to_yards = conversions.converter("ft", "yd")
+    assert feet_to_yards.__name__ == "foot_to_yard"
+    assert feet_to_yards(3.0) == conversions.convert(3.0, "ft", "yd")
+
+
+def test_register_unit(monkeypatch):
+    monkeypatch.setattr(conversions, "UNITS", dict(conversions.UNITS))
+    monkeypatch.setattr(conversions, "FACTORS", dict(conversions.FACTORS))
+    monkeypatch.setattr(conversions, "_SCALES", dict(conversions._SCALES))
+
+    conversions.register_unit("chain", "length", "20.1168")
+    assert conversions.UNITS["chain"] == ("length", Fraction("20.1168"))
+    assert conversions.convert(1.0, "chain", "yard") == 22.0
+    assert conversions.convert(66.0, "foot", "chain") == 1.0
+
+
+@pytest.mark.parametrize("source, destination", (
+    ("furlong", "meter"),
+    ("meter", "furlong"),
+    ("meter", "kilogram"),
+))
+def test_invalid_units(source, destination):
+    with pytest.raises(ValueError):
+        conversions.convert(1.0, source, destination)
+    with pytest.raises(ValueError):
+        conversions.factor(source, destination)
@@ -0,0 +1,152 @@
+"""
+test_program.py
+
+Description:
+    Tests of workout program schedules and calendar export
+"""
+# Python standard libraries
+import datetime
+import itertools
+import os
+
+# external
+import pytest
+
+# local libraries
+from fitness import program
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+START = datetime.date(2018, 8, 20)
+END = datetime.date(2018, 9, 3)
+
+
+# ==============================================================================
+# schedules
+# ==============================================================================
+def test_schedule_lookup():
+    schedule = program.Schedule(START, program.PROGRAMS["default"])
+    assert schedule[START].workout_type == "shoulders"
+    assert schedule[START + datetime.timedelta(days=5)].workout_type == "rest"
+
+    # the mesocycle repeats after six weeks
+    entry = schedule[START + datetime.timedelta(weeks=6, days=1)]
+    assert (entry.week_type, entry.workout_type, entry.week, entry.day) == ("normal", "back", 0, 1)
+    entry = schedule[START + datetime.timedelta(weeks=6 * 100 + 4)]
+    assert (entry.week_type, entry.workout_type) == ("strength", "shoulders")
+
+
+def test_schedule_lookup_matches_entries():
+    schedule = program.Schedule(START, program.PROGRAMS["default"])
+    for entry in itertools.islice(schedule, 100):
+        assert schedule[entry.date] == entry
+
+    later = START + datetime.timedelta(days=1000)
+    assert next(schedule.entries(start=later)) == schedule[later]
+
+
+def test_schedule_bounds():
+    schedule = program.Schedule(START, program.PROGRAMS["default"], end=END)
+    assert len(schedule) == 14
+    assert START in schedule and END not in schedule
+    assert START - datetime.timedelta(days=1) not in schedule
+    with pytest.raises(KeyError):
+        schedule[END]
+    assert len(list(schedule.entries(start=START + datetime.timedelta(days=10)))) == 4
+
+
+def test_schedule_without_end_has_no_length():
+    with pytest.raises(TypeError):
+        len(program.Schedule(START, program.PROGRAMS["default"]))
+
+
+def test_schedule_bare_week_types():
+    schedule = program.Schedule(START, program.PROGRAMS["bls"], end=END, days=program.DEFAULT_DAYS)
+    assert [e.workout_type for e in schedule][:7] == list(program.DEFAULT_DAYS)
+    with pytest.raises(ValueError):
+        program.Schedule(START, program.PROGRAMS["bls"])
+
+
+def test_schedule_week_offset():
+    schedule = program.Schedule(START, [("a", ("x",) * 3), ("b", ("y",) * 4)])
+    assert [schedule.week_offset(week) for week in range(5)] == [0, 3, 7, 10, 14]
+
+
+def test_empty_mesocycle():
+    with pytest.raises(ValueError):
+        program.Schedule(START, [])
+
+
+# ==============================================================================
+# export
+# ==============================================================================
+def test_ical_text():
+    assert program._ical_text("Doe, Jane; \\x\nnext") == "Doe\\, Jane\\; \\\\x\\nnext"
+
+
+def test_write_calendar(tmp_path):
+    schedule = program.Schedule(START, program.PROGRAMS["default"], end=END)
+    icsfile = str(tmp_path / "athlete.ics")
+    csvfile = str(tmp_path / "athlete.csv")
+    program.write_calendar(schedule, icsfile, name="Doe, Jane")
+    program.write_calendar(schedule, csvfile)
+
+    with open(icsfile, "r", newline="") as infile:
+        ics = infile.read()
+    assert ics.startswith("BEGIN:VCALENDAR\r\n")
+    assert ics.endswith("END:VCALENDAR\r\n")
+    assert "X-WR-CALNAME:Doe\\, Jane\r\n" in ics
+    assert ics.count("BEGIN:VEVENT") == 14
+    assert "DTSTART;VALUE=DATE:20180820\r\nDTEND;VALUE=DATE:20180821\r\n" in ics
+
+    with open(csvfile, "r") as infile:
+        lines = infile.read().splitlines()
+    assert lines[0] == "athlete,date,week_type,workout_type"
+    assert lines[1] == "athlete,2018-08-20,normal,shoulders"
+    assert len(lines) == 15
+
+
+def test_write_calendar_many_chunks(tmp_path):
+    days = program.EXPORT_CHUNK_SIZE * 2 + 10
+    schedule = program.Schedule(START, program.PROGRAMS["default"], end=START + datetime.timedelta(days=days))
+    icsfile = str(tmp_path / "athlete.ics")
+    program.write_calendar(schedule, icsfile)
+    with open(icsfile, "r", newline="") as infile:
+        ics = infile.read()
+    assert ics.count("BEGIN:VEVENT") == days
+    assert ics.count("END:VCALENDAR") == 1
+
+
+def test_write_calendar_unsupported_format(tmp_path):
+    schedule = program.Schedule(START, program.PROGRAMS["default"], end=END)
+    with pytest.raises(ValueError):
+        program.write_calendar(schedule, str(tmp_path / "athlete.txt"))
+
+
+def test_export_calendars(tmp_path):
+    athletes = [
+        ("jane", START),
+        ("john", START, "bls"),
+        ("jim", START, "unknown"),
+        ("jill", START, "bbls"),
+    ]
+    finished = []
+    written, failed = program.export_calendars(
+        athletes, str(tmp_path), END, workers=1,
+        progress=lambda done, name: finished.append(name)
+    )
+
+    assert written == 6
+    assert [name for name, _ in failed] == ["jim"]
+    assert "Unknown program: unknown" in failed[0][1]
+    assert sorted(finished) == ["jane", "jill", "jim", "john"]
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "jane.csv", "jane.ics", "jill.csv", "jill.ics", "john.csv", "john.ics"
+    ]
+
+
+def test_export_calendars_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        program.export_calendars([("jane", START)], str(tmp_path), END, extensions=(".txt",))
@@ -0,0 +1,146 @@
+"""
+test_report.py
+
+Description:
+    Tests of the weight log report templates and batch report rendering
+"""
+# Python standard libraries
+import json
+import os
+
+# external
+import pytest
+
+# local libraries
+from fitness import report
+from fitness import weightlog
+
+
+# ==============================================================================
+# templates
+# ==============================================================================
+@pytest.mark.parametrize("style", (
+    "<style>td {padding: 5px;}</style>",
+    "<style>td {{padding: 5px;}}</style>",
+))
+def test_template_escapes_style_blocks(style):
+    template = report.Template("<html>" + style + "<p>{weight} {weight_units}</p></html>")
+    document = template.render({"weight": 85.0, "weight_units": "kg"})
+    assert document == "<html><style>td {padding: 5px;}</style><p>85.0 kg</p></html>"
+
+
+def test_template_outside_style_blocks():
+    template = report.Template("{{literal}} {value}")
+    assert template.render({"value": 1}) == "{literal} 1"
+
+
+def test_get_template_is_cached(tmp_path):
+    filepath = tmp_path / "template.txt"
+    filepath.write_text("weight: {weight}")
+    template = report.get_template(str(filepath))
+    assert report.get_template(str(filepath)) is template
+
+    filepath.write_text("weight: {weight} kg")
+    changed = report.get_template(str(filepath))
+    assert changed is not template
+    assert changed.render({"weight": 85.0}) == "weight: 85.0 kg"
+
+
+def test_weight_log_values():
+    values = report.weight_log_values(180.0, 85.0, 35, 15.0, True, "katchMcArdle", 1.2, precision=1)
+    assert values["weight"] == 85.0
+    assert values["lbm"] == 72.2
+    assert values["bmr_multiplier"] == 1.2
+    assert values["cut"] < values["maintain"] < values["bulk"]
+
+
+@pytest.mark.parametrize("template", (report.WEIGHT_LOG_HTML, report.WEIGHT_LOG_TXT))
+def test_weight_log_document(template):
+    document = report.weight_log_document(180.0, 85.0, 35, 15.0, True, "katchMcArdle", 1.2, template)
+    assert "85.0" in document
+    assert "{weight}" not in document
+    if template == report.WEIGHT_LOG_HTML:
+        assert "table.metrics {border-collapse: collapse;" in document
+
+
+# ==============================================================================
+# batch
+# ==============================================================================
+SKULPT_CSV = (
+    "2018-08-19T06:30:00Z, upper_back, l, 98.00, 152.00, 14.0\n"
+    "2018-08-20T06:30:00Z, upper_back, l, 98.00, 152.00, 10.0\n"
+    "2018-08-20T06:31:00Z, upper_back, r, 98.00, 152.00, 12.0\n"
+)
+PROFILE = {"height_cm": 170.0, "age": 30, "male": False, "equation": "mifflinStJeor"}
+
+
+@pytest.fixture
+def clients(tmp_path):
+    directory = tmp_path / "clients"
+
+    # a profile, a Skulpt export and records appended out of order
+    anna = directory / "anna"
+    anna.mkdir(parents=True)
+    log = weightlog.open_log(str(anna / "weight_log.jsonl"))
+    log.append(200.0, {"weight": 60.0, "bf": 20.0, "activeness": 1.375})
+    log.append(100.0, {"weight": 61.0, "bf": 21.0, "activeness": 1.2})
+    (anna / "skulpt.csv").write_text(SKULPT_CSV)
+    (anna / "profile.json").write_text(json.dumps(PROFILE))
+
+    # a legacy log whose record has no activeness
+    bob = directory / "bob"
+    bob.mkdir()
+    weightlog.open_log(str(bob / "weight_log.json")).append(100.0, {"weight": 90.0, "bf": 18.0})
+
+    # an empty log and a directory without any log
+    (directory / "carl").mkdir()
+    (directory / "carl" / "weight_log.jsonl").write_text("")
+    (directory / "notes").mkdir()
+    return str(directory)
+
+
+def _expected(template, *args):
+    return report.get_template(template).render(report.weight_log_values(*args))
+
+
+def test_find_clients(clients):
+    names = [os.path.basename(c) for c in report.find_clients(clients)]
+    assert names == ["anna", "bob", "carl"]
+
+
+def test_render_client_report(clients, tmp_path):
+    client_dir = os.path.join(clients, "anna")
+    before = sorted(os.listdir(client_dir))
+    outputdir = str(tmp_path / "reports")
+    os.mkdir(outputdir)
+
+    client, _, error = report.render_client_report(client_dir, outputdir)
+    assert (client, error) == ("anna", None)
+    assert sorted(os.listdir(client_dir)) == before
+
+    # the latest record, with the body fat of the latest Skulpt scan
+    for template, extension in ((report.WEIGHT_LOG_HTML, ".html"), (report.WEIGHT_LOG_TXT, ".txt")):
+        with open(os.path.join(outputdir, "anna" + extension), "r") as infile:
+            assert infile.read() == _expected(template, 170.0, 60.0, 30, 11.0, False, "mifflinStJeor", 1.375)
+
+
+def test_render_client_report_defaults(clients, tmp_path):
+    outputdir = str(tmp_path)
+    assert report.render_client_report(os.path.join(clients, "bob"), outputdir)[2] is None
+    with open(os.path.join(outputdir, "bob.txt"), "r") as infile:
+        assert infile.read() == _expected(report.WEIGHT_LOG_TXT, None, 90.0, None, 18.0, True, "katchMcArdle", 1.2)
+
+
+def test_render_client_report_empty_log(clients, tmp_path):
+    client, _, error = report.render_client_report(os.path.join(clients, "carl"), str(tmp_path))
+    assert client == "carl"
+    assert error.startswith("ValueError: Weight log has no records")
+
+
+def test_render_reports(clients, tmp_path):
+    outputdir = str(tmp_path / "reports")
+    results = report.render_reports(clients, outputdir, workers=1)
+    errors = dict((client, error) for client, _, error in results)
+    assert sorted(errors) == ["anna", "bob", "carl"]
+    assert errors["anna"] is None and errors["bob"] is None and errors["carl"]
+    assert sorted(os.listdir(outputdir)) == ["anna.html", "anna.txt", "bob.html", "bob.txt"]
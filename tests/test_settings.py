@@ -0,0 +1,87 @@
+"""
+test_settings.py
+
+Description:
+    Tests of the cached settings layer
+"""
+# Python standard libraries
+import json
+import logging
+
+# external
+import pytest
+
+# local libraries
+from fitness import settings
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+DATA = {"precision": 2, "macro_multipliers": {"cut": {"fat": 0.2}}, "genders": ["female", "male"]}
+
+
+@pytest.fixture
+def settingsfile(tmp_path):
+    filepath = tmp_path / "settings.json"
+    filepath.write_text(json.dumps(DATA))
+    return str(filepath)
+
+
+# ==============================================================================
+# general
+# ==============================================================================
+def test_settings_are_shared(settingsfile):
+    loaded = settings.get_settings(settingsfile)
+    assert loaded["macro_multipliers"]["cut"]["fat"] == 0.2
+    assert loaded["genders"] == ("female", "male")
+    assert settings.get_settings(settingsfile) is loaded
+
+
+def test_settings_are_read_only(settingsfile):
+    loaded = settings.get_settings(settingsfile)
+    with pytest.raises(TypeError):
+        loaded["macro_multipliers"]["cut"]["fat"] = 1.0
+    with pytest.raises(AttributeError):
+        loaded["genders"].append("other")
+
+
+def test_changed_file_is_reloaded(settingsfile, monkeypatch):
+    monkeypatch.setattr(settings, "CHECK_INTERVAL", 0.0)
+    loaded = settings.get_settings(settingsfile)
+    with open(settingsfile, "w") as outfile:
+        outfile.write(json.dumps(dict(DATA, precision=3)))
+
+    reloaded = settings.get_settings(settingsfile)
+    assert reloaded["precision"] == 3
+    assert reloaded.version > loaded.version
+
+
+def test_changes_are_checked_once_per_interval(settingsfile, monkeypatch):
+    monkeypatch.setattr(settings, "CHECK_INTERVAL", 3600.0)
+    loaded = settings.get_settings(settingsfile)
+    with open(settingsfile, "w") as outfile:
+        outfile.write(json.dumps(dict(DATA, precision=3)))
+    assert settings.get_settings(settingsfile) is loaded
+
+
+def test_reload_keeps_last_good_settings(settingsfile, caplog):
+    loaded = settings.get_settings(settingsfile)
+    with open(settingsfile, "w") as outfile:
+        outfile.write('{"precision": ')
+
+    with caplog.at_level(logging.WARNING, logger=settings.__name__):
+        assert settings.reload(settingsfile) is loaded
+    assert "Keeping the last good settings" in caplog.text
+    assert settings.get_settings(settingsfile) is loaded
+
+    with open(settingsfile, "w") as outfile:
+        outfile.write(json.dumps(dict(DATA, precision=4)))
+    assert settings.reload(settingsfile)["precision"] == 4
+
+
+def test_first_load_raises(tmp_path):
+    filepath = tmp_path / "settings.json"
+    filepath.write_text('{"precision": ')
+    with pytest.raises(ValueError):
+        settings.get_settings(str(filepath))
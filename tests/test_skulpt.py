@@ -0,0 +1,286 @@
+"""
+test_skulpt.py
+
+Description:
+    Tests of Skulpt csv parsing, date ranges, following a file, the persistent
+    date index, columnar statistics and body fat trends
+"""
+# external
+import pytest
+
+# local libraries
+from fitness import skulpt
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+HEADER = "Time, Muscle, Side, MQ, MQ raw, Fat\n"
+ROWS = (
+    "2018-08-19T06:30:32.982Z, upper_back, l, 98.11, 152.77, 7.5\n",
+    "2018-08-19T06:31:02.100Z, upper_back, r, 97.20, 150.10, 8.5\n",
+    "2018-08-20T06:30:00Z, upper_back, l, 98.00, 152.00, 7.0\n",
+    "2018-08-21T06:30:00.5Z, upper_back, l, 98.00, 152.00, 6.0\n",
+    "2018-08-21T06:40:00.5Z, upper_back, l, 98.00, 152.00, 5.0\n",
+)
+
+
+@pytest.fixture
+def sourcefile(tmp_path):
+    filepath = tmp_path / "skulpt.csv"
+    filepath.write_text(HEADER + "".join(ROWS))
+    return str(filepath)
+
+
+# ==============================================================================
+# parsing
+# ==============================================================================
+def test_parse_line():
+    measurement = skulpt._parse_line(ROWS[0])
+    assert measurement.date == "2018-08-19"
+    assert measurement.name == "l_upper_back"
+    assert measurement.timestamp.microsecond == 982000
+    assert (measurement.mq, measurement.mq_raw, measurement.fat) == (98.11, 152.77, 7.5)
+
+
+def test_parse_line_skips_header_and_blank_lines():
+    assert skulpt._parse_line(HEADER) is None
+    assert skulpt._parse_line("  \n") is None
+
+
+def test_get_body_fat_data(sourcefile):
+    assert skulpt.get_body_fat_data(sourcefile) == {
+        "2018-08-19": {"l_upper_back": 7.5, "r_upper_back": 8.5},
+        "2018-08-20": {"l_upper_back": 7.0},
+        "2018-08-21": {"l_upper_back": 5.0},
+    }
+
+
+def test_iter_daily_body_fat(sourcefile):
+    stats = list(skulpt.iter_daily_body_fat(skulpt.iter_body_fat(sourcefile)))
+    assert [s.date for s in stats] == ["2018-08-19", "2018-08-20", "2018-08-21"]
+    assert (stats[0].count, stats[0].min, stats[0].max, stats[0].avg) == (2, 7.5, 8.5, 8.0)
+    assert stats[2].stats() == (5.0, 5.0, 5.0, 5.0)
+
+
+def test_iter_daily_body_fat_streams():
+    lines = iter(ROWS)
+    daily = skulpt.iter_daily_body_fat(skulpt.iter_measurements(lines))
+    assert next(daily).date == "2018-08-19"
+    # only the first row of the next date has been read
+    assert next(lines) == ROWS[3]
+
+
+def test_iter_daily_body_fat_out_of_order():
+    measurements = skulpt.iter_measurements(reversed(ROWS))
+    with pytest.raises(ValueError):
+        list(skulpt.iter_daily_body_fat(measurements))
+
+
+# ==============================================================================
+# ranges
+# ==============================================================================
+@pytest.mark.parametrize("start, end, last, dates", (
+    (None, None, None, ["2018-08-19", "2018-08-20", "2018-08-21"]),
+    ("2018-08-20", None, None, ["2018-08-20", "2018-08-21"]),
+    (None, "2018-08-20", None, ["2018-08-19", "2018-08-20"]),
+    ("2018-08-20", "2018-08-20", None, ["2018-08-20"]),
+    (None, None, 2, ["2018-08-20", "2018-08-21"]),
+    ("2018-08-19", "2018-08-20", 1, ["2018-08-20"]),
+    ("2018-08-22", None, None, []),
+))
+def test_get_body_fat_range(sourcefile, start, end, last, dates):
+    stats = skulpt.get_body_fat_range(sourcefile, start, end, last)
+    assert [s.date for s in stats] == dates
+
+
+# ==============================================================================
+# follow
+# ==============================================================================
+def _follow(sourcefile, date, polls, append=None):
+    # stops after the given number of polls, appending the next chunk of data
+    # after every yield
+    remaining = [polls]
+
+    def stop():
+        remaining[0] -= 1
+        return remaining[0] < 0
+
+    results = []
+    for stats in skulpt.follow_body_fat(sourcefile, date, interval=0.0, stop=stop):
+        results.append(stats.stats())
+        if append:
+            with open(sourcefile, "ab") as outfile:
+                outfile.write(append.pop(0))
+    return results
+
+
+def test_follow_body_fat(sourcefile):
+    row = b"2018-08-21T07:00:00Z, upper_back, r, 98.00, 152.00, 9.0\n"
+    results = _follow(sourcefile, "2018-08-21", 4, append=[row, b""])
+    assert results == [(5.0, 5.0, 5.0, 5.0), (5.0, 9.0, 7.0, 7.0)]
+
+
+def test_follow_body_fat_skips_bad_rows(sourcefile):
+    rows = [
+        b"garbage\n\xff\xfe, upper_back, r, 98.00, 152.00, 9.0\n"
+        b"2018-08-21T07:00:00Z, upper_back, r, 98.00, 152.00, 9.0\n",
+        b"",
+    ]
+    results = _follow(sourcefile, "2018-08-21", 4, append=rows)
+    assert results == [(5.0, 5.0, 5.0, 5.0), (5.0, 9.0, 7.0, 7.0)]
+
+
+def test_follow_body_fat_waits_for_file(tmp_path):
+    assert _follow(str(tmp_path / "skulpt.csv"), "2018-08-21", 3) == []
+
+
+# ==============================================================================
+# index
+# ==============================================================================
+def test_get_body_fat(sourcefile, tmp_path):
+    assert skulpt.get_body_fat(2018, 8, 19, sourcefile, str(tmp_path)) == (7.5, 8.5, 8.0, 8.0)
+    with pytest.raises(KeyError):
+        skulpt.get_body_fat(2018, 8, 22, sourcefile, str(tmp_path))
+
+
+def test_index_matches_full_parse(sourcefile, tmp_path):
+    assert skulpt.get_body_fat_index(sourcefile, str(tmp_path)) == skulpt.get_body_fat_data(sourcefile)
+
+
+def test_index_is_a_copy(sourcefile, tmp_path):
+    data = skulpt.get_body_fat_index(sourcefile, str(tmp_path))
+    data["2018-08-19"]["l_upper_back"] = 0.0
+    del data["2018-08-20"]
+    assert skulpt.get_body_fat_index(sourcefile, str(tmp_path)) == skulpt.get_body_fat_data(sourcefile)
+
+
+def test_index_appended_rows(sourcefile, tmp_path):
+    skulpt.get_body_fat_index(sourcefile, str(tmp_path))
+    with open(sourcefile, "a") as outfile:
+        outfile.write("2018-08-23T06:30:00Z, upper_back, r, 98.00, 152.00, 9.0\n")
+    assert skulpt.get_body_fat_index(sourcefile, str(tmp_path)) == skulpt.get_body_fat_data(sourcefile)
+
+
+def test_index_no_final_line_break(tmp_path):
+    filepath = tmp_path / "skulpt.csv"
+    filepath.write_text(ROWS[0] + ROWS[2].rstrip("\n"))
+    data = skulpt.get_body_fat_index(str(filepath), str(tmp_path))
+    assert data["2018-08-20"] == {"l_upper_back": 7.0}
+    assert skulpt.get_body_fat(2018, 8, 20, str(filepath), str(tmp_path)) == (7.0, 7.0, 7.0, 7.0)
+
+
+def test_index_growing_final_row(sourcefile, tmp_path):
+    with open(sourcefile, "a") as outfile:
+        outfile.write("2018-08-22T06:30:00Z, upper_back, l, 98.0")
+    data = skulpt.get_body_fat_index(sourcefile, str(tmp_path))
+    assert "2018-08-22" not in data
+
+    with open(sourcefile, "a") as outfile:
+        outfile.write("0, 152.00, 4")
+    data = skulpt.get_body_fat_index(sourcefile, str(tmp_path))
+    assert data["2018-08-22"] == {"l_upper_back": 4.0}
+
+    with open(sourcefile, "a") as outfile:
+        outfile.write(".5\n")
+    data = skulpt.get_body_fat_index(sourcefile, str(tmp_path))
+    assert data["2018-08-22"] == {"l_upper_back": 4.5}
+    assert data == skulpt.get_body_fat_data(sourcefile)
+
+
+def test_index_skips_bad_rows(sourcefile, tmp_path):
+    with open(sourcefile, "a") as outfile:
+        outfile.write("garbage,row\n")
+        outfile.write("2018-08-23T06:30:00Z, upper_back, r, 98.00, 152.00, 9.0\n")
+    data = skulpt.get_body_fat_index(sourcefile, str(tmp_path))
+    assert data["2018-08-23"] == {"r_upper_back": 9.0}
+
+
+# ==============================================================================
+# columnar
+# ==============================================================================
+def test_load_body_fat_columns(sourcefile):
+    pytest.importorskip("numpy")
+    columns = skulpt.load_body_fat_columns(sourcefile)
+    assert columns.dates == ("2018-08-19", "2018-08-20", "2018-08-21")
+    assert columns.muscles == ("l_upper_back", "r_upper_back")
+    assert columns.date_codes.tolist() == [0, 0, 1, 2, 2]
+    assert columns.muscle_codes.tolist() == [0, 1, 0, 0, 0]
+    assert columns.fat.tolist() == [7.5, 8.5, 7.0, 6.0, 5.0]
+
+
+def test_body_fat_statistics(sourcefile, tmp_path):
+    pytest.importorskip("numpy")
+    statistics = skulpt.body_fat_statistics(skulpt.load_body_fat_columns(sourcefile))
+    assert sorted(statistics) == ["2018-08-19", "2018-08-20", "2018-08-21"]
+    for date, values in statistics.items():
+        year, month, day = map(int, date.split("-"))
+        assert values == skulpt.get_body_fat(year, month, day, sourcefile, str(tmp_path))
+
+
+def test_muscle_statistics(sourcefile):
+    pytest.importorskip("numpy")
+    statistics = skulpt.muscle_statistics(skulpt.load_body_fat_columns(sourcefile))
+    assert statistics == {
+        "l_upper_back": (5.0, 7.5, 6.25, 6.5),
+        "r_upper_back": (8.5, 8.5, 8.5, 8.5),
+    }
+
+
+def test_empty_statistics(tmp_path):
+    pytest.importorskip("numpy")
+    filepath = tmp_path / "skulpt.csv"
+    filepath.write_text(HEADER)
+    columns = skulpt.load_body_fat_columns(str(filepath))
+    assert skulpt.body_fat_statistics(columns) == {}
+    assert skulpt.muscle_statistics(columns) == {}
+
+
+# ==============================================================================
+# trends
+# ==============================================================================
+def test_trends(sourcefile, tmp_path):
+    pytest.importorskip("numpy")
+    trends = skulpt.load_body_fat_trends(sourcefile, str(tmp_path))
+    dates, deltas = trends.deltas("l_upper_back")
+    assert dates == ("2018-08-20", "2018-08-21")
+    assert list(deltas) == [-0.5, -2.0]
+
+    dates, means = trends.rolling_mean("l_upper_back", window=3)
+    assert dates == ("2018-08-21",)
+    assert list(means) == [6.5]
+
+
+@pytest.mark.parametrize("method, argument", (("deltas", "periods"), ("rolling_mean", "window")))
+def test_trends_reject_empty_periods(sourcefile, tmp_path, method, argument):
+    pytest.importorskip("numpy")
+    trends = skulpt.load_body_fat_trends(sourcefile, str(tmp_path))
+    with pytest.raises(ValueError):
+        getattr(trends, method)("l_upper_back", **{argument: 0})
+
+
+def test_trends_series(sourcefile, tmp_path):
+    pytest.importorskip("numpy")
+    trends = skulpt.load_body_fat_trends(sourcefile, str(tmp_path))
+    assert trends.muscles == ("l_upper_back", "r_upper_back")
+
+    # dates without a measurement of the muscle are left out
+    dates, values = trends.series("r_upper_back")
+    assert dates == ("2018-08-19",)
+    assert list(values) == [8.5]
+    dates, values = trends.series("l_upper_back", start="2018-08-20")
+    assert dates == ("2018-08-20", "2018-08-21")
+    assert list(values) == [7.0, 5.0]
+
+    assert trends.slopes() == {"l_upper_back": pytest.approx(-1.25), "r_upper_back": None}
+
+
+def test_trends_appended_rows(sourcefile, tmp_path):
+    pytest.importorskip("numpy")
+    skulpt.load_body_fat_trends(sourcefile, str(tmp_path))
+    with open(sourcefile, "a") as outfile:
+        outfile.write("2018-08-22T06:30:00Z, upper_back, l, 98.00, 152.00, 4.0\n")
+
+    dates, deltas = skulpt.load_body_fat_trends(sourcefile, str(tmp_path)).deltas("l_upper_back")
+    assert dates == ("2018-08-20", "2018-08-21", "2018-08-22")
+    assert list(deltas) == [-0.5, -2.0, -1.0]
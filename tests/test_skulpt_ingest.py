@@ -0,0 +1,146 @@
+"""
+test_skulpt_ingest.py
+
+Description:
+    Tests of the bulk Skulpt export ingestion
+"""
+# Python standard libraries
+import os
+
+# external
+import pytest
+
+# local libraries
+from fitness import skulpt_ingest
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+HEADER = "Time, Muscle, Side, MQ, MQ raw, Fat\n"
+PHONE = (
+    "2018-08-19T06:30:00Z, upper_back, l, 98.00, 152.00, 7.5\n"
+    "2018-08-19T06:35:00Z, upper_back, l, 98.00, 152.00, 7.0\n"
+    "2018-08-20T06:30:00Z, upper_back, l, 98.00, 152.00, 6.5\n"
+)
+TABLET = (
+    "2018-08-20T07:30:00Z, upper_back, l, 98.00, 152.00, 6.0\n"
+    "2018-08-20T07:31:00Z, upper_back, r, 98.00, 152.00, 8.0\n"
+)
+OTHER = "2018-08-21T06:30:00Z, biceps, r, 98.00, 152.00, 12.0\n"
+
+
+@pytest.fixture
+def directory(tmp_path):
+    anna = tmp_path / "exports" / "anna"
+    anna.mkdir(parents=True)
+    (anna / "phone.csv").write_text(HEADER + PHONE)
+    (anna / "tablet.CSV").write_text(HEADER + TABLET)
+    (anna / "notes.txt").write_text("not an export")
+    (tmp_path / "exports" / "bob.csv").write_text(HEADER + OTHER)
+    return str(tmp_path / "exports")
+
+
+def _ingest(directory, **kwargs):
+    return skulpt_ingest.ingest(directory, workers=1, **kwargs)
+
+
+# ==============================================================================
+# general
+# ==============================================================================
+def test_find_exports(directory):
+    assert skulpt_ingest.find_exports(directory) == [
+        ("bob.csv", "bob"),
+        (os.path.join("anna", "phone.csv"), "anna"),
+        (os.path.join("anna", "tablet.CSV"), "anna"),
+    ]
+
+
+def test_parse_export(directory):
+    dates, rows = skulpt_ingest.parse_export(os.path.join(directory, "anna", "phone.csv"))
+    assert rows == 3
+    assert dates["2018-08-19"]["l_upper_back"][1] == 7.0
+
+
+def test_ingest(directory):
+    done = []
+    summary = _ingest(directory, progress=lambda count, total, result: done.append(result[0]))
+    assert (summary["files"], summary["parsed"], summary["skipped"], summary["rows"]) == (3, 3, 0, 6)
+    assert summary["failed"] == []
+    assert sorted(done) == ["anna/phone.csv", "anna/tablet.CSV", "bob.csv"]
+
+    # the later of two devices' measurements of a body part wins
+    store = skulpt_ingest.load_store(os.path.join(directory, skulpt_ingest.STORE_NAME))
+    assert store["clients"] == {
+        "anna": {
+            "2018-08-19": {"l_upper_back": 7.0},
+            "2018-08-20": {"l_upper_back": 6.0, "r_upper_back": 8.0},
+        },
+        "bob": {"2018-08-21": {"r_biceps": 12.0}},
+    }
+
+
+def test_ingest_skips_unchanged_exports(directory):
+    _ingest(directory)
+    summary = _ingest(directory)
+    assert (summary["parsed"], summary["skipped"], summary["rows"]) == (0, 3, 0)
+
+
+def test_ingest_reparses_changed_exports(directory):
+    storefile = os.path.join(directory, skulpt_ingest.STORE_NAME)
+    _ingest(directory)
+    with open(os.path.join(directory, "bob.csv"), "a") as outfile:
+        outfile.write("2018-08-22T06:30:00Z, biceps, r, 98.00, 152.00, 11.5\n")
+
+    summary = _ingest(directory)
+    assert (summary["parsed"], summary["skipped"], summary["rows"]) == (1, 2, 2)
+    assert skulpt_ingest.load_store(storefile)["clients"]["bob"]["2018-08-22"] == {"r_biceps": 11.5}
+
+
+def test_ingest_keeps_last_good_parse(directory):
+    storefile = os.path.join(directory, skulpt_ingest.STORE_NAME)
+    bobfile = os.path.join(directory, "bob.csv")
+    _ingest(directory)
+    with open(bobfile, "a") as outfile:
+        outfile.write("garbage\n")
+
+    summary = _ingest(directory)
+    assert [relpath for relpath, _ in summary["failed"]] == ["bob.csv"]
+    assert summary["failed"][0][1].startswith("ValueError")
+    assert skulpt_ingest.load_store(storefile)["clients"]["bob"] == {"2018-08-21": {"r_biceps": 12.0}}
+
+    # still failing, so retried on the next run
+    assert [relpath for relpath, _ in _ingest(directory)["failed"]] == ["bob.csv"]
+    with open(bobfile, "w") as outfile:
+        outfile.write(HEADER + OTHER.replace("12.0", "13.0"))
+    summary = _ingest(directory)
+    assert summary["failed"] == []
+    assert skulpt_ingest.load_store(storefile)["clients"]["bob"] == {"2018-08-21": {"r_biceps": 13.0}}
+
+
+def test_ingest_drops_removed_exports(directory):
+    storefile = os.path.join(directory, skulpt_ingest.STORE_NAME)
+    _ingest(directory)
+    os.remove(os.path.join(directory, "anna", "tablet.CSV"))
+
+    summary = _ingest(directory)
+    assert (summary["files"], summary["parsed"], summary["skipped"]) == (2, 0, 2)
+    store = skulpt_ingest.load_store(storefile)
+    assert sorted(store["files"]) == ["anna/phone.csv", "bob.csv"]
+    assert store["clients"]["anna"]["2018-08-20"] == {"l_upper_back": 6.5}
+
+
+def test_ingest_separate_store(directory, tmp_path):
+    storefile = str(tmp_path / "store.json")
+    _ingest(directory, storefile=storefile)
+    assert not os.path.exists(os.path.join(directory, skulpt_ingest.STORE_NAME))
+    assert sorted(skulpt_ingest.load_store(storefile)["clients"]) == ["anna", "bob"]
+
+
+@pytest.mark.parametrize("content", ("", "{", '{"version": 0, "files": {}}', "[]"))
+def test_load_store_starts_over(tmp_path, content):
+    storefile = tmp_path / "store.json"
+    storefile.write_text(content)
+    assert skulpt_ingest.load_store(str(storefile)) == {
+        "version": skulpt_ingest.STORE_VERSION, "files": {}, "clients": {}
+    }
@@ -0,0 +1,101 @@
+"""
+test_stats.py
+
+Description:
+    Tests of the rolling window statistics
+"""
+# external
+import pytest
+
+# local libraries
+from fitness import stats
+
+
+# ==============================================================================
+# general
+# ==============================================================================
+def test_empty():
+    rolling = stats.RollingStats(window=3)
+    assert len(rolling) == 0 and rolling.count == 0
+    assert (rolling.mean, rolling.ema, rolling.min, rolling.max, rolling.slope) == (None,) * 5
+
+
+def test_statistics():
+    rolling = stats.RollingStats(alpha=0.5, values=[1.0, 3.0, 2.0])
+    assert list(rolling) == [1.0, 3.0, 2.0]
+    assert rolling.mean == pytest.approx(2.0)
+    assert rolling.ema == pytest.approx(2.0)
+    assert (rolling.min, rolling.max) == (1.0, 3.0)
+    assert rolling.slope == pytest.approx(0.5)
+
+
+def test_missing_values():
+    rolling = stats.RollingStats(values=[1.0, None, 3.0])
+    assert len(rolling) == 3 and rolling.count == 2
+    assert rolling.mean == pytest.approx(2.0)
+    assert rolling.slope == pytest.approx(1.0)
+    assert stats.RollingStats(values=[None, 5.0]).slope is None
+
+
+# ==============================================================================
+# window
+# ==============================================================================
+def test_eviction():
+    rolling = stats.RollingStats(window=2, values=[1.0, 5.0, 3.0])
+    assert list(rolling) == [5.0, 3.0]
+    assert rolling.mean == pytest.approx(4.0)
+    assert (rolling.min, rolling.max) == (3.0, 5.0)
+    assert rolling.slope == pytest.approx(-2.0)
+
+    rolling.extend([None, None])
+    assert rolling.count == 0
+    assert (rolling.mean, rolling.min, rolling.max) == (None, None, None)
+
+
+def test_long_stream_matches_window():
+    rolling = stats.RollingStats(window=3, values=range(100000))
+    assert list(rolling) == [99997, 99998, 99999]
+    assert rolling.mean == pytest.approx(99998.0)
+    assert rolling.slope == pytest.approx(1.0)
+    assert (rolling.min, rolling.max) == (99997, 99999)
+
+
+# ==============================================================================
+# replace
+# ==============================================================================
+def test_replace():
+    rolling = stats.RollingStats(window=3, alpha=0.5, values=[1.0, 2.0, 3.0, 4.0])
+    rolling.replace(0, 10.0)
+    assert list(rolling) == [10.0, 3.0, 4.0]
+    assert rolling.mean == pytest.approx(17.0 / 3.0)
+    assert (rolling.min, rolling.max) == (3.0, 10.0)
+
+    # the moving average is rebuilt from the window
+    assert rolling.ema == pytest.approx(5.25)
+    assert rolling.slope == pytest.approx(-3.0)
+
+
+def test_replace_with_missing_value():
+    rolling = stats.RollingStats(values=[1.0, 2.0, 3.0])
+    rolling.replace(-1, None)
+    assert rolling.count == 2
+    assert rolling.max == 2.0
+    rolling.replace(2, 5.0)
+    assert rolling.count == 3 and rolling.max == 5.0
+
+
+def test_replace_then_evict():
+    rolling = stats.RollingStats(window=2, values=[1.0, 2.0])
+    rolling.replace(1, 0.5)
+    rolling.extend([4.0, 3.0])
+    assert list(rolling) == [4.0, 3.0]
+    assert (rolling.min, rolling.max) == (3.0, 4.0)
+    assert rolling.mean == pytest.approx(3.5)
+
+
+def test_replace_out_of_range():
+    rolling = stats.RollingStats(values=[1.0])
+    with pytest.raises(IndexError):
+        rolling.replace(1, 2.0)
+    with pytest.raises(IndexError):
+        rolling.replace(-2, 2.0)
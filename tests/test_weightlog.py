@@ -0,0 +1,250 @@
+"""
+test_weightlog.py
+
+Description:
+    Tests of the weight log storage backends, migrate and compact
+"""
+# Python standard libraries
+import datetime
+import math
+import os
+
+# external
+import pytest
+
+# local libraries
+from fitness import weightlog
+
+
+# ==============================================================================
+# constants / globals
+# ==============================================================================
+EXTENSIONS = (".json", ".jsonl", ".wlog")
+RECORD = {"weight": 85.0, "bf": 15.0, "lbm": 72.25, "bmr": 1876.0, "activeness": 1.2, "tdee": 2251.2}
+
+
+def _record(weight):
+    record = dict(RECORD)
+    record["weight"] = weight
+    return record
+
+
+# ==============================================================================
+# backends
+# ==============================================================================
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_append_read_round_trip(tmp_path, extension):
+    log = weightlog.open_log(str(tmp_path / ("log" + extension)))
+    assert log.read() == {}
+
+    log.append(200.0, _record(85.0))
+    log.append(100.0, _record(86.0))
+    assert log.read() == {100.0: _record(86.0), 200.0: _record(85.0)}
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_missing_fields(tmp_path, extension):
+    log = weightlog.open_log(str(tmp_path / ("log" + extension)))
+    log.append(100.0, {"weight": 85.0})
+    assert log.read() == {100.0: {"weight": 85.0}}
+
+    columns = log.columns()
+    assert len(columns) == 1
+    assert columns.value(0, "weight") == 85.0
+    assert math.isnan(columns.value(0, "bf"))
+
+
+def test_open_log_defaults_to_json_lines(tmp_path):
+    log = weightlog.open_log(str(tmp_path / "log.txt"))
+    assert isinstance(log, weightlog.JsonLinesWeightLog)
+
+
+def test_json_lines_torn_line(tmp_path):
+    filepath = str(tmp_path / "log.jsonl")
+    log = weightlog.open_log(filepath)
+    log.append(100.0, _record(85.0))
+    with open(filepath, "a") as outfile:
+        outfile.write('{"weight": 84.0, "times')
+    assert log.read() == {100.0: _record(85.0)}
+
+    log.append(200.0, _record(86.0))
+    assert log.read() == {100.0: _record(85.0), 200.0: _record(86.0)}
+
+
+def test_binary_torn_record(tmp_path):
+    filepath = str(tmp_path / "log.wlog")
+    log = weightlog.open_log(filepath)
+    log.append(100.0, _record(85.0))
+    log.append(200.0, _record(86.0))
+    with open(filepath, "r+b") as outfile:
+        outfile.truncate(os.path.getsize(filepath) - 5)
+    assert log.read() == {100.0: _record(85.0)}
+
+    log.append(300.0, _record(87.0))
+    assert log.read() == {100.0: _record(85.0), 300.0: _record(87.0)}
+
+
+def test_binary_range(tmp_path):
+    log = weightlog.open_log(str(tmp_path / "log.wlog"))
+    for timestamp in (100.0, 200.0, 300.0, 400.0):
+        log.append(timestamp, _record(timestamp / 10))
+    assert [ts for ts, _ in log.range(200.0, 400.0)] == [200.0, 300.0]
+    assert [ts for ts, _ in log.range(end=150.0)] == [100.0]
+    assert [ts for ts, _ in log.range(start=500.0)] == []
+
+
+def test_binary_bad_header(tmp_path):
+    filepath = str(tmp_path / "log.wlog")
+    with open(filepath, "wb") as outfile:
+        outfile.write(b"\x00" * 64)
+    log = weightlog.open_log(filepath)
+    with pytest.raises(IOError):
+        log.read()
+    with pytest.raises(IOError):
+        log.append(100.0, _record(85.0))
+
+
+# ==============================================================================
+# columns
+# ==============================================================================
+DAYS = (
+    datetime.date(2018, 8, 19),
+    datetime.date(2018, 8, 20),
+    datetime.date(2018, 8, 21),
+    datetime.date(2018, 9, 3),
+)
+
+
+@pytest.fixture
+def columns():
+    columns = weightlog.WeightLogColumns()
+    for day in reversed(DAYS):
+        timestamp = weightlog._timestamp(datetime.datetime.combine(day, datetime.time(7, 0)))
+        columns.append(timestamp, _record(day.day))
+    columns.sort()
+    return columns
+
+
+def test_columns_range(columns):
+    assert [r["weight"] for _, r in columns.range(DAYS[1], DAYS[3])] == [20.0, 21.0]
+    assert [r["weight"] for _, r in columns.range(start=DAYS[2])] == [21.0, 3.0]
+    assert [r["weight"] for _, r in columns.range(end=DAYS[1])] == [19.0]
+    assert len(columns.range(DAYS[3], DAYS[0])) == 0
+
+
+def test_columns_latest(columns):
+    assert list(columns.latest(2).column("weight")) == [21.0, 3.0]
+    assert len(columns.latest(10)) == 4
+    assert len(columns.latest(0)) == 0
+
+
+@pytest.mark.parametrize("period, expected", (
+    ("day", [(DAYS[0], 1), (DAYS[1], 1), (DAYS[2], 1), (DAYS[3], 1)]),
+    ("week", [(datetime.date(2018, 8, 13), 1), (DAYS[1], 2), (DAYS[3], 1)]),
+    ("month", [(datetime.date(2018, 8, 1), 3), (datetime.date(2018, 9, 1), 1)]),
+))
+def test_columns_buckets(columns, period, expected):
+    # the empty week starting 2018-08-27 is skipped
+    assert [(date, len(rows)) for date, rows in columns.buckets(period)] == expected
+
+
+def test_columns_buckets_range(columns):
+    buckets = columns.buckets("week", start=DAYS[1], end=DAYS[3])
+    assert [(date, len(rows)) for date, rows in buckets] == [(DAYS[1], 2)]
+
+
+def test_columns_buckets_unknown_period(columns):
+    with pytest.raises(ValueError):
+        columns.buckets("year")
+
+
+def test_get_columns_is_cached(tmp_path):
+    filepath = str(tmp_path / "log.jsonl")
+    log = weightlog.open_log(filepath)
+    log.append(100.0, _record(85.0))
+    columns = weightlog.get_columns(filepath)
+    assert weightlog.get_columns(filepath) is columns
+
+    log.append(200.0, _record(86.0))
+    changed = weightlog.get_columns(filepath)
+    assert changed is not columns
+    assert list(changed.column("weight")) == [85.0, 86.0]
+
+
+# ==============================================================================
+# migrate / compact
+# ==============================================================================
+@pytest.mark.parametrize("extension", EXTENSIONS[1:])
+def test_migrate(tmp_path, extension):
+    sourcefile = str(tmp_path / "log.json")
+    source = weightlog.open_log(sourcefile)
+    source.append(200.0, _record(85.0))
+    source.append(100.0, _record(86.0))
+
+    outputfile = weightlog.migrate(sourcefile, str(tmp_path / ("log" + extension)))
+    output = weightlog.open_log(outputfile)
+    assert [ts for ts, _ in output.entries()] == [100.0, 200.0]
+    assert output.read() == source.read()
+
+
+def test_migrate_default_output(tmp_path):
+    sourcefile = str(tmp_path / "log.json")
+    weightlog.open_log(sourcefile).append(100.0, _record(85.0))
+    assert weightlog.migrate(sourcefile) == str(tmp_path / "log.jsonl")
+
+
+def test_migrate_missing_source(tmp_path):
+    with pytest.raises(IOError):
+        weightlog.migrate(str(tmp_path / "log.json"))
+    assert not list(tmp_path.iterdir())
+
+
+def test_migrate_existing_output(tmp_path):
+    sourcefile = str(tmp_path / "log.json")
+    outputfile = str(tmp_path / "log.jsonl")
+    weightlog.open_log(sourcefile).append(100.0, _record(85.0))
+    weightlog.open_log(outputfile).append(200.0, _record(86.0))
+
+    with pytest.raises(IOError):
+        weightlog.migrate(sourcefile, outputfile)
+    assert weightlog.open_log(outputfile).read() == {200.0: _record(86.0)}
+
+    weightlog.migrate(sourcefile, outputfile, force=True)
+    assert weightlog.open_log(outputfile).read() == {100.0: _record(85.0)}
+
+
+def test_migrate_onto_itself(tmp_path):
+    sourcefile = str(tmp_path / "log.jsonl")
+    weightlog.open_log(sourcefile).append(100.0, _record(85.0))
+    with pytest.raises(IOError):
+        weightlog.migrate(sourcefile, sourcefile, force=True)
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS[1:])
+def test_compact(tmp_path, extension):
+    filepath = str(tmp_path / ("log" + extension))
+    log = weightlog.open_log(filepath)
+    log.append(300.0, _record(85.0))
+    log.append(100.0, _record(86.0))
+    log.append(300.0, _record(87.0))
+
+    assert weightlog.compact(filepath) == 2
+    assert list(log.entries()) == [(100.0, _record(86.0)), (300.0, _record(87.0))]
+
+
+def test_compact_drops_torn_line(tmp_path):
+    filepath = str(tmp_path / "log.jsonl")
+    log = weightlog.open_log(filepath)
+    log.append(100.0, _record(85.0))
+    with open(filepath, "a") as outfile:
+        outfile.write("{")
+
+    assert weightlog.compact(filepath) == 1
+    with open(filepath, "r") as infile:
+        assert infile.read().endswith("}\n")
+
+
+def test_compact_missing_log(tmp_path):
+    with pytest.raises(IOError):
+        weightlog.compact(str(tmp_path / "log.jsonl"))
+    assert not list(tmp_path.iterdir())
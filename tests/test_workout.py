@@ -0,0 +1,81 @@
+"""
+test_workout.py
+
+Description:
+    Tests of plate loading tables and warmup planning
+"""
+# local libraries
+from fitness import workout
+
+
+# ==============================================================================
+# loading tables
+# ==============================================================================
+def test_loading_table():
+    table = workout.get_loading_table()
+    assert table.bar == workout.BAR_WEIGHT
+    assert table.weights[:4] == [20.0, 22.5, 25.0, 27.5]
+    assert table.weights == sorted(table.weights)
+    assert len(table) == len(set(table.weights))
+
+    # every plate of the default inventory on the bar
+    assert table.weights[-1] == 297.5
+    assert sum(table.plates(297.5)) * 2 + table.bar == 297.5
+
+
+def test_loading_table_fewest_plates():
+    table = workout.get_loading_table()
+    assert table.plates(20.0) == ()
+    assert table.plates(60.0) == (20.0,)
+    assert table.plates(70.0) == (25.0,)
+    assert len(table.plates(90.0)) == 2
+    assert table.plates(42.5) == (10.0, 1.25)
+
+
+def test_loading_table_is_cached():
+    plates = {10.0: 2, 5.0: 2}
+    table = workout.get_loading_table(plates)
+    assert workout.get_loading_table({5.0: 2, 10.0: 2}) is table
+    assert workout.get_loading_table(plates, bar=15.0) is not table
+
+
+def test_loading_table_uses_plate_pairs():
+    # an odd plate out cannot be loaded
+    table = workout.get_loading_table({10.0: 2, 5.0: 3})
+    assert table.weights == [20.0, 30.0, 40.0, 50.0]
+    assert 35.0 not in table
+
+
+def test_nearest():
+    table = workout.get_loading_table()
+    assert table.nearest(60.0) == 60.0
+    assert table.nearest(61.0) == 60.0
+    assert table.nearest(31.25) == 30.0
+    assert table.nearest(10.0) == 20.0
+    assert table.nearest(1000.0) == 297.5
+    assert table.load(61.0) == (60.0, (20.0,))
+
+
+# ==============================================================================
+# warmups
+# ==============================================================================
+def test_plan_warmups():
+    plans = workout.plan_warmups([100.0, 62.5, 100.0])
+    assert [weight for weight, _ in plans[0]] == [50.0, 50.0, 70.0, 90.0]
+    assert [weight for weight, _ in plans[1]] == [30.0, 30.0, 42.5, 55.0]
+    assert plans[2] is plans[0]
+
+    table = workout.get_loading_table()
+    for plan in plans:
+        for weight, plates in plan:
+            assert table.plates(weight) == plates
+
+
+def test_plan_warmups_never_below_the_bar():
+    plans = workout.plan_warmups([30.0], set_factors=(0.3, 0.6), bar=20.0)
+    assert [weight for weight, _ in plans[0]] == [20.0, 20.0]
+
+
+def test_plan_warmups_custom_inventory():
+    plans = workout.plan_warmups([60.0], set_factors=(0.5, 0.9), plates={10.0: 2, 5.0: 2})
+    assert plans == [[(30.0, (5.0,)), (50.0, (10.0, 5.0))]]